@@ -1,17 +1,64 @@
 import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import multiprocessing as mp
 from functools import partial
 import time
+from array import array
+from collections import deque
+from itertools import repeat
+from operator import itemgetter
+from contextlib import nullcontext
 import sqlglot
 from sqlglot import exp, parse_one
 from sqllineage.runner import LineageRunner
-from helper import read_queries_from_input, clean_table_name
+from helper import (list_query_files, iter_queries_from_files, print_read_times,
+                    clean_table_name, get_peak_rss_mb, DEFAULT_EXCEL_PROCESSES)
+from lineageCache import LineageCache, make_cache_key, CACHEABLE_ERRORS, DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES
+from astLineage import extract_table_lineage, DEFAULT_LINEAGE_ENGINE
+from workerPool import RecyclingPool
+from statementSplitter import iter_source_statements
+from queryPreprocessor import preprocess_query, statement_fingerprint
+from typeCatalog import load_type_catalog, apply_default_types
+from lineageIO import TableAppender, output_path, write_table, OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT
+from edgeStore import EdgeStore
+from lineageShards import (ShardWriter, create_run_dir, remove_run_dir, read_shards,
+                           LINEAGE_SHARD_PREFIX, ERROR_SHARD_PREFIX, DEFAULT_SHARD_DIR)
+from lineageProfile import StageTimer, StageProfiler, DEFAULT_PROFILE_TOP_N
+from costScheduler import (CostTracker, TaskTiming, DEFAULT_SCHEDULE, DEFAULT_COST_HISTORY_PATH,
+                           DEFAULT_WINDOW_PER_PROCESS)
 
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Per-process lineage cache connection and engine choice, set by init_worker
+_lineage_cache = None
+_lineage_engine = DEFAULT_LINEAGE_ENGINE
+# Per-process shard files with shard output, and whether results keep what duplicates need
+_shard_writer = None
+_shard_fan_out = True
+# Stage timer of the statement being processed, set by process_profiled_query
+_stage_timer = None
+
+# Results buffered per CSV append in streaming mode
+DEFAULT_STREAM_BATCH_SIZE = 500
+
+# Worker recycling limits used by main(); leaked parser state is dropped with the worker
+DEFAULT_MAX_TASKS_PER_CHILD = 1000
+DEFAULT_MAX_WORKER_MEMORY_MB = 2048
+
+RELATION_COLUMNS = ['script_file', 'childTableName', 'relationship', 'parentTableName']
+ERROR_COLUMNS = ['script_file', 'query_index', 'start_offset', 'end_offset', 'sql_query', 'error_type', 'error_info']
+# Error shards leave the offsets out; they stay in the parent and are added when merging
+SHARD_ERROR_COLUMNS = ['query_index', 'script_file', 'sql_query', 'error_type', 'error_info']
+
+# Tasks per chunk when statements are split lazily and the total isn't known up front
+DEFAULT_LAZY_CHUNKSIZE = 16
+
 def process_single_query(query_data):
     """Process a single SQL query and return lineage data.
     
@@ -19,201 +66,750 @@ def process_single_query(query_data):
         query_data: Tuple of (query_string, custom_name, query_index)
     
     Returns:
-        Tuple of (dataframe_rows, success_flag, error_info, query_text) 
+        Tuple of (dataframe_rows, success_flag, error_type, error_info, query_text, file_nme, cache_state, query_index, lineage)
+        where cache_state is 'hit', 'miss' or None when no cache is configured and lineage is
+        (sql_type, target_tables, source_tables) on success, so the rows can be rebuilt for
+        other script files containing the same statement
     """
     (file_nme, one_sql), custom_name, query_idx = query_data
     dataframe_rows = []
+    timer = _stage_timer
     
-    # Remove _x000d_ characters
-    if '_x000d_' in one_sql:
-        one_sql = one_sql.replace('_x000d_', ' ')
-    # Remove _x000D_ characters
-    if '_x000D_' in one_sql:
-        one_sql = one_sql.replace('_x000D_', ' ')
-    
-    # Remove LOCKING...ACCESS clause
-    one_sql_lower = one_sql.lower()
-    if 'locking' in one_sql_lower and 'access' in one_sql_lower:
-        # Find position of 'locking' and 'access'
-        locking_pos = one_sql_lower.find('locking')
-        access_pos = one_sql_lower.find('access', locking_pos)
-        
-        if locking_pos != -1 and access_pos != -1 and access_pos > locking_pos:
-            # Replace everything from 'locking' to end of 'access' with a space
-            one_sql = one_sql[:locking_pos] + ' ' + one_sql[access_pos + 6:]
-    
-    # Remove NONSEQUENCED...TRANSACTIONTIME clause
-    one_sql_lower = one_sql.lower()
-    if 'nonsequenced' in one_sql_lower and 'transactiontime' in one_sql_lower:
-        # Find position of 'nonsequenced' and 'transactiontime'
-        nonsequenced_pos = one_sql_lower.find('nonsequenced')
-        transactiontime_pos = one_sql_lower.find('transactiontime', nonsequenced_pos)
-        
-        if nonsequenced_pos != -1 and transactiontime_pos != -1 and transactiontime_pos > nonsequenced_pos:
-            # Replace everything from 'nonsequenced' to end of 'transactiontime' with a space
-            one_sql = one_sql[:nonsequenced_pos] + ' ' + one_sql[transactiontime_pos + 15:]
-
-    # Remove SEQUENCED...TRANSACTIONTIME clause
-    one_sql_lower = one_sql.lower()
-    if 'sequenced' in one_sql_lower and 'transactiontime' in one_sql_lower:
-        # Find position of 'sequenced' and 'transactiontime'
-        sequenced_pos = one_sql_lower.find('sequenced')
-        transactiontime_pos = one_sql_lower.find('transactiontime', sequenced_pos)
-        
-        if sequenced_pos != -1 and transactiontime_pos != -1 and transactiontime_pos > sequenced_pos:
-            # Replace everything from 'sequenced' to end of 'transactiontime' with a space
-            one_sql = one_sql[:sequenced_pos] + ' ' + one_sql[transactiontime_pos + 15:]
+    one_sql = preprocess_query(one_sql)
 
     if len(one_sql.strip()) == 0:
-        return (dataframe_rows, False, "EmptyQuery", "Empty query string", one_sql, file_nme)  # Empty query counts as failure
-    
+        return (dataframe_rows, False, "EmptyQuery", "Empty query string", one_sql, file_nme, None, query_idx, None)  # Empty query counts as failure
+
+    cache_state = None
+    if _lineage_cache is not None:
+        if timer:
+            timer.enter('cache')
+        cache_key = make_cache_key(one_sql, _lineage_engine)
+        cached = _lineage_cache.get(cache_key)
+        if cached is not None:
+            success, sql_type, target_tables, source_tables, error_type, error_msg = cached
+            if not success:
+                return (dataframe_rows, False, error_type, error_msg, one_sql, file_nme, 'hit', query_idx, None)
+            if timer:
+                timer.sql_type = sql_type
+                timer.enter('rows')
+            dataframe_rows = build_lineage_rows(sql_type, target_tables, source_tables, file_nme, custom_name)
+            return (dataframe_rows, True, None, None, one_sql, file_nme, 'hit', query_idx,
+                    (sql_type, target_tables, source_tables))
+        cache_state = 'miss'
+
     try:
-        parsed_sql = parse_one(one_sql, dialect="teradata")
-        sql_type = type(parsed_sql).__name__
-
-        if sql_type == 'Delete':
-            tables_involved = [table.db + "." + table.name for table in parsed_sql.find_all(exp.Table)]
-            if tables_involved:
-                child_table = tables_involved[0]
-                parent_tables = tables_involved[1:]
-                for parent in parent_tables:
+        sql_type, target_tables, source_tables = extract_lineage(one_sql, _lineage_engine, timer)
+        if timer:
+            timer.enter('rows')
+        dataframe_rows = build_lineage_rows(sql_type, target_tables, source_tables, file_nme, custom_name)
+        if cache_state:
+            if timer:
+                timer.enter('cache')
+            _lineage_cache.put_lineage(cache_key, sql_type, target_tables, source_tables)
+
+        # Successfully processed
+        return (dataframe_rows, True, None, None, one_sql, file_nme, cache_state, query_idx,
+                (sql_type, target_tables, source_tables))
+
+    except Exception as e:
+        # Failed to process this query - capture error type and message
+        error_type = type(e).__name__
+        error_msg = str(e)  # Full error message
+        if cache_state and isinstance(e, CACHEABLE_ERRORS):
+            if timer:
+                timer.enter('cache')
+            _lineage_cache.put_error(cache_key, error_type, error_msg)
+        return (dataframe_rows, False, error_type, error_msg, one_sql, file_nme, cache_state, query_idx, None)
+
+
+def extract_lineage(one_sql, lineage_engine=DEFAULT_LINEAGE_ENGINE, timer=None):
+    """Parse a preprocessed statement and return its table lineage.
+
+    With the 'native' engine the parse_one tree is walked directly and
+    LineageRunner only runs for statements the AST walker can't decide.
+    timer, a lineageProfile.StageTimer, is moved through the stages as they run.
+
+    Returns:
+        Tuple of (sql_type, target_tables, source_tables)
+    """
+    if timer:
+        timer.enter('parse')
+    parsed_sql = parse_one(one_sql, dialect="teradata")
+    sql_type = type(parsed_sql).__name__
+    if timer:
+        timer.sql_type = sql_type
+
+    if sql_type == 'Delete':
+        tables_involved = [table.db + "." + table.name for table in parsed_sql.find_all(exp.Table)]
+        return sql_type, tables_involved[:1], tables_involved[1:]
+
+    if lineage_engine == 'native':
+        if timer:
+            timer.enter('native_lineage')
+        native_lineage = extract_table_lineage(parsed_sql)
+        if native_lineage is not None:
+            target_tables, source_tables = native_lineage
+            return sql_type, target_tables, source_tables
+
+    try:
+        if timer:
+            timer.enter('transpile')
+        tsql = sqlglot.transpile(one_sql, read="teradata", write="tsql")[0]
+        if timer:
+            timer.enter('lineage_runner')
+        # Don't print in multiprocessing - it serializes execution
+        result = LineageRunner(tsql, dialect='tsql', verbose=False)
+        target_tables = [str(table) for table in result.target_tables]
+        source_tables = [str(table) for table in result.source_tables]
+    except Exception:
+        # Silent fallback for parallel processing
+        if timer:
+            timer.enter('fallback_runner')
+        result = LineageRunner(one_sql, dialect='teradata', verbose=False)
+        target_tables = [str(table) for table in result.target_tables]
+        source_tables = [str(table) for table in result.source_tables]
+    return sql_type, target_tables, source_tables
+
+
+def build_lineage_rows(sql_type, target_tables, source_tables, file_nme, custom_name):
+    """Turn extracted target/source tables into childTableName/parentTableName rows."""
+    dataframe_rows = []
+    if sql_type == 'Delete':
+        for child_table in target_tables:
+            for parent in source_tables:
+                dataframe_rows.append({
+                    "script_file": file_nme,
+                    "childTableName": clean_table_name(child_table, file_nme),
+                    "relationship": sql_type,
+                    "parentTableName": clean_table_name(parent, file_nme)
+                })
+    elif sql_type == "Select":
+        for parent in source_tables:
+            dataframe_rows.append({
+                "script_file": file_nme,
+                "childTableName": custom_name + '-' + file_nme,
+                "relationship": sql_type,
+                "parentTableName": clean_table_name(parent, file_nme)
+            })
+    else:
+        if source_tables:
+            for child in target_tables:
+                for parent in source_tables:
                     dataframe_rows.append({
                         "script_file": file_nme,
-                        "childTableName": clean_table_name(child_table, file_nme),
+                        "childTableName": clean_table_name(child, file_nme),
                         "relationship": sql_type,
                         "parentTableName": clean_table_name(parent, file_nme)
                     })
         else:
+            for child in target_tables:
+                dataframe_rows.append({
+                    "script_file": file_nme,
+                    "childTableName": clean_table_name(child, file_nme),
+                    "relationship": sql_type,
+                    "parentTableName": None
+                })
+    return dataframe_rows
+
+
+def pool_error_result(query_data, error_type, error_info):
+    """Result tuple for a statement the pool had to abandon (timeout or worker crash)."""
+    (file_nme, one_sql), custom_name, query_idx = query_data
+    return ([], False, error_type, error_info, one_sql, file_nme, None, query_idx, None)
+
+
+def duplicate_result(outcome, duplicate, custom_name):
+    """Result tuple for a deduplicated statement, built from its representative's outcome."""
+    success, error_type, error_info, lineage = outcome
+    query_idx, file_nme, one_sql = duplicate
+    dataframe_rows = build_lineage_rows(*lineage, file_nme, custom_name) if lineage else []
+    return (dataframe_rows, success, error_type, error_info, preprocess_query(one_sql), file_nme, None, query_idx, lineage)
+
+
+def fan_out_duplicates(results, outcomes, waiting, ready, custom_name):
+    """Yield every pool result followed by the fanned-out results of its duplicates.
+
+    Args:
+        results: Result tuples of the representative statements
+        outcomes: representative index -> (success, error_type, error_info, lineage), filled in here
+        waiting: representative index -> duplicates queued before its result arrived
+        ready: deque of (representative index, duplicate) queued after it arrived
+        custom_name: Name passed through to the duplicates' lineage rows
+
+    Returns:
+        Generator of result tuples
+    """
+    for result in results:
+        yield result
+        idx = result[7]
+        outcomes[idx] = (result[1], result[2], result[3], result[8])
+        for duplicate in waiting.pop(idx, ()):
+            yield duplicate_result(outcomes[idx], duplicate, custom_name)
+        while ready:
+            representative, duplicate = ready.popleft()
+            yield duplicate_result(outcomes[representative], duplicate, custom_name)
+    # The pool's feeder thread may queue a duplicate just after the last result was handled
+    while ready:
+        representative, duplicate = ready.popleft()
+        yield duplicate_result(outcomes[representative], duplicate, custom_name)
+    for representative, duplicates in waiting.items():
+        for duplicate in duplicates:
+            yield duplicate_result(outcomes[representative], duplicate, custom_name)
+    waiting.clear()
+
+
+def shard_result(shard_writer, result, fan_out=True):
+    """Write a result's rows and error to shard files and return the compact result tuple.
+
+    The compact tuple has the same fields as process_single_query's, with the
+    number of rows written in place of the rows and without the statement
+    text. Unless fan_out, the error message and lineage are dropped too; they
+    are only needed to build the results of deduplicated statements.
+    """
+    dataframe_rows, success, error_type, error_info, query_text, file_nme, cache_state, query_idx, lineage = result
+    relation_values = itemgetter(*RELATION_COLUMNS)
+    shard_writer.write_lineage([(query_idx, *relation_values(row)) for row in dataframe_rows])
+    if not success and error_type:
+        shard_writer.write_error((query_idx, file_nme, query_text, error_type, error_info))
+    if not fan_out:
+        error_info, lineage = None, None
+    return (len(dataframe_rows), success, error_type, error_info, None, file_nme, cache_state, query_idx, lineage)
+
+
+def process_sharded_query(query_data):
+    """process_single_query for shard output: rows go to this worker's shards, counters to the parent."""
+    result = process_single_query(query_data)
+    if _stage_timer is not None:
+        _stage_timer.enter('shard_write')
+    return shard_result(_shard_writer, result, _shard_fan_out)
+
+
+def process_profiled_query(query_data):
+    """process_single_query (process_sharded_query with shard output) with per-stage timings.
+
+    Returns:
+        Tuple of (result, profile) with profile from lineageProfile.StageTimer.finish
+    """
+    global _stage_timer
+    _stage_timer = StageTimer()
+    try:
+        result = process_sharded_query(query_data) if _shard_writer is not None else process_single_query(query_data)
+        return result, _stage_timer.finish()
+    finally:
+        _stage_timer = None
+
+
+def process_timed_query(task, query_data):
+    """Run task on one statement and return (its result, TaskTiming) with wall-clock start and end."""
+    started = time.time()
+    value = task(query_data)
+    return value, TaskTiming(os.getpid(), started, time.time())
+
+
+def process_timed_chunk(task, chunk):
+    """process_timed_query for every statement of a chunk."""
+    return [process_timed_query(task, query_data) for query_data in chunk]
+
+
+def merge_shards(run_dir, result_order, error_offsets, dedupe_rows=True):
+    """Read a run's shards back as the lineage DataFrame and the error details.
+
+    Rows are put in the order the parent received their statements' results,
+    as if they had been collected in the parent.
+
+    Args:
+        run_dir: Run directory the shards were written to
+        result_order: Position of each query index in the parent's result order
+        error_offsets: Query index -> (start_offset, end_offset) of failed statements
+        dedupe_rows: Keep each script/child/relationship/parent row once
+
+    Returns:
+        Tuple of (lineage DataFrame, duplicate rows dropped, error DataFrame)
+    """
+    order = np.frombuffer(result_order, dtype=np.int64) if len(result_order) else np.empty(0, dtype=np.int64)
+
+    lineage = read_shards(run_dir, LINEAGE_SHARD_PREFIX, ['query_index'] + RELATION_COLUMNS)
+    lineage = lineage.iloc[np.argsort(order[lineage['query_index'].to_numpy()], kind='stable')]
+    df = lineage[RELATION_COLUMNS].reset_index(drop=True)
+    rows_read = len(df)
+    if dedupe_rows:
+        df = df.drop_duplicates(ignore_index=True)
+    elif rows_read:
+        # Repeats follow their first occurrence, as EdgeStore.to_frame(expand_duplicates=True) gives them
+        first_seen = df.groupby(RELATION_COLUMNS, dropna=False, sort=False).ngroup().to_numpy()
+        df = df.iloc[np.argsort(first_seen, kind='stable')].reset_index(drop=True)
+    if df.empty:
+        df = pd.DataFrame()
+
+    errors = read_shards(run_dir, ERROR_SHARD_PREFIX, SHARD_ERROR_COLUMNS)
+    errors = errors.iloc[np.argsort(order[errors['query_index'].to_numpy()], kind='stable')].reset_index(drop=True)
+    offsets = [error_offsets.get(idx, (None, None)) for idx in errors['query_index'].tolist()]
+    errors['start_offset'] = pd.array([start for start, _ in offsets], dtype='Int64')
+    errors['end_offset'] = pd.array([end for _, end in offsets], dtype='Int64')
+    return df, rows_read - len(df), errors[ERROR_COLUMNS]
+
+
+def init_worker(cache_path=None, cache_max_entries=DEFAULT_MAX_ENTRIES, lineage_engine=DEFAULT_LINEAGE_ENGINE,
+                shard_run_dir=None, shard_fan_out=True):
+    """Pool initializer: open this worker's connection to the lineage cache, pick the engine
+    and, with shard output, set up this worker's shard files."""
+    global _lineage_cache, _lineage_engine, _shard_writer, _shard_fan_out
+    _lineage_cache = LineageCache(cache_path, cache_max_entries) if cache_path else None
+    _lineage_engine = lineage_engine
+    _shard_writer = ShardWriter(shard_run_dir) if shard_run_dir else None
+    _shard_fan_out = shard_fan_out
+
+
+class StreamingOutputWriter:
+    """Appends lineage and error rows to the output files in batches as results arrive.
+
+    Rows are typed and upper-cased per batch exactly as main() does for the
+    full DataFrame, so the files match the non-streaming output.
+    """
+
+    def __init__(self, custom_name, types_file_path=None, input_path=None,
+                 batch_size=DEFAULT_STREAM_BATCH_SIZE, output_format=DEFAULT_OUTPUT_FORMAT):
+        self.custom_name = custom_name
+        self.relations_path = output_path("./Relationships/" + custom_name + "-relations.csv", output_format)
+        self.error_path = output_path("./error/" + custom_name + '-error_details.csv', output_format)
+        self.relations_appender = TableAppender(self.relations_path)
+        self.error_appender = TableAppender(self.error_path, encoding='utf-8-sig')
+        self.batch_size = batch_size
+        self.apply_types = bool(types_file_path)
+        self.type_catalog = None
+        if self.apply_types:
             try:
-                tsql = sqlglot.transpile(one_sql, read="teradata", write="tsql")[0]
-                # Don't print in multiprocessing - it serializes execution
-                result = LineageRunner(tsql, dialect='tsql', verbose=False)
-                target_tables = [str(table) for table in result.target_tables]
-                source_tables = [str(table) for table in result.source_tables]
-            except Exception:
-                # Silent fallback for parallel processing
-                result = LineageRunner(one_sql, dialect='teradata', verbose=False)
-                target_tables = [str(table) for table in result.target_tables]
-                source_tables = [str(table) for table in result.source_tables]
-
-            if sql_type == "Select":
-                for parent in source_tables:
-                    dataframe_rows.append({
-                        "script_file": file_nme,
-                        "childTableName": custom_name + '-' + file_nme,
-                        "relationship": sql_type,
-                        "parentTableName": clean_table_name(parent, file_nme)
-                    })
-            else:
-                if source_tables:
-                    for child in target_tables:
-                        for parent in source_tables:
-                            dataframe_rows.append({
-                                "script_file": file_nme,
-                                "childTableName": clean_table_name(child, file_nme),
-                                "relationship": sql_type,
-                                "parentTableName": clean_table_name(parent, file_nme)
-                            })
-                else:
-                    for child in target_tables:
-                        dataframe_rows.append({
-                            "script_file": file_nme,
-                            "childTableName": clean_table_name(child, file_nme),
-                            "relationship": sql_type,
-                            "parentTableName": None
-                        })
-        
-        # Successfully processed
-        return (dataframe_rows, True, None, None, one_sql, file_nme)
+                self.type_catalog = load_type_catalog(types_file_path, input_path)
+            except Exception as e:
+                logger.error(f"Error processing object types file: {e}")
+        self.pending_rows = []
+        self.pending_errors = []
+        self.first_output_time = None
 
-    except Exception as e:
-        # Failed to process this query - capture error type and message
-        error_type = type(e).__name__
-        error_msg = str(e)  # Full error message
-        return (dataframe_rows, False, error_type, error_msg, one_sql, file_nme)
+    @property
+    def rows_written(self):
+        return self.relations_appender.rows_written
+
+    @property
+    def errors_written(self):
+        return self.error_appender.rows_written
+
+    def add_rows(self, rows):
+        self.pending_rows.extend(rows)
+        if len(self.pending_rows) >= self.batch_size:
+            self.flush_rows()
+
+    def add_error(self, error_row):
+        self.pending_errors.append(error_row)
+        if len(self.pending_errors) >= self.batch_size:
+            self.flush_errors()
+
+    def flush_rows(self):
+        if not self.pending_rows:
+            return
+        df = pd.DataFrame(self.pending_rows, columns=RELATION_COLUMNS)
+        if self.apply_types:
+            df = apply_table_types(df, self.type_catalog, self.custom_name)
+        df = uppercase_output(df)
+        self.relations_appender.append(df)
+        self.pending_rows = []
+        self._mark_output()
+
+    def flush_errors(self):
+        if not self.pending_errors:
+            return
+        error_df = pd.DataFrame(self.pending_errors, columns=ERROR_COLUMNS)
+        self.error_appender.append(error_df)
+        self.pending_errors = []
+        self._mark_output()
+
+    def close(self):
+        self.flush_rows()
+        self.flush_errors()
+        self.relations_appender.close()
+        self.error_appender.close()
+
+    def _mark_output(self):
+        if self.first_output_time is None:
+            self.first_output_time = time.time()
+
+
+@dataclass
+class PoolOptions:
+    """How process_with_multiprocessing dispatches statements to its workers.
+
+    statement_timeout (seconds), max_tasks_per_child and max_worker_memory_mb
+    switch to RecyclingPool: statements over budget are recorded with error
+    type 'Timeout' and workers are replaced once they hit either limit.
+
+    schedule 'cost' (see costScheduler) dispatches the most expensive
+    statements first: the plain Pool path in chunks sized by cost that shrink
+    towards the tail, RecyclingPool one statement at a time in cost order, and
+    streaming runs reordered within a look-ahead window only, so the first
+    rows still come out early. 'fifo' keeps file order. With
+    cost_history_path, the time measured for every statement is stored by
+    fingerprint and used instead of the estimate in later runs.
+
+    With profile_stages, workers time every statement stage by stage (parse,
+    transpile, LineageRunner, the Teradata fallback, ...; see lineageProfile)
+    and report their peak memory. The statistics then include per-stage
+    totals, percentiles and a histogram, and the profile_top_n slowest
+    statements with their stage breakdown are saved next to the error details.
+    """
+    statement_timeout: Optional[float] = None
+    max_tasks_per_child: Optional[int] = None
+    max_worker_memory_mb: Optional[float] = None
+    schedule: str = DEFAULT_SCHEDULE
+    cost_history_path: Optional[str] = None
+    profile_stages: bool = False
+    profile_top_n: int = DEFAULT_PROFILE_TOP_N
+
+    @property
+    def recycling(self):
+        """Whether these options need RecyclingPool."""
+        return bool(self.statement_timeout or self.max_tasks_per_child or self.max_worker_memory_mb)
+
+
+@dataclass
+class OutputOptions:
+    """Where process_with_multiprocessing puts lineage and error rows.
+
+    With stream_output, results are consumed as they complete and appended to
+    the relations and error files in batches of batch_size (typed with
+    types_file_path when given), so the parent never holds the full result
+    set; the returned DataFrame is then empty.
+
+    output_format ('csv' or 'parquet') applies to the error details and, when
+    streaming, the relations file.
+
+    With dedupe_rows the returned DataFrame has each distinct
+    script/child/relationship/parent row once; without it, rows are repeated
+    as often as they were produced.
 
+    With shard_dir, workers write their lineage and error rows to shard files
+    in a fresh run directory under shard_dir (see lineageShards) and send the
+    parent only counters, instead of pickling every row and failed statement
+    back. The shards are merged into the usual DataFrame and error details
+    once the pool is done, and the run directory is removed. It can't be
+    combined with stream_output or a shared pool.
 
-def process_with_multiprocessing(sql_content, custom_name, num_processes=None):
-    """Process queries using multiprocessing pool - processes individual queries in parallel."""
+    error_rows, when a list, receives the error rows instead of the error
+    details file (incrementalRun merges them with the rows kept from earlier
+    runs before writing). It is ignored when streaming.
+    """
+    stream_output: bool = False
+    types_file_path: Optional[str] = None
+    input_path: Optional[str] = None
+    batch_size: int = DEFAULT_STREAM_BATCH_SIZE
+    output_format: str = DEFAULT_OUTPUT_FORMAT
+    dedupe_rows: bool = True
+    shard_dir: Optional[str] = None
+    error_rows: Optional[list] = None
+
+
+def process_with_multiprocessing(sql_content, custom_name, num_processes=None,
+                                 cache_path=None, cache_max_entries=DEFAULT_MAX_ENTRIES,
+                                 lineage_engine=DEFAULT_LINEAGE_ENGINE, dedupe=True, pool=None,
+                                 pool_options=None, output_options=None):
+    """Process queries using multiprocessing pool - processes individual queries in parallel.
+
+    When cache_path is given, workers look statements up in the persistent lineage
+    cache first and only parse the ones that changed since the last run.
+    lineage_engine selects 'native' (AST walk, LineageRunner fallback) or
+    'sqllineage' (always transpile and run LineageRunner).
+
+    Statements come from statementSplitter, so semicolons inside literals and
+    comments don't split a statement, and error rows carry the byte offsets of
+    the statement in its source file. Sources given as paths or open files
+    are split from disk while the pool runs when streaming or with
+    RecyclingPool in file order; otherwise the statements are collected
+    first, to size or plan the chunks. Results are handled in statement order (completion order when
+    streaming), and the statistics report pool utilization, the straggler
+    tail and statement time percentiles.
+
+    With dedupe, statements that differ only in literals, comments, whitespace
+    or case (see statement_fingerprint) are parsed once; the lineage of the
+    representative is rebuilt for every other script file containing it.
+
+    pool lets a long-lived caller (lineageDaemon) reuse warm workers across
+    runs. It must have been created with init_worker; it is left open, and
+    num_processes, the cache and timeout settings come from the pool instead.
+
+    pool_options (PoolOptions) and output_options (OutputOptions) hold the
+    rest of the settings; the defaults apply when they are None.
+    """
     logger.info("Starting multiprocessing approach")
     start_time = time.time()
+    pool_options = pool_options or PoolOptions()
+    output_options = output_options or OutputOptions()
+    stream_output = output_options.stream_output
+    if output_options.shard_dir and (stream_output or pool is not None):
+        raise ValueError("shard_dir can't be combined with stream_output or a shared pool")
+    costs = CostTracker(pool_options.schedule, pool_options.cost_history_path)
     
     # Determine number of processes
-    if num_processes is None:
+    if pool is not None:
+        num_processes = pool.processes if isinstance(pool, RecyclingPool) else pool._processes
+    elif num_processes is None:
         num_processes = max(1, mp.cpu_count() - 1)  # Leave one core free
     
     logger.info(f"Using {num_processes} processes")
     
-    # Split SQL content into individual queries
-    #queries = [q.strip() for q in sql_content.split(';') if q.strip()]
-    queries = []
-    for file_nme, sql_txt in sql_content:
-        for q in sql_txt.split(';'):
-            if q.strip():
-                queries.append ((file_nme, q.strip()))
-    total_queries = len(queries)
-    
-    if total_queries == 0:
-        logger.error("No queries to process")
-        return pd.DataFrame(), 0
-    
-    logger.info(f"Processing {total_queries} queries in parallel")
-    
-    # Prepare query data: (query_string, custom_name, query_index)
-    query_data = [(query, custom_name, idx) for idx, query in enumerate(queries)]
-    
-    # Use chunksize to optimize process distribution
-    chunksize = max(1, total_queries // (num_processes * 4))
+    worker_args = (cache_path, cache_max_entries, lineage_engine)
+    if pool is not None:
+        use_recycling_pool = isinstance(pool, RecyclingPool)
+    else:
+        use_recycling_pool = pool_options.recycling
+    # Ordering by cost needs every statement; streaming settles for a window
+    lazy_split = stream_output or (use_recycling_pool and not costs.cost_aware)
+
+    # Split SQL content into individual queries; offsets of in-flight statements
+    # stay in the parent so error rows can point back into the source file
+    statement_offsets = {}
+
+    # Only one statement per fingerprint goes to the pool; duplicates wait for
+    # their representative's outcome. Duplicates of a statement that already
+    # completed go to ready, the rest wait in waiting until its result arrives.
+    fingerprints = {}   # fingerprint -> representative query index
+    outcomes = {}       # representative index -> (success, error_type, error_info, lineage)
+    waiting = {}        # representative index -> [(query_index, file_nme, statement)]
+    ready = deque()     # (representative index, (query_index, file_nme, statement))
+
+    def generate_query_data():
+        """Yield (query, custom_name, query_index) while recording each statement's offsets and cost."""
+        for idx, (file_nme, one_sql, start_offset, end_offset) in enumerate(iter_source_statements(sql_content)):
+            statement_offsets[idx] = (start_offset, end_offset)
+            fingerprint = statement_fingerprint(one_sql) if dedupe or costs.needs_fingerprint else None
+            if dedupe:
+                representative = fingerprints.setdefault(fingerprint, idx)
+                if representative != idx:
+                    if representative in outcomes:
+                        ready.append((representative, (idx, file_nme, one_sql)))
+                    else:
+                        waiting.setdefault(representative, []).append((idx, file_nme, one_sql))
+                    continue
+            costs.add(idx, one_sql, fingerprint)
+            yield ((file_nme, one_sql), custom_name, idx)
+
+    def unwrap(results):
+        """Record the TaskTiming and profile the pool sent with every result and yield the bare result."""
+        for item in results:
+            timing = profile = None
+            # Statements the pool abandoned come back as plain results
+            if len(item) == 2 and isinstance(item[1], TaskTiming):
+                item, timing = item
+            if len(item) == 2:
+                item, profile = item
+            query_idx = item[7]
+            if timing:
+                costs.record_timing(query_idx, timing, item[6] == 'hit')
+            elif item[2] == 'Timeout':
+                # A statement that timed out cost at least the budget
+                costs.record_cost(query_idx, pool_options.statement_timeout)
+            if profile:
+                start_offset, end_offset = statement_offsets.get(query_idx, (None, None))
+                profiler.add(profile, query_idx, item[5], item[1], start_offset, end_offset)
+            yield item
+
+    index_of = itemgetter(2)
+    chunks = None
+    if lazy_split:
+        query_data = generate_query_data()
+        if costs.cost_aware:
+            query_data = costs.windowed(query_data, index_of, DEFAULT_WINDOW_PER_PROCESS * num_processes)
+        total_queries = None
+        chunksize = DEFAULT_LAZY_CHUNKSIZE
+    else:
+        query_data = list(generate_query_data())
+        # Offsets are recorded for every statement, including duplicates that are not dispatched
+        total_queries = len(statement_offsets)
+        if total_queries == 0:
+            logger.error("No queries to process")
+            costs.close()
+            return pd.DataFrame(), 0, 0, 0
+        logger.info(f"Processing {len(query_data)} unique of {total_queries} queries in parallel")
+        # Use chunksize to optimize process distribution
+        chunksize = max(1, total_queries // (num_processes * 4))
+        if costs.cost_aware and use_recycling_pool:
+            # RecyclingPool hands out one statement at a time, so the order alone does it
+            query_data = costs.sorted(query_data, index_of)
+        elif costs.cost_aware:
+            # Longest first, in chunks of shrinking cost; chunksize only caps how many statements one holds
+            chunks = costs.chunks(query_data, index_of, num_processes, chunksize)
+            logger.info(f"Planned {len(chunks)} chunks by estimated cost")
     logger.info(f"Using chunksize of {chunksize} for process pool")
     
-    # Create a pool and process queries in parallel
-    print(f"Processing {total_queries} queries across {num_processes} CPU cores...")
-    with mp.Pool(processes=num_processes) as pool:
-        # Map individual queries to processes
-        results = pool.map(process_single_query, query_data, chunksize=chunksize)
-    print("Parallel processing completed!")
+    writer = (StreamingOutputWriter(custom_name, output_options.types_file_path, output_options.input_path,
+                                    output_options.batch_size, output_options.output_format)
+              if stream_output else None)
+    run_dir = None
+    if output_options.shard_dir:
+        # Duplicates are fanned out in the parent, into the parent's own shard;
+        # workers keep the outcome fields that needs only when dedupe is on
+        run_dir = create_run_dir(output_options.shard_dir)
+        worker_args += (run_dir, dedupe)
+        logger.info(f"Writing worker shards to {run_dir}")
+    parent_shards = ShardWriter(run_dir) if run_dir else None
+    task = process_sharded_query if run_dir else process_single_query
+    profiler = StageProfiler(pool_options.profile_top_n) if pool_options.profile_stages else None
+    if profiler:
+        task = process_profiled_query
     
     # Combine all results and count successes/failures
-    all_rows = []
+    edge_store = EdgeStore(RELATION_COLUMNS)
     successful_queries = 0
     failed_queries = 0
     error_summary = {}
     error_details_list = []  # List to store detailed error information
+    cache_hits = 0
+    cache_misses = 0
+    result_order = array('q')  # query index -> position in result order, with shard output
+    error_offsets = {}         # query index -> offsets of failed statements, with shard output
     
-    for idx, (query_result, success, error_type, error_info, query_text, file_nme) in enumerate(results):
-        all_rows.extend(query_result)
-        if success:
-            successful_queries += 1
+    # Create a pool and process queries in parallel
+    if total_queries is None:
+        print(f"Processing queries across {num_processes} CPU cores as they are split...")
+    else:
+        print(f"Processing {total_queries} queries across {num_processes} CPU cores...")
+    if pool is not None:
+        # Shared pool: leave it open and report this run's share of its cumulative counters
+        pool_context = nullcontext(pool)
+    else:
+        if use_recycling_pool:
+            pool = RecyclingPool(num_processes, init_worker, worker_args, task_timeout=pool_options.statement_timeout,
+                                 max_tasks_per_child=pool_options.max_tasks_per_child,
+                                 max_memory_mb=pool_options.max_worker_memory_mb, error_result=pool_error_result)
+        else:
+            pool = mp.Pool(processes=num_processes, initializer=init_worker, initargs=worker_args)
+        pool_context = pool
+    pool_counters = (pool.timed_out, pool.recycled, pool.crashed) if use_recycling_pool else (0, 0, 0)
+    timed_task = partial(process_timed_query, task)
+    with pool_context:
+        if stream_output:
+            # Consume results in completion order instead of waiting for the whole map
+            results = pool.imap_unordered(timed_task, query_data, chunksize=chunksize)
+        elif chunks is not None:
+            # Chunks are handed to whichever worker is free, in planned order
+            results = [timed for chunk in pool.imap_unordered(partial(process_timed_chunk, task), chunks)
+                       for timed in chunk]
         else:
-            failed_queries += 1
-            
-            # Track error types for summary
-            if error_type:
-                error_summary[error_type] = error_summary.get(error_type, 0) + 1
+            # Map individual queries to processes
+            results = pool.map(timed_task, query_data, chunksize=chunksize)
+        results = unwrap(results)
+        if costs.cost_aware and not stream_output:
+            # Dispatched longest first; handle the results in statement order as before
+            results = sorted(results, key=itemgetter(7))
+    
+        processed_queries = 0
+        if dedupe:
+            results = fan_out_duplicates(results, outcomes, waiting, ready, custom_name)
+        for result in results:
+            if parent_shards and not isinstance(result[0], int):
+                # Duplicates and statements the pool abandoned still arrive in full
+                result = shard_result(parent_shards, result)
+            query_result, success, error_type, error_info, query_text, file_nme, cache_state, idx, _ = result
+            start_offset, end_offset = statement_offsets.pop(idx, (None, None))
+            if parent_shards:
+                # Rows and error rows are already in the shards; remember where they go when merged
+                if idx >= len(result_order):
+                    result_order.extend(repeat(0, idx + 1 - len(result_order)))
+                result_order[idx] = processed_queries
+                if not success:
+                    error_offsets[idx] = (start_offset, end_offset)
+            elif writer:
+                writer.add_rows(query_result)
+            else:
+                edge_store.add_rows(query_result)
+            processed_queries += 1
+            if cache_state == 'hit':
+                cache_hits += 1
+            elif cache_state == 'miss':
+                cache_misses += 1
+            if success:
+                successful_queries += 1
+            else:
+                failed_queries += 1
                 
-                # Store detailed error info for CSV export
-                error_details_list.append({
-                    'script_file': file_nme,
-                    'query_index': idx,
-                    'sql_query': query_text,
-                    'error_type': error_type,
-                    'error_info': error_info
-                })
+                # Track error types for summary
+                if error_type:
+                    error_summary[error_type] = error_summary.get(error_type, 0) + 1
+                    
+                    if parent_shards:
+                        continue
+                    # Store detailed error info for CSV export
+                    error_row = {
+                        'script_file': file_nme,
+                        'query_index': idx,
+                        'start_offset': start_offset,
+                        'end_offset': end_offset,
+                        'sql_query': query_text,
+                        'error_type': error_type,
+                        'error_info': error_info
+                    }
+                    if writer:
+                        writer.add_error(error_row)
+                    else:
+                        error_details_list.append(error_row)
+    print("Parallel processing completed!")
+    pool_stats = costs.statistics(num_processes)
+    costs.close()
+    total_queries = processed_queries
+    unique_queries = len(outcomes) if dedupe else total_queries
+    if total_queries == 0:
+        logger.error("No queries to process")
+        if run_dir:
+            remove_run_dir(run_dir)
+        return pd.DataFrame(), time.time() - start_time, 0, 0
     
     # Create DataFrame for lineage results
-    df = pd.DataFrame(all_rows)
+    error_df = None
+    if parent_shards:
+        parent_shards.close()
+        merge_start = time.time()
+        df, duplicate_rows, error_df = merge_shards(run_dir, result_order, error_offsets, output_options.dedupe_rows)
+        shard_files = sum(1 for _ in Path(run_dir).glob('*.csv'))
+        merge_time = time.time() - merge_start
+        remove_run_dir(run_dir)
+    else:
+        df = (edge_store.to_frame(expand_duplicates=not output_options.dedupe_rows) if len(edge_store)
+              else pd.DataFrame())
+        duplicate_rows = edge_store.duplicates
+    if writer:
+        writer.close()
+        relationship_count = writer.rows_written
+        if writer.rows_written:
+            print(f"\nLineage rows streamed to: {writer.relations_path}")
+        if writer.errors_written:
+            print(f"\nDetailed error information saved to: {writer.error_path}")
+    else:
+        relationship_count = len(df)
+
+    # Keep the cache bounded now that every worker has finished writing
+    if cache_path:
+        cache = LineageCache(cache_path, cache_max_entries)
+        evicted = cache.evict()
+        cache.close()
     
     # Create DataFrame for error details and save to CSV
-    if error_details_list:
-        error_df = pd.DataFrame(error_details_list)
-        error_csv_path = "./error/" + custom_name + '-error_details.csv'
-        error_df.to_csv(error_csv_path, index=False, encoding='utf-8-sig')
-        logger.info(f"Saved {len(error_details_list)} error details to {error_csv_path}")
+    if error_df is None and error_details_list:
+        error_df = pd.DataFrame(error_details_list, columns=ERROR_COLUMNS)
+    if output_options.error_rows is not None:
+        if error_df is not None:
+            output_options.error_rows.extend(error_df.astype(object).where(error_df.notna(), None).to_dict('records'))
+    elif error_df is not None and len(error_df):
+        error_csv_path = output_path("./error/" + custom_name + '-error_details.csv', output_options.output_format)
+        write_table(error_df, error_csv_path, encoding='utf-8-sig')
+        logger.info(f"Saved {len(error_df)} error details to {error_csv_path}")
         print(f"\nDetailed error information saved to: {error_csv_path}")
+    if profiler and profiler.statements:
+        profile_path = output_path("./error/" + custom_name + '-slowest_statements.csv', output_options.output_format)
+        write_table(profiler.slowest_frame(), profile_path)
+        logger.info(f"Saved the {profiler.top_n} slowest statements to {profile_path}")
     
     elapsed_time = time.time() - start_time
     logger.info(f"Multiprocessing completed in {elapsed_time:.2f} seconds")
-    logger.info(f"Processed {len(df)} lineage relationships from {total_queries} queries")
+    logger.info(f"Processed {relationship_count} lineage relationships from {total_queries} queries")
     
     # Print statistics
     print(f"\n{'='*60}")
@@ -222,8 +818,46 @@ def process_with_multiprocessing(sql_content, custom_name, num_processes=None):
     print(f"Total queries:           {total_queries}")
     print(f"Successfully converted:  {successful_queries} ({successful_queries/total_queries*100:.1f}%)")
     print(f"Failed to convert:       {failed_queries} ({failed_queries/total_queries*100:.1f}%)")
-    print(f"Lineage relationships:   {len(df)}")
+    print(f"Lineage relationships:   {relationship_count}")
+    if not writer and output_options.dedupe_rows:
+        print(f"Duplicate rows merged:   {duplicate_rows}")
+    if dedupe:
+        duplicate_queries = total_queries - unique_queries
+        print(f"Unique statements:       {unique_queries} ({unique_queries/total_queries*100:.1f}%)")
+        print(f"Duplicates not parsed:   {duplicate_queries} ({duplicate_queries/total_queries*100:.1f}% of parsing saved)")
+    print(f"Scheduling:              {costs.description}")
+    if pool_stats:
+        print(f"Pool utilization:        {pool_stats['utilization']*100:.1f}% of {num_processes} processes "
+              f"over {pool_stats['wall_seconds']:.2f} seconds")
+        print(f"Straggler tail:          {pool_stats['tail_seconds']:.2f} seconds with idle processes at the end")
+        print(f"Statement p50/p95/p99:   {pool_stats['median_task_seconds']*1000:.1f} / "
+              f"{pool_stats['p95_task_seconds']*1000:.1f} / {pool_stats['p99_task_seconds']*1000:.1f} ms "
+              f"(max {pool_stats['max_task_seconds']*1000:.1f} ms)")
+    if costs.history_path:
+        print(f"Measured costs reused:   {costs.history_known} of {unique_queries} statements")
+    if run_dir:
+        print(f"Shard files merged:      {shard_files} ({merge_time:.2f} seconds)")
+    if cache_path:
+        print(f"Cache hits:              {cache_hits} ({cache_hits/total_queries*100:.1f}%)")
+        print(f"Cache misses:            {cache_misses}")
+        print(f"Cache evictions:         {evicted}")
+    if use_recycling_pool:
+        timed_out, recycled, crashed = (pool.timed_out - pool_counters[0], pool.recycled - pool_counters[1],
+                                        pool.crashed - pool_counters[2])
+        print(f"Timed out statements:    {timed_out}")
+        print(f"Workers recycled:        {recycled}")
+        if crashed:
+            print(f"Worker crashes:          {crashed}")
+    if writer:
+        peak_rss = get_peak_rss_mb()
+        first_output = (f"{writer.first_output_time - start_time:.2f} seconds"
+                        if writer.first_output_time else "n/a")
+        print(f"Time to first output:    {first_output}")
+        print(f"Parent peak RSS:         {f'{peak_rss:.1f} MB' if peak_rss is not None else 'n/a'}")
     print(f"{'='*60}")
+    if profiler and profiler.statements:
+        profiler.print_summary()
+        print(f"\nSlowest statements report saved to: {profile_path}")
     
     # Print error breakdown if there are failures
     if failed_queries > 0 and error_summary:
@@ -238,11 +872,21 @@ def process_with_multiprocessing(sql_content, custom_name, num_processes=None):
         print(f"  • UnsupportedError: SQL dialect features not recognized")
         print(f"  • AttributeError: Missing required SQL elements (tables, etc.)")
         print(f"  • TokenError: Invalid SQL tokens or characters")
+        print(f"  • Timeout: Statement exceeded the per-statement time budget")
     print()
     
     return df, elapsed_time, successful_queries, failed_queries
 
 
+def apply_table_types(df, type_catalog, custom_name):
+    """Add childTableType and parentTableType columns using a catalog from load_type_catalog."""
+    if type_catalog is None:
+        return apply_default_types(df, custom_name)
+    df = type_catalog.apply(df, custom_name)
+    logger.info("Added childTableType and parentTableType columns")
+    return df
+
+
 def add_table_types(df, types_file_path, input_path, custom_name):
     """Add childTableType and parentTableType columns to the DataFrame."""
     if df.empty:
@@ -251,77 +895,30 @@ def add_table_types(df, types_file_path, input_path, custom_name):
     
     if not types_file_path or not Path(types_file_path).exists():
         logger.info("Skipping table types lookup - defaulting all to View")
-        df['childTableType'] = df['childTableName'].apply(lambda x: 'Unknown' if x == custom_name else 'View')
-        df['parentTableType'] = 'View'
-        return df
+        return apply_table_types(df, None, custom_name)
     
     try:
-        # Read the object types file
-        types_df = pd.read_csv(types_file_path)
-        logger.info(f"Loaded object types from {types_file_path}")
-        
-        # If input was an Excel file with view_name column, add those views to the types
-        if input_path and Path(input_path).exists():
-            input_file = Path(input_path)
-            if input_file.suffix.lower() in ['.xlsx', '.xls', '.xlsm']:
-                try:
-                    views_df = pd.read_excel(input_path)
-                    if 'view_name' in views_df.columns:
-                        logger.info(f"Found view_name column in {input_file.name}")
-                        unique_views = views_df['view_name'].dropna().unique()
-                        logger.info(f"Adding {len(unique_views)} unique views to ObjectTypes")
-                        
-                        # Create new entries for views not already in types_df
-                        new_views = []
-                        for view_name in unique_views:
-                            view_name_str = str(view_name).strip()
-                            if view_name_str.upper() not in [str(x).strip().upper() for x in types_df['obj_name']]:
-                                new_views.append({'obj_name': view_name_str, 'TableKind': 'V'})
-                        
-                        if new_views:
-                            new_views_df = pd.DataFrame(new_views)
-                            types_df = pd.concat([types_df, new_views_df], ignore_index=True)
-                            logger.info(f"Added {len(new_views)} new views to ObjectTypes")
-                except Exception as e:
-                    logger.warning(f"Could not extract view names from Excel file: {e}")
-        
-        # Create a dictionary for fast lookup: obj_name -> TableKind
-        type_lookup = {}
-        for _, row in types_df.iterrows():
-            obj_name = str(row['obj_name']).strip().upper()
-            table_kind = str(row['TableKind']).strip()
-            type_lookup[obj_name] = table_kind
-        
-        # Function to get table type
-        def get_table_type(table_name, is_query_name=False):
-            if pd.isna(table_name) or table_name is None:
-                return None
-            if is_query_name:
-                return 'Unknown'
-            clean_name = str(table_name).strip().upper()
-            type_code = type_lookup.get(clean_name, 'VolTable')
-            if type_code == 'V':
-                return 'View'
-            elif type_code == 'T':
-                return 'Table'
-            else:
-                return 'VolTable'
-        
-        # Add childTableType and parentTableType columns
-        df['childTableType'] = df['childTableName'].apply(
-            lambda x: get_table_type(x, is_query_name=(x == custom_name))
-        )
-        df['parentTableType'] = df['parentTableName'].apply(get_table_type)
-        logger.info("Added childTableType and parentTableType columns")
-        
+        df = apply_table_types(df, load_type_catalog(types_file_path, input_path), custom_name)
     except Exception as e:
         logger.error(f"Error processing object types file: {e}")
-        df['childTableType'] = df['childTableName'].apply(lambda x: 'Unknown' if x == custom_name else 'View')
-        df['parentTableType'] = 'View'
+        df = apply_table_types(df, None, custom_name)
     
     return df
 
 
+def uppercase_output(df):
+    """Upper-case column names and string values the way the relations CSV is written."""
+    # Convert all column names to uppercase
+    df.columns = df.columns.str.upper()
+    # Convert all string data in the DataFrame to uppercase; each distinct value is
+    # upper-cased once and shared by its rows instead of copied per row
+    for col in df.select_dtypes(include=['object', 'str']).columns:
+        codes, uniques = pd.factorize(df[col])
+        upper = np.append(np.array([str(value).upper() for value in uniques], dtype=object), None)
+        df[col] = pd.Series(upper[codes], index=df.index, dtype=df[col].dtype)
+    return df
+
+
 def main():
     """Main execution function for multiprocessing parser."""
     print("\n" + "="*60)
@@ -336,23 +933,81 @@ def main():
     if not input_path:
         input_path = 'query.txt'
     
-    # Read queries from the input
-    logger.info("Reading queries from input...")
-    read_start = time.time()
-    sql = read_queries_from_input(input_path)
-    read_time = time.time() - read_start
-    logger.info(f"Queries read in {read_time:.2f} seconds")
-    
-    if not sql:
+    query_files = list_query_files(input_path)
+    if not query_files:
         logger.error("No queries found to process. Exiting.")
         return
     
+    # Text files are streamed from disk by the splitter, so only Excel loading needs workers
+    excel_processes_input = input(f"Enter number of Excel reader processes (press Enter for default {DEFAULT_EXCEL_PROCESSES}): ").strip()
+    excel_processes = int(excel_processes_input) if excel_processes_input else DEFAULT_EXCEL_PROCESSES
+    
+    # Workbooks load in the background while text files are split; per-file read
+    # times (for text files, the splitter's reads) are reported at the end
+    read_times = {}
+    sql = iter_queries_from_files(query_files, stream=True, excel_processes=excel_processes,
+                                  read_times=read_times)
+    
     # Ask for number of processes
     num_processes_input = input(f"Enter number of processes to use (press Enter for default {max(1, mp.cpu_count() - 1)}): ").strip()
     num_processes = int(num_processes_input) if num_processes_input else None
     
+    # Ask for the lineage cache location
+    cache_input = input(f"Enter path to lineage cache (press Enter for default '{DEFAULT_CACHE_PATH}', 'none' to disable): ").strip()
+    if not cache_input:
+        cache_path = DEFAULT_CACHE_PATH
+    elif cache_input.lower() == 'none':
+        cache_path = None
+    else:
+        cache_path = cache_input
+    
+    # Ask for the per-statement time budget
+    timeout_input = input("Enter per-statement time budget in seconds (press Enter for no limit): ").strip()
+    statement_timeout = float(timeout_input) if timeout_input else None
+    pool_options = PoolOptions(statement_timeout=statement_timeout, max_tasks_per_child=DEFAULT_MAX_TASKS_PER_CHILD,
+                               max_worker_memory_mb=DEFAULT_MAX_WORKER_MEMORY_MB)
+    # Measured statement costs are kept next to the lineage cache, for the scheduler
+    pool_options.cost_history_path = DEFAULT_COST_HISTORY_PATH if cache_path else None
+    
+    # Ask for the output format
+    format_input = input(f"Enter output format (csv/parquet, press Enter for default '{DEFAULT_OUTPUT_FORMAT}'): ").strip().lower()
+    output_format = format_input or DEFAULT_OUTPUT_FORMAT
+    if output_format not in OUTPUT_FORMATS:
+        logger.warning(f"Unknown output format '{output_format}', using '{DEFAULT_OUTPUT_FORMAT}'")
+        output_format = DEFAULT_OUTPUT_FORMAT
+    output_options = OutputOptions(input_path=input_path, output_format=output_format)
+    
+    # Per-stage timings cost a little per statement, so they are opt-in
+    profile_input = input("Record per-stage timings and a slowest statements report? (y/n, press Enter for n): ").strip().lower()
+    pool_options.profile_stages = profile_input == 'y'
+    
+    # Streaming writes rows while the pool runs, so types must be known up front
+    stream_output = input("Stream results to the output files as they complete? (y/n, press Enter for n): ").strip().lower() == 'y'
+    if stream_output:
+        output_options.stream_output = True
+        output_options.types_file_path = input("Enter path to object types CSV file (press Enter to skip): ").strip()
+        _, processing_time, successful_queries, failed_queries = process_with_multiprocessing(
+            sql, custom_name, num_processes, cache_path=cache_path, pool_options=pool_options,
+            output_options=output_options
+        )
+        print("\n" + "="*60)
+        print("PROCESSING COMPLETE - STREAMING MULTIPROCESSING APPROACH")
+        print("="*60)
+        print(f"Query reading + processing time: {processing_time:.2f} seconds")
+        print(f"Total time: {processing_time:.2f} seconds")
+        print("="*60 + "\n")
+        print_read_times(read_times)
+        return
+    
+    # Workers can write their rows to shard files instead of sending them back
+    shard_input = input(f"Write worker output to shard files under '{DEFAULT_SHARD_DIR}'? (y/n, press Enter for n): ").strip().lower()
+    output_options.shard_dir = DEFAULT_SHARD_DIR if shard_input == 'y' else None
+    
     # Process the queries with multiprocessing
-    df, processing_time, successful_queries, failed_queries = process_with_multiprocessing(sql, custom_name, num_processes)
+    df, processing_time, successful_queries, failed_queries = process_with_multiprocessing(
+        sql, custom_name, num_processes, cache_path=cache_path, pool_options=pool_options,
+        output_options=output_options
+    )
     
     # Add table types
     types_file_path = input("Enter path to object types CSV file (press Enter to skip): ").strip()
@@ -363,15 +1018,11 @@ def main():
         logger.info(f"Types added in {types_time:.2f} seconds")
     
     # Save to CSV
-    csv_path = "./Relationships/" + custom_name + "-relations.csv"
+    csv_path = output_path("./Relationships/" + custom_name + "-relations.csv", output_format)
     if not df.empty:
         save_start = time.time()
-        # Convert all column names to uppercase
-        df.columns = df.columns.str.upper()
-        # Convert all string (object) data in the DataFrame to uppercase
-        for col in df.select_dtypes(include=['object']).columns:
-            df[col] = df[col].str.upper()
-        df.to_csv(csv_path, index=False)
+        df = uppercase_output(df)
+        write_table(df, csv_path)
         save_time = time.time() - save_start
         logger.info(f"CSV saved in {save_time:.2f} seconds")
         logger.info(f"Lineage saved to {csv_path}")
@@ -381,15 +1032,15 @@ def main():
         print("PROCESSING COMPLETE - MULTIPROCESSING APPROACH")
         print("="*60)
         print(f"Total rows generated: {len(df)}")
-        print(f"Query reading time: {read_time:.2f} seconds")
-        print(f"Query processing time: {processing_time:.2f} seconds")
+        print(f"Query reading + processing time: {processing_time:.2f} seconds")
         if types_file_path:
             print(f"Type matching time: {types_time:.2f} seconds")
-            print(f"Total time: {read_time + processing_time + types_time + save_time:.2f} seconds")
+            print(f"Total time: {processing_time + types_time + save_time:.2f} seconds")
         else:
-            print(f"Total time: {read_time + processing_time + save_time:.2f} seconds")
+            print(f"Total time: {processing_time + save_time:.2f} seconds")
         print(f"Output file: {csv_path}")
         print("="*60 + "\n")
+        print_read_times(read_times)
         
         # Show sample of results
         print("\n--- Sample Results (first 10 rows) ---")
@@ -7,6 +7,8 @@ import os
 from pathlib import Path
 import time
 from helper import read_queries_from_input, clean_table_name
+from statementSplitter import iter_source_statements
+from typeCatalog import load_type_catalog, apply_default_types
 
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -16,9 +18,7 @@ def process_queries(sql_content, custom_name):
     """Process SQL queries and generate lineage data."""
     dataframe_rows = []
     
-    for one_sql in sql_content.split(';'):
-        if len(one_sql.strip()) == 0:
-            continue
+    for file_nme, one_sql, start_offset, end_offset in iter_source_statements(sql_content):
         try:
             parsed_sql = parse_one(one_sql, dialect='teradata')
             sql_type = type(parsed_sql).__name__
@@ -139,78 +139,18 @@ if __name__ == "__main__":
         types_start_time = time.time()
         if types_file_path and Path(types_file_path).exists():
             try:
-                # Read the object types file
-                types_df = pd.read_csv(types_file_path)
-                logger.info(f"Loaded object types from {types_file_path}")
-                
-                # If input was an Excel file with view_name column, add those views to the types
-                if input_path and Path(input_path).exists():
-                    input_file = Path(input_path)
-                    if input_file.suffix.lower() in ['.xlsx', '.xls', '.xlsm']:
-                        try:
-                            views_df = pd.read_excel(input_path)
-                            if 'view_name' in views_df.columns:
-                                logger.info(f"Found view_name column in {input_file.name}")
-                                unique_views = views_df['view_name'].dropna().unique()
-                                logger.info(f"Adding {len(unique_views)} unique views to ObjectTypes")
-                                
-                                # Create new entries for views not already in types_df
-                                new_views = []
-                                for view_name in unique_views:
-                                    view_name_str = str(view_name).strip()
-                                    if view_name_str.upper() not in [str(x).strip().upper() for x in types_df['obj_name']]:
-                                        new_views.append({'obj_name': view_name_str, 'TableKind': 'V'})
-                                
-                                if new_views:
-                                    new_views_df = pd.DataFrame(new_views)
-                                    types_df = pd.concat([types_df, new_views_df], ignore_index=True)
-                                    logger.info(f"Added {len(new_views)} new views to ObjectTypes")
-                        except Exception as e:
-                            logger.warning(f"Could not extract view names from Excel file: {e}")
-                
-                # Create a dictionary for fast lookup: obj_name -> TableKind
-                # Handle case-insensitive matching and strip whitespace
-                type_lookup = {}
-                for _, row in types_df.iterrows():
-                    obj_name = str(row['obj_name']).strip().upper()
-                    table_kind = str(row['TableKind']).strip()
-                    type_lookup[obj_name] = table_kind
-                
-                # Function to get table type - defaults to 'View' for unknown tables
-                def get_table_type(table_name, is_query_name=False):
-                    if pd.isna(table_name) or table_name is None:
-                        return None
-                    # If it's the query name, return 'Unknown'
-                    if is_query_name:
-                        return 'Unknown'
-                    # Clean the table name and convert to uppercase for matching
-                    clean_name = str(table_name).strip().upper()
-                    # Get the type code (V or T)
-                    type_code = type_lookup.get(clean_name, 'V')
-                    # Convert to full names
-                    if type_code == 'V':
-                        return 'View'
-                    elif type_code == 'T':
-                        return 'Table'
-                    else:
-                        return 'View'
-                
-                # Add childTypes and parentTypes columns
-                # Check if childTableName is the custom query name
-                df['childTypes'] = df['childTableName'].apply(
-                    lambda x: get_table_type(x, is_query_name=(x == custom_name))
-                )
-                df['parentTypes'] = df['parentTableName'].apply(get_table_type)
+                # Unknown kinds default to View here, unlike the multiprocessing parser
+                type_catalog = load_type_catalog(types_file_path, input_path)
+                df = type_catalog.apply(df, custom_name, child_column='childTypes',
+                                        parent_column='parentTypes', default='View')
                 logger.info("Added childTypes and parentTypes columns")
             except Exception as e:
                 logger.error(f"Error processing object types file: {e}")
                 logger.exception("Full traceback:")
-                df['childTypes'] = df['childTableName'].apply(lambda x: 'Unknown' if x == custom_name else 'View')
-                df['parentTypes'] = 'View'
+                df = apply_default_types(df, custom_name, child_column='childTypes', parent_column='parentTypes')
         else:
             logger.info("Skipping table types lookup - defaulting all to View")
-            df['childTypes'] = df['childTableName'].apply(lambda x: 'Unknown' if x == custom_name else 'View')
-            df['parentTypes'] = 'View'
+            df = apply_default_types(df, custom_name, child_column='childTypes', parent_column='parentTypes')
         
         if types_file_path:
             types_time = time.time() - types_start_time
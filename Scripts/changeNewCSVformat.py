@@ -1,7 +1,12 @@
+import sys
 import pandas as pd
 
-# Read the CSV file
-df = pd.read_csv('test.csv')
+# Read the input file (CSV by default, or the Parquet output of the parsers)
+input_file = sys.argv[1] if len(sys.argv) > 1 else 'test.csv'
+if input_file.lower().endswith('.parquet'):
+    df = pd.read_parquet(input_file)
+else:
+    df = pd.read_csv(input_file)
 
 print("Original Data Shape:", df.shape)
 print("\n" + "="*80 + "\n")
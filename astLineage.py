@@ -0,0 +1,203 @@
+"""
+Native table-lineage extraction from an already-parsed sqlglot AST.
+
+The default path in MultiProcessingParser transpiles every statement to T-SQL
+and hands it to sqllineage, which parses it again (and a fourth time on the
+Teradata fallback). For the statement shapes that make up most load scripts,
+the targets and sources can be read straight off the parse_one tree instead.
+Anything this module is unsure about returns None so the caller can fall back
+to LineageRunner.
+
+Table names are formatted the way sqllineage formats them (lower-cased unless
+quoted, '<default>.' for unqualified names, sorted and de-duplicated) so both
+engines emit identical rows.
+"""
+
+import logging
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+from sqlglot import exp, parse_one
+
+logger = logging.getLogger(__name__)
+
+LINEAGE_ENGINES = ('native', 'sqllineage')
+DEFAULT_LINEAGE_ENGINE = 'native'
+
+# Statement types whose lineage is read directly from the AST
+_NATIVE_TYPES = (exp.Insert, exp.Create, exp.Merge, exp.Select, exp.Union, exp.Intersect, exp.Except, exp.Drop)
+
+
+def _format_identifier(identifier) -> str:
+    if isinstance(identifier, exp.Identifier) and identifier.quoted:
+        return identifier.this
+    return identifier.name.lower()
+
+
+def format_table(table: exp.Table) -> Optional[str]:
+    """Format a table reference as sqllineage would print it, or None if it is not a plain name."""
+    if table.args.get('catalog') is not None or not isinstance(table.this, exp.Identifier):
+        return None
+    name = _format_identifier(table.this)
+    if not name:
+        return None
+    db = table.args.get('db')
+    schema = _format_identifier(db) if db is not None else '<default>'
+    return f"{schema}.{name}"
+
+
+def _target_table(node) -> Optional[exp.Table]:
+    """Unwrap INSERT INTO t (cols) / CREATE TABLE t (cols) to the table node."""
+    if isinstance(node, exp.Schema):
+        node = node.this
+    return node if isinstance(node, exp.Table) else None
+
+
+def _source_tables(parsed_sql, exclude=None) -> Optional[List[str]]:
+    """Collect every table read by the statement, skipping CTE references and the target node."""
+    cte_names = {cte.alias_or_name.lower() for cte in parsed_sql.find_all(exp.CTE)}
+    sources = set()
+    for table in parsed_sql.find_all(exp.Table):
+        if table is exclude:
+            continue
+        if not table.args.get('db') and table.name.lower() in cte_names:
+            continue
+        formatted = format_table(table)
+        if formatted is None:
+            return None
+        sources.add(formatted)
+    return sorted(sources)
+
+
+def extract_table_lineage(parsed_sql) -> Optional[Tuple[List[str], List[str]]]:
+    """Return (target_tables, source_tables) for a parse_one tree, or None if undecided.
+
+    Updates are always left to sqllineage: it treats Teradata's
+    'UPDATE alias FROM ...' and subqueries in SET/WHERE in ways that are not
+    worth reproducing here.
+    """
+    if not isinstance(parsed_sql, _NATIVE_TYPES):
+        return None
+
+    if isinstance(parsed_sql, exp.Drop):
+        return [], []
+
+    if isinstance(parsed_sql, (exp.Select, exp.Union, exp.Intersect, exp.Except)):
+        sources = _source_tables(parsed_sql)
+        return None if sources is None else ([], sources)
+
+    if isinstance(parsed_sql, exp.Create):
+        kind = (parsed_sql.args.get('kind') or '').upper()
+        if kind not in ('TABLE', 'VIEW'):
+            return None
+
+    target = _target_table(parsed_sql.this)
+    target_name = format_table(target) if target is not None else None
+    if target_name is None:
+        return None
+
+    sources = _source_tables(parsed_sql, exclude=target)
+    if sources is None:
+        return None
+    return [target_name], sources
+
+
+def compare_engines(sql_content, custom_name='COMPARE'):
+    """Run both engines over every statement and collect the statements where they disagree.
+
+    Args:
+        sql_content: (file_nme, source) tuple or list of them as returned by read_queries_from_input
+
+    Returns:
+        Tuple of (diff DataFrame, stats dict)
+    """
+    # Imported here to avoid a circular import at module load time
+    from MultiProcessingParser import extract_lineage, preprocess_query
+    from statementSplitter import iter_source_statements
+
+    diffs = []
+    stats = {'statements': 0, 'agree': 0, 'differ': 0, 'native_undecided': 0,
+             'native_seconds': 0.0, 'sqllineage_seconds': 0.0}
+
+    for query_idx, (file_nme, one_sql, start_offset, end_offset) in enumerate(iter_source_statements(sql_content)):
+        one_sql = preprocess_query(one_sql)
+        if not one_sql.strip():
+            continue
+        stats['statements'] += 1
+
+        outcomes = {}
+        for engine in LINEAGE_ENGINES:
+            engine_start = time.perf_counter()
+            try:
+                outcomes[engine] = extract_lineage(one_sql, lineage_engine=engine)
+            except Exception as e:
+                outcomes[engine] = ('Error', type(e).__name__, str(e))
+            stats[f'{engine}_seconds'] += time.perf_counter() - engine_start
+
+        try:
+            if extract_table_lineage(parse_one(one_sql, dialect="teradata")) is None:
+                stats['native_undecided'] += 1
+        except Exception:
+            stats['native_undecided'] += 1
+
+        if outcomes['native'] == outcomes['sqllineage']:
+            stats['agree'] += 1
+            continue
+
+        stats['differ'] += 1
+        diffs.append({
+            'script_file': file_nme,
+            'query_index': query_idx,
+            'start_offset': start_offset,
+            'end_offset': end_offset,
+            'native_result': repr(outcomes['native']),
+            'sqllineage_result': repr(outcomes['sqllineage']),
+            'sql_query': one_sql
+        })
+
+    return pd.DataFrame(diffs), stats
+
+
+def main():
+    """Compare the native and sqllineage engines over an input file or folder."""
+    from helper import read_queries_from_input
+
+    print("\n" + "="*60)
+    print("LINEAGE ENGINE COMPARISON")
+    print("="*60 + "\n")
+
+    custom_name = input("Enter Query name: ")
+    input_path = input("Enter path to query file or folder (press Enter for default 'query.txt'): ").strip()
+    if not input_path:
+        input_path = 'query.txt'
+
+    sql = read_queries_from_input(input_path, stream=True)
+    if not sql:
+        logger.error("No queries found to process. Exiting.")
+        return
+
+    diff_df, stats = compare_engines(sql, custom_name)
+
+    total = max(1, stats['statements'])
+    print(f"\n{'='*60}")
+    print(f"ENGINE COMPARISON STATISTICS")
+    print(f"{'='*60}")
+    print(f"Total statements:        {stats['statements']}")
+    print(f"Identical results:       {stats['agree']} ({stats['agree']/total*100:.1f}%)")
+    print(f"Different results:       {stats['differ']} ({stats['differ']/total*100:.1f}%)")
+    print(f"Native fell back:        {stats['native_undecided']} ({stats['native_undecided']/total*100:.1f}%)")
+    print(f"Native engine time:      {stats['native_seconds']:.2f} seconds")
+    print(f"sqllineage engine time:  {stats['sqllineage_seconds']:.2f} seconds")
+    print(f"{'='*60}")
+
+    if not diff_df.empty:
+        diff_csv_path = "./error/" + custom_name + '-engine_diff.csv'
+        Path(diff_csv_path).parent.mkdir(parents=True, exist_ok=True)
+        diff_df.to_csv(diff_csv_path, index=False, encoding='utf-8-sig')
+        print(f"\nEngine differences saved to: {diff_csv_path}")
+
+
+if __name__ == "__main__":
+    main()
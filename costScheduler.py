@@ -0,0 +1,341 @@
+"""
+Cost-aware dispatch order for the statement pool.
+
+In file order with a fixed chunksize, a chunk that happens to hold several
+expensive statements finishes long after the rest of the pool has gone
+idle. The scheduler instead estimates what every statement costs and hands
+out the most expensive first (longest processing time first), so the
+expensive statements start early and the cheap ones fill in around them:
+
+    * plan_chunks groups a known list of statements into chunks sized by
+      cost, guided self-scheduling style: each chunk takes a share of the
+      cost still to be dispatched, so chunks shrink towards the tail
+    * longest_first reorders a lazily split stream within a bounded
+      look-ahead window, for the paths that dispatch as statements are split
+
+estimate_cost works from the leading keyword and the length: the statement
+kinds the native engine can't decide go through LineageRunner (and failed
+parses through the Teradata fallback LineageRunner), which costs one to two
+orders of magnitude more than an AST walk. Where a CostHistory is given,
+the cost measured for the same statement fingerprint in earlier runs
+replaces the estimate, and estimates are scaled by how far off they were
+last time.
+
+pool_statistics summarizes the (pid, started, finished) TaskTiming of every
+statement into pool utilization and the straggler tail.
+
+CostTracker holds all of this for one run: the parent adds every statement
+it dispatches, orders or chunks them through the tracker, reports each
+result's TaskTiming back and closes it to store the measurements.
+
+    tracker = CostTracker('cost', DEFAULT_COST_HISTORY_PATH)
+    tracker.add(query_idx, one_sql, statement_fingerprint(one_sql))
+    chunks = tracker.chunks(tasks, itemgetter(2), processes, max_chunk_size)
+    tracker.record_timing(query_idx, timing)
+    stats = tracker.statistics(processes)
+    tracker.close()
+"""
+
+import heapq
+import logging
+from array import array
+import re
+import sqlite3
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCHEDULES = ('cost', 'fifo')
+DEFAULT_SCHEDULE = 'cost'
+
+DEFAULT_COST_HISTORY_PATH = './cache/statement_costs.db'
+
+# Each chunk takes 1/(GUIDED_CHUNK_FACTOR * processes) of the remaining cost
+GUIDED_CHUNK_FACTOR = 2
+
+# Statements buffered per process when reordering a lazily split stream
+DEFAULT_WINDOW_PER_PROCESS = 64
+
+# Weight of the latest measurement when a statement's measured cost is updated
+COST_HISTORY_WEIGHT = 0.5
+
+# (seconds, seconds per character) by leading keyword, from profiling the
+# bundled corpus: UPDATE and MERGE go through LineageRunner, statements
+# sqlglot parses as Command (COLLECT, CALL, ...) fail into the fallback
+# LineageRunner, the rest are decided by the native AST walk
+KEYWORD_COSTS = {
+    'UPDATE': (0.025, 90e-6), 'UPD': (0.025, 90e-6),
+    'MERGE': (0.020, 20e-6),
+    'INSERT': (0.001, 3.3e-6), 'INS': (0.001, 3.3e-6), 'CREATE': (0.001, 3.3e-6),
+    'REPLACE': (0.001, 3.3e-6), 'WITH': (0.001, 3.3e-6),
+    'SELECT': (0.0005, 0.5e-6), 'SEL': (0.0005, 0.5e-6),
+    'DELETE': (0.0003, 3.8e-6), 'DEL': (0.0003, 3.8e-6), 'DROP': (0.0002, 1e-6),
+}
+# Anything else is most likely parsed as a Command
+COMMAND_COST = (0.030, 100e-6)
+
+_LEADING_KEYWORD = re.compile(r"(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/)*([A-Za-z]+)", re.DOTALL)
+
+TaskTiming = namedtuple('TaskTiming', ['pid', 'started', 'finished'])
+
+_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS statement_costs (
+    fingerprint BLOB PRIMARY KEY,
+    seconds     REAL NOT NULL,
+    runs        INTEGER NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS calibration (
+    name  TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def estimate_cost(one_sql):
+    """Estimated seconds to process a statement, from its leading keyword and length."""
+    match = _LEADING_KEYWORD.match(one_sql)
+    base, per_character = KEYWORD_COSTS.get(match.group(1).upper(), COMMAND_COST) if match else COMMAND_COST
+    return base + per_character * len(one_sql)
+
+
+class CostHistory:
+    """Measured statement costs from earlier runs, keyed by statement_fingerprint.
+
+    Also keeps the ratio of measured to estimated cost of the last run, which
+    scales the estimates of statements never measured.
+    """
+
+    def __init__(self, path=DEFAULT_COST_HISTORY_PATH):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_HISTORY_SCHEMA)
+        row = self.conn.execute("SELECT value FROM calibration WHERE name = 'estimate_scale'").fetchone()
+        self.estimate_scale = row[0] if row else 1.0
+
+    def get(self, fingerprint):
+        """Measured seconds of a statement, or None if it was never measured."""
+        row = self.conn.execute("SELECT seconds FROM statement_costs WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return row[0] if row else None
+
+    def record(self, measurements, estimated_seconds=None):
+        """
+        Store measured costs and recalibrate the estimates.
+
+        Args:
+            measurements: Iterable of (fingerprint, seconds)
+            estimated_seconds: (unscaled estimate total, measured total) of the
+                statements that had no history, to rescale later estimates by
+        """
+        now = time.time()
+        self.conn.execute("BEGIN")
+        self.conn.executemany(
+            "INSERT INTO statement_costs (fingerprint, seconds, runs, updated_at) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT(fingerprint) DO UPDATE SET "
+            f"seconds = seconds * {1 - COST_HISTORY_WEIGHT} + excluded.seconds * {COST_HISTORY_WEIGHT}, "
+            "runs = runs + 1, updated_at = excluded.updated_at",
+            ((fingerprint, seconds, now) for fingerprint, seconds in measurements))
+        if estimated_seconds and estimated_seconds[0] > 0 and estimated_seconds[1] > 0:
+            self.estimate_scale = estimated_seconds[1] / estimated_seconds[0]
+            self.conn.execute("INSERT OR REPLACE INTO calibration (name, value) VALUES ('estimate_scale', ?)",
+                              (self.estimate_scale,))
+        self.conn.execute("COMMIT")
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM statement_costs").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def plan_chunks(costs, processes, max_chunk_size):
+    """
+    Group task positions into chunks, most expensive tasks first.
+
+    Each chunk is closed once it holds 1/(GUIDED_CHUNK_FACTOR * processes)
+    of the cost not yet dispatched, or max_chunk_size tasks, so the first
+    chunks hold a few expensive statements and the tail is handed out in
+    small pieces.
+
+    Args:
+        costs: Estimated cost of every task, by position
+        processes: Pool size
+        max_chunk_size: Most tasks in one chunk, to bound a chunk of cheap statements
+
+    Returns:
+        List of lists of task positions, in dispatch order
+    """
+    costs = np.asarray(costs, dtype=np.float64)
+    order = np.argsort(-costs, kind='stable')
+    remaining = float(costs.sum())
+    share = GUIDED_CHUNK_FACTOR * processes
+    chunks = []
+    chunk = []
+    chunk_cost = 0.0
+    for position, cost in zip(order.tolist(), costs[order].tolist()):
+        chunk.append(position)
+        chunk_cost += cost
+        if chunk_cost >= remaining / share or len(chunk) >= max_chunk_size:
+            chunks.append(chunk)
+            remaining -= chunk_cost
+            chunk = []
+            chunk_cost = 0.0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def longest_first(tasks, cost_of, window):
+    """Yield tasks from an iterator, each time the most expensive of the next window buffered ones."""
+    heap = []
+    for position, task in enumerate(tasks):
+        heapq.heappush(heap, (-cost_of(task), position, task))
+        if len(heap) >= window:
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def pool_statistics(starts, ends, processes):
+    """
+    Utilization and straggler tail of a pool run from per-task wall-clock times.
+
+    The tail starts at the last moment every process was busy; from then on
+    at least one process had nothing left to do.
+
+    Args:
+        starts: Task start times (time.time() in the workers)
+        ends: Task end times, in the same order
+        processes: Pool size
+
+    Returns:
+        Dict with wall, busy and tail seconds, utilization (0-1) and the
+        median, p95, p99 and maximum task seconds
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    if not len(starts):
+        return None
+    durations = ends - starts
+    first, last = starts.min(), ends.max()
+    wall = last - first
+    busy = float(durations.sum())
+
+    # Concurrency over time; at equal times tasks ending are counted before tasks starting
+    times = np.concatenate([ends, starts])
+    steps = np.concatenate([-np.ones(len(ends)), np.ones(len(starts))])
+    order = np.lexsort((steps, times))
+    level = np.cumsum(steps[order])
+    full = np.flatnonzero(level >= min(processes, len(starts)))
+    tail_start = times[order][full[-1] + 1] if len(full) and full[-1] + 1 < len(order) else first
+    median, p95, p99 = np.percentile(durations, [50, 95, 99])
+    return {
+        'wall_seconds': wall,
+        'busy_seconds': busy,
+        'utilization': busy / (processes * wall) if wall > 0 else 1.0,
+        'tail_seconds': last - tail_start,
+        'median_task_seconds': median,
+        'p95_task_seconds': p95,
+        'p99_task_seconds': p99,
+        'max_task_seconds': float(durations.max()),
+    }
+
+
+class CostTracker:
+    """Statement costs of one run: what the scheduler orders by and what was measured.
+
+    Args:
+        schedule: One of SCHEDULES; 'fifo' only measures
+        history_path: CostHistory database, or None to estimate every cost
+    """
+
+    def __init__(self, schedule=DEFAULT_SCHEDULE, history_path=None):
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown schedule '{schedule}', expected one of {SCHEDULES}")
+        self.schedule = schedule
+        self.history_path = history_path
+        self.history = CostHistory(history_path) if history_path else None
+        self.description = 'longest first by cost' if self.cost_aware else 'file order'
+        self.costs = {}             # query index -> seconds, for dispatched statements
+        self.history_known = 0      # dispatched statements whose cost was measured before
+        self.starts = array('d')
+        self.ends = array('d')
+        self._fingerprints = {}     # query index -> fingerprint, until measured
+        self._estimates = {}        # query index -> unscaled estimate, of statements the history doesn't know
+        self._measured = []
+        self._calibration = [0.0, 0.0]
+
+    @property
+    def cost_aware(self):
+        return self.schedule == 'cost'
+
+    @property
+    def needs_fingerprint(self):
+        """Whether add() needs the statement fingerprint."""
+        return self.history is not None
+
+    def add(self, query_idx, one_sql, fingerprint=None):
+        """Record the cost of a statement about to be dispatched."""
+        if self.history is not None:
+            self._fingerprints[query_idx] = fingerprint
+            cost = self.history.get(fingerprint)
+            if cost is None:
+                estimate = self._estimates[query_idx] = estimate_cost(one_sql)
+                cost = estimate * self.history.estimate_scale
+            else:
+                self.history_known += 1
+            self.costs[query_idx] = cost
+        elif self.cost_aware:
+            self.costs[query_idx] = estimate_cost(one_sql)
+
+    def sorted(self, tasks, index_of):
+        """Every task, most expensive first, for a pool that hands out one task at a time."""
+        self.description += ", one statement at a time"
+        return sorted(tasks, key=lambda task: -self.costs[index_of(task)])
+
+    def chunks(self, tasks, index_of, processes, max_chunk_size):
+        """The tasks grouped by plan_chunks, as lists of tasks."""
+        planned = plan_chunks([self.costs[index_of(task)] for task in tasks], processes, max_chunk_size)
+        self.description += f", {len(planned)} chunks"
+        return [[tasks[position] for position in chunk] for chunk in planned]
+
+    def windowed(self, tasks, index_of, window):
+        """The tasks of an iterator reordered by longest_first."""
+        self.description += f" within windows of {window} statements"
+        return longest_first(tasks, lambda task: self.costs[index_of(task)], window)
+
+    def record_timing(self, query_idx, timing, cache_hit=False):
+        """Record the TaskTiming of a statement."""
+        self.starts.append(timing.started)
+        self.ends.append(timing.finished)
+        self.record_cost(query_idx, timing.finished - timing.started, cache_hit)
+
+    def record_cost(self, query_idx, seconds, cache_hit=False):
+        """Record what a statement cost, for the history; also for statements the pool abandoned."""
+        if self.history is None:
+            return
+        fingerprint = self._fingerprints.pop(query_idx, None)
+        if fingerprint is not None:
+            self._measured.append((fingerprint, seconds))
+        estimate = self._estimates.pop(query_idx, None)
+        # Cache hits say nothing about what parsing costs
+        if estimate is not None and not cache_hit:
+            self._calibration[0] += estimate
+            self._calibration[1] += seconds
+
+    def statistics(self, processes):
+        """pool_statistics of the recorded timings, or None without any."""
+        return pool_statistics(self.starts, self.ends, processes)
+
+    def close(self):
+        """Store the measured costs in the history."""
+        if self.history is not None:
+            self.history.record(self._measured, tuple(self._calibration))
+            self.history.close()
+            self.history = None
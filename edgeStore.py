@@ -0,0 +1,134 @@
+"""
+Compact store for the lineage rows collected in the parent process.
+
+Workers send each statement's rows as dicts holding the full script file and
+table names. Kept as they are, a large corpus leaves the parent with millions
+of dicts, each with its own copies of the same few thousand strings.
+EdgeStore interns every string once and keeps a row as one int32 code per
+column in array-backed columns. A row seen again only increments its count,
+so repeated statements and repeated target/source pairs add nothing, and the
+DataFrame is only built at the output boundary.
+
+    store = EdgeStore(RELATION_COLUMNS)
+    store.add_rows(rows)
+    df = store.to_frame()
+"""
+
+import sys
+from array import array
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class EdgeStore:
+    """Interned, deduplicating store of lineage edges.
+
+    Args:
+        columns: Row keys of the script file, child table, relationship and
+            parent table, in output column order
+    """
+
+    def __init__(self, columns: Sequence[str]):
+        if len(columns) != 4:
+            raise ValueError(f"EdgeStore needs the script, child, relationship and parent columns, got {columns}")
+        self.columns = list(columns)
+        self.strings: List[str] = []
+        # Missing values (None) have code -1
+        self._string_ids: Dict[Optional[str], int] = {None: -1}
+        self._codes = [array('i') for _ in self.columns]
+        self._counts = array('q')
+        # Row values -> position of the row
+        self._row_ids: Dict[tuple, int] = {}
+        self.rows_added = 0
+
+    def __len__(self) -> int:
+        """Number of distinct rows."""
+        return len(self._counts)
+
+    @property
+    def duplicates(self) -> int:
+        """Rows added that were already in the store."""
+        return self.rows_added - len(self)
+
+    def _intern(self, value: str) -> int:
+        code = self._string_ids[value] = len(self.strings)
+        self.strings.append(value)
+        return code
+
+    def add_rows(self, rows: Iterable[dict]) -> None:
+        """Add rows (dicts with every column as a key), counting repeats instead of storing them."""
+        # Unrolled over the four columns and with bound methods: this runs once per lineage row
+        values_of = itemgetter(*self.columns)
+        row_position, string_id, intern, strings = self._row_ids.get, self._string_ids.get, self._intern, self.strings
+        counts = self._counts
+        script_codes, child_codes, relationship_codes, parent_codes = self._codes
+        added = 0
+        for row in rows:
+            added += 1
+            values = values_of(row)
+            position = row_position(values)
+            if position is not None:
+                counts[position] += 1
+                continue
+            script, child, relationship, parent = values
+            script_code = string_id(script)
+            if script_code is None:
+                script_code = intern(script)
+            child_code = string_id(child)
+            if child_code is None:
+                child_code = intern(child)
+            relationship_code = string_id(relationship)
+            if relationship_code is None:
+                relationship_code = intern(relationship)
+            parent_code = string_id(parent)
+            if parent_code is None:
+                parent_code = intern(parent)
+            # Keyed by the interned strings, so the row's own copies are not kept
+            self._row_ids[(strings[script_code] if script_code != -1 else None,
+                           strings[child_code] if child_code != -1 else None,
+                           strings[relationship_code] if relationship_code != -1 else None,
+                           strings[parent_code] if parent_code != -1 else None)] = len(counts)
+            script_codes.append(script_code)
+            child_codes.append(child_code)
+            relationship_codes.append(relationship_code)
+            parent_codes.append(parent_code)
+            counts.append(1)
+        self.rows_added += added
+
+    def counts(self) -> np.ndarray:
+        """How many times each distinct row was added, in insertion order."""
+        return np.frombuffer(self._counts, dtype=np.int64) if len(self) else np.empty(0, dtype=np.int64)
+
+    def to_frame(self, expand_duplicates: bool = False, count_column: Optional[str] = None) -> pd.DataFrame:
+        """
+        DataFrame of the distinct rows in the order they were first added.
+
+        Args:
+            expand_duplicates: Repeat each row as many times as it was added,
+                giving the same rows as a DataFrame of everything added
+            count_column: Also add the counts under this name
+        """
+        if not len(self):
+            return pd.DataFrame(columns=self.columns + ([count_column] if count_column else []))
+        # The appended None is what code -1 picks
+        strings = np.array(self.strings + [None], dtype=object)
+        counts = self.counts()
+        data = {}
+        for column, column_codes in zip(self.columns, self._codes):
+            values = strings[np.frombuffer(column_codes, dtype=np.int32)]
+            data[column] = np.repeat(values, counts) if expand_duplicates else values
+        if count_column:
+            data[count_column] = np.repeat(counts, counts) if expand_duplicates else counts
+        return pd.DataFrame(data)
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the store, strings included."""
+        total = sum(column_codes.buffer_info()[1] * column_codes.itemsize for column_codes in self._codes)
+        total += self._counts.buffer_info()[1] * self._counts.itemsize
+        total += sys.getsizeof(self._row_ids) + sum(sys.getsizeof(key) for key in self._row_ids)
+        total += sys.getsizeof(self._string_ids) + sys.getsizeof(self.strings)
+        total += sum(sys.getsizeof(value) for value in self.strings)
+        return total
@@ -0,0 +1,257 @@
+"""
+Row-streaming reader for Excel query workbooks.
+
+read_queries_from_excel used to load the whole workbook into pandas, sort it
+and rebuild each query with a groupby/apply lambda, and add_table_types read
+the same workbook again for its view_name column. This reader walks the first
+sheet once with openpyxl in read-only mode, keeps only the query, line number,
+query name and view_name columns, joins each query's lines with one str.join
+per group over the sorted rows, and collects the view names in the same pass.
+
+The result is memoized for the process and cached under ./cache/excel as a
+Parquet file (when pyarrow is available) keyed by the workbook's mtime and
+size, so later runs, the Excel reader processes of helper.iter_file_reads and
+the type lookup all share one read. .xls workbooks, which openpyxl can't open,
+are loaded through pandas and grouped the same way.
+"""
+
+import hashlib
+import json
+import logging
+import math
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # The on-disk cache is optional
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXCEL_CACHE_DIR = './cache/excel'
+
+# Bump whenever the cached layout or the statement assembly changes
+CACHE_FORMAT_VERSION = 1
+
+QUERY_COLUMNS = ['query', 'Query', 'QUERY', 'sql', 'SQL', 'Sql', 'view_sql', 'VIEW_SQL', 'View_SQL']
+LINE_NUMBER_COLUMNS = ['LineNumber', 'linenumber', 'line_number', 'Line_Number', 'LINENUMBER']
+QUERY_NAME_COLUMNS = ['TableName', 'ViewName', 'SQLName', 'view_name', 'QueryNumber', 'query_number']
+VIEW_NAME_COLUMN = 'view_name'
+
+# Cell strings pd.read_excel treats as missing by default
+NA_STRINGS = frozenset(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+                        '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+
+WorkbookQueries = namedtuple('WorkbookQueries', ['file_nme', 'statements', 'view_names'])
+
+# (resolved path, mtime_ns, size) -> WorkbookQueries read by this process
+_workbook_memo = {}
+
+
+def _convert_cell(value):
+    # Same conversions as pandas' openpyxl reader: blanks and NA markers are NaN, integral floats are ints
+    if value is None:
+        return math.nan
+    if isinstance(value, str):
+        return math.nan if value in NA_STRINGS else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _header_names(header, width):
+    """Column names as pandas builds them: blanks become 'Unnamed: i', repeats get '.1', '.2' suffixes."""
+    names = []
+    seen = {}
+    for i in range(width):
+        value = header[i] if i < len(header) else None
+        name = f"Unnamed: {i}" if value is None or value == '' else str(_convert_cell(value))
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _find_column(columns, candidates):
+    for col in candidates:
+        if col in columns:
+            return col
+    return None
+
+
+def read_sheet_columns(file_path):
+    """Stream the first sheet and return ({column: values}, column names).
+
+    When the query, line number and query name columns are all named in the
+    header, only those and view_name are kept; otherwise every column is kept
+    so the positional fallbacks of read_queries_from_excel still apply.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+        header_names = _header_names(header, len(header))
+        wanted = [_find_column(header_names, candidates)
+                  for candidates in (QUERY_COLUMNS, LINE_NUMBER_COLUMNS, QUERY_NAME_COLUMNS)]
+        if all(wanted):
+            keep = {header_names.index(col) for col in wanted}
+            if VIEW_NAME_COLUMN in header_names:
+                keep.add(header_names.index(VIEW_NAME_COLUMN))
+        else:
+            keep = None
+
+        if keep is not None:
+            kept = {i: [] for i in sorted(keep)}
+            for row in rows:
+                row_width = len(row)
+                for i, cells in kept.items():
+                    cells.append(_convert_cell(row[i]) if i < row_width else math.nan)
+        else:
+            all_rows = list(rows)
+    finally:
+        workbook.close()
+
+    if keep is not None:
+        return {header_names[i]: cells for i, cells in kept.items()}, header_names
+
+    # pandas trims blank trailing cells and pads every row to the widest one, so
+    # the positional fallbacks depend on the last column holding any value
+    width = 0
+    for row in [header] + all_rows:
+        for i in range(len(row) - 1, width - 1, -1):
+            if row[i] is not None and row[i] != '':
+                width = i + 1
+                break
+    columns = _header_names(header, width)
+    data = {columns[i]: [_convert_cell(row[i]) if i < len(row) else math.nan for row in all_rows]
+            for i in range(width)}
+    return data, columns
+
+
+def build_statements(frame, query_column, line_number_column, query_name_column):
+    """Join each query's lines in line number order; one statement per query name, in name order."""
+    frame = frame.sort_values(by=[query_name_column, line_number_column])
+    frame = frame[frame[query_name_column].notna()]
+    if frame.empty:
+        return []
+    names = frame[query_name_column].to_numpy()
+    # str() per value: pandas 3's astype(str) keeps NaN, which join() rejects
+    texts = [str(text) for text in frame[query_column].tolist()]
+    # Rows are sorted by name, so each query is a contiguous run
+    starts = np.flatnonzero(np.concatenate(([True], names[1:] != names[:-1])))
+    ends = np.append(starts[1:], len(texts))
+    return ['\n'.join(texts[start:end]) for start, end in zip(starts, ends)]
+
+
+def _choose_columns(columns, file_path):
+    query_column = _find_column(columns, QUERY_COLUMNS)
+    if query_column is None:
+        query_column = columns[-1]
+        logger.warning(f"No query column found in {file_path}. Using last column: {query_column}")
+    logger.info(f"Using column '{query_column}' for queries from {file_path}")
+
+    line_number_column = _find_column(columns, LINE_NUMBER_COLUMNS)
+    if line_number_column is None:
+        line_number_column = columns[-2]
+        logger.info(f"No LineNumber column found in {file_path}. Queries will not be sorted.")
+
+    query_name_column = _find_column(columns, QUERY_NAME_COLUMNS)
+    if query_name_column is None:
+        query_name_column = columns[0]
+        logger.info(f"No QueryID column found in {file_path}. All queries will be treated as one group.")
+    return query_column, line_number_column, query_name_column
+
+
+def convert_workbook(file_path):
+    """Read a workbook once and return its WorkbookQueries."""
+    if Path(file_path).suffix.lower() == '.xls':
+        df = pd.read_excel(file_path)
+        columns = list(df.columns)
+    else:
+        data, columns = read_sheet_columns(file_path)
+        df = pd.DataFrame(data)
+    query_column, line_number_column, query_name_column = _choose_columns(columns, file_path)
+    statements = build_statements(df, query_column, line_number_column, query_name_column)
+
+    view_names = []
+    if VIEW_NAME_COLUMN in df.columns:
+        view_names = list(dict.fromkeys(df[VIEW_NAME_COLUMN].dropna().astype(str)))
+    return WorkbookQueries(Path(file_path).stem, statements, view_names)
+
+
+def _cache_path(file_path, cache_dir):
+    source = Path(file_path)
+    path_digest = hashlib.sha256(str(source.resolve()).encode('utf-8')).hexdigest()[:16]
+    return Path(cache_dir) / f"{source.stem}-{path_digest}.parquet"
+
+
+def _read_cache(cache_path, stat):
+    if pq is None or not cache_path.exists():
+        return None
+    try:
+        metadata = json.loads(pq.read_schema(cache_path).metadata[b'workbook'])
+        if (metadata.get('version') != CACHE_FORMAT_VERSION
+                or metadata.get('mtime_ns') != stat.st_mtime_ns or metadata.get('size') != stat.st_size):
+            return None
+        table = pq.read_table(cache_path).to_pydict()
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable Excel cache {cache_path}: {e}")
+        return None
+    statements = [text for kind, text in zip(table['kind'], table['text']) if kind == 'statement']
+    view_names = [text for kind, text in zip(table['kind'], table['text']) if kind == 'view']
+    return WorkbookQueries(metadata['file_nme'], statements, view_names)
+
+
+def _write_cache(cache_path, stat, workbook):
+    if pq is None:
+        return
+    metadata = {'version': CACHE_FORMAT_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                'file_nme': workbook.file_nme}
+    schema = pa.schema([('kind', pa.dictionary(pa.int8(), pa.string())), ('text', pa.string())],
+                       metadata={'workbook': json.dumps(metadata)})
+    kinds = ['statement'] * len(workbook.statements) + ['view'] * len(workbook.view_names)
+    table = pa.table({'kind': pa.array(kinds).dictionary_encode().cast(schema.field('kind').type),
+                      'text': pa.array(workbook.statements + workbook.view_names, type=pa.string())},
+                     schema=schema)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix('.tmp')
+        pq.write_table(table, temp_path, compression='snappy')
+        temp_path.replace(cache_path)
+    except OSError as e:
+        logger.warning(f"Could not save Excel cache {cache_path}: {e}")
+
+
+def load_workbook_queries(file_path, cache_dir=DEFAULT_EXCEL_CACHE_DIR):
+    """Return the WorkbookQueries of a workbook, reading it only if no cached copy matches.
+
+    Pass cache_dir=None to skip the on-disk cache; the per-process memo is
+    always used.
+    """
+    stat = Path(file_path).stat()
+    memo_key = (str(Path(file_path).resolve()), stat.st_mtime_ns, stat.st_size)
+    workbook = _workbook_memo.get(memo_key)
+    if workbook is not None:
+        return workbook
+
+    cache_path = _cache_path(file_path, cache_dir) if cache_dir else None
+    workbook = _read_cache(cache_path, stat) if cache_path else None
+    if workbook is not None:
+        logger.info(f"Loaded Excel queries from cache {cache_path}")
+    else:
+        workbook = convert_workbook(file_path)
+        if cache_path:
+            _write_cache(cache_path, stat, workbook)
+    _workbook_memo[memo_key] = workbook
+    return workbook
@@ -4,12 +4,27 @@ from sqlglot import exp, parse_one
 import pandas as pd
 from sqllineage.runner import LineageRunner
 import os
+import sys
 from pathlib import Path
 import time
+from excelReader import load_workbook_queries
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
 
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+QUERY_FILE_TYPES = {'.txt': 'sql', '.sql': 'sql', '.xlsx': 'excel', '.xls': 'excel', '.xlsm': 'excel'}
+
+# Concurrent file readers: threads for text files, processes for Excel workbooks
+DEFAULT_READ_THREADS = 8
+DEFAULT_EXCEL_PROCESSES = max(1, min(4, (os.cpu_count() or 1) - 1))
+
 
 def read_queries_from_sql(file_path):
     """Read SQL queries from a sql file."""
@@ -17,52 +32,13 @@ def read_queries_from_sql(file_path):
         return (Path(file_path).stem, file.read())
 
 def read_queries_from_excel(file_path):
-    """Read SQL queries from an Excel file with support for multi-line queries."""
-    try:
-        df = pd.read_excel(file_path)
-        
-        # Find the query column
-        query_column = None
-        for col in ['query', 'Query', 'QUERY', 'sql', 'SQL', 'Sql', 'view_sql', 'VIEW_SQL', 'View_SQL']:
-            if col in df.columns:
-                query_column = col
-                break
-        
-        if query_column is None:
-            query_column = df.columns[-1]
-            logger.warning(f"No query column found in {file_path}. Using last column: {query_column}")
+    """Read SQL queries from an Excel file with support for multi-line queries.
 
-        logger.info(f"Using column '{query_column}' for queries from {file_path}")
-        
-        # Check for LineNumber column
-        line_number_column = None
-        for col in ['LineNumber', 'linenumber', 'line_number', 'Line_Number', 'LINENUMBER']:
-            if col in df.columns:
-                line_number_column = col
-                break
-        if line_number_column is None:
-            line_number_column = df.columns[-2]
-            logger.info(f"No LineNumber column found in {file_path}. Queries will not be sorted.")
-        
-        # Check for QueryID or similar grouping column
-        query_name_column = None
-        for col in ['TableName', 'ViewName', 'SQLName', 'view_name', 'QueryNumber', 'query_number']:
-            if col in df.columns:
-                query_name_column = col
-                break
-        if query_name_column is None:
-            query_name_column = df.columns[0]
-            logger.info(f"No QueryID column found in {file_path}. All queries will be treated as one group.")
-        
-        # Group by QueryID if it exists, otherwise treat all rows as one query
-        if query_name_column:
-            df = df.sort_values(by=[query_name_column, line_number_column] if line_number_column else [query_name_column])
-            grouped = df.groupby(query_name_column)[query_column].apply(lambda x: '\n'.join(x.astype(str))).tolist()
-            queries = grouped
-        else:
-            queries = df[query_column].astype(str).tolist()
-        
-        return (Path(file_path).stem, ';'.join(queries))
+    Lines are joined per TableName/ViewName group in LineNumber order by
+    excelReader, which reads the workbook once and caches the result."""
+    try:
+        workbook = load_workbook_queries(file_path)
+        return (workbook.file_nme, ';'.join(workbook.statements))
         
     except Exception as e:
         logger.error(f"Error reading Excel file {file_path}: {e}")
@@ -77,20 +53,134 @@ def get_query_files_from_folder(folder_path):
         logger.error(f"Invalid folder path: {folder_path}")
         return query_files
     
-    # Search for .txt and Excel files
+    # Search for .txt and Excel files; the suffix is checked first so other files are never stat'ed
     for file in folder.rglob('*'):
-        if file.is_file():
-            if file.suffix.lower() in ['.txt', '.sql']:
-                query_files.append(('sql', str(file)))
-            elif file.suffix.lower() in ['.xlsx', '.xls', '.xlsm']:
-                query_files.append(('excel', str(file)))
+        file_type = QUERY_FILE_TYPES.get(file.suffix.lower())
+        if file_type and file.is_file():
+            query_files.append((file_type, str(file)))
     
     return query_files
 
 
-def read_queries_from_input(input_path):
+def list_query_files(input_path):
+    """Return [(file_type, path)] for a query file, or for every query file in a folder."""
+    path = Path(input_path)
+    if not path.exists():
+        logger.error(f"Path does not exist: {input_path}")
+        return []
+    if path.is_dir():
+        query_files = get_query_files_from_folder(input_path)
+        if not query_files:
+            logger.warning(f"No query files found in folder: {input_path}")
+        return query_files
+    file_type = QUERY_FILE_TYPES.get(path.suffix.lower())
+    if file_type is None:
+        logger.warning(f"Unsupported file type: {path.suffix}")
+        return []
+    return [(file_type, str(path))]
+
+
+def timed_read(read_func, file_path):
+    """Return (read_func(file_path), seconds taken); module level so process pools can run it."""
+    read_start = time.perf_counter()
+    result = read_func(file_path)
+    return result, time.perf_counter() - read_start
+
+
+class TimedReader:
+    """Binary file wrapper adding up the seconds spent in read(), so streamed files get a read time too."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.seconds = 0.0
+
+    def read(self, size=-1):
+        read_start = time.perf_counter()
+        try:
+            return self.stream.read(size)
+        finally:
+            self.seconds += time.perf_counter() - read_start
+
+
+def iter_file_reads(query_files, stream=False, read_threads=DEFAULT_READ_THREADS,
+                    excel_processes=DEFAULT_EXCEL_PROCESSES):
+    """Read query files concurrently, yielding (position, (stem, source), seconds) as each completes.
+
+    position is the file's index in query_files. Text files are read on a
+    thread pool; with stream=True they are instead opened one at a time and
+    yielded as a TimedReader for statementSplitter, with seconds None (the
+    reader holds the read time once the file is consumed). Excel workbooks are
+    parsed on a process pool, since read_excel holds the GIL, unless there is
+    only one workbook or one process.
+    """
+    excel_count = sum(1 for file_type, _ in query_files if file_type == 'excel')
+    use_processes = excel_processes > 1 and excel_count > 1
+    with ThreadPoolExecutor(max_workers=max(1, read_threads)) as threads, \
+            (ProcessPoolExecutor(max_workers=min(excel_processes, excel_count)) if use_processes
+             else nullcontext()) as processes:
+        futures = {}
+        streamed = []
+        for position, (file_type, file_path) in enumerate(query_files):
+            logger.info(f"Processing {file_type} file: {file_path}")
+            if file_type == 'sql' and stream:
+                streamed.append((position, file_path))
+            elif file_type == 'sql':
+                futures[threads.submit(timed_read, read_queries_from_sql, file_path)] = position
+            else:
+                futures[(processes or threads).submit(timed_read, read_queries_from_excel, file_path)] = position
+        # Workbooks keep loading in the background while streamed files are split;
+        # the splitter consumes a file before asking for the next, so only one is open
+        for position, file_path in streamed:
+            with open(file_path, 'rb') as stream:
+                yield position, (Path(file_path).stem, TimedReader(stream)), None
+        for future in as_completed(futures):
+            result, seconds = future.result()
+            yield futures[future], result, seconds
+
+
+def iter_queries_from_files(query_files, stream=False, read_threads=DEFAULT_READ_THREADS,
+                            excel_processes=DEFAULT_EXCEL_PROCESSES, read_times=None):
+    """Yield (file_stem, source) pairs in the order the files finish loading.
+
+    Args:
+        query_files: [(file_type, path)] as returned by list_query_files
+        stream: Yield .txt/.sql files as open readers for statementSplitter instead of reading them
+        read_threads: Threads reading text files (unused for streamed files)
+        excel_processes: Processes parsing Excel workbooks
+        read_times: Optional dict filled with path -> seconds spent reading each
+            file; for streamed files, the time the splitter spent reading it
+    """
+    for position, result, seconds in iter_file_reads(query_files, stream, read_threads, excel_processes):
+        yield result
+        if isinstance(result[1], TimedReader):
+            # The consumer asks for the next file only after splitting this one
+            seconds = result[1].seconds
+        if read_times is not None and seconds is not None:
+            read_times[query_files[position][1]] = seconds
+
+
+def print_read_times(read_times, top=10):
+    """Print cumulative read time and the slowest files from iter_queries_from_files."""
+    if not read_times:
+        return
+    total = sum(read_times.values())
+    print(f"\n{'='*60}")
+    print(f"FILE READ STATISTICS")
+    print(f"{'='*60}")
+    print(f"Files read:              {len(read_times)}")
+    print(f"Cumulative read time:    {total:.2f} seconds")
+    print(f"Slowest files:")
+    for file_path, seconds in sorted(read_times.items(), key=lambda x: x[1], reverse=True)[:top]:
+        print(f"  {Path(file_path).name[:44]:44s} {seconds:8.3f} s")
+    print(f"{'='*60}")
+
+
+def read_queries_from_input(input_path, stream=False):
     """Read queries from a file or folder.
-    Supports: .txt files, Excel files (.xlsx, .xls), and folders containing these files."""
+    Supports: .txt files, Excel files (.xlsx, .xls), and folders containing these files.
+
+    With stream=True, .txt/.sql files are returned as (stem, Path) instead of
+    being read, so statementSplitter can split them from disk in bounded memory."""
     path = Path(input_path)
     all_queries = []
     
@@ -102,6 +192,8 @@ def read_queries_from_input(input_path):
         # Single file processing
         if path.suffix.lower() in ['.txt', '.sql']:
             logger.info(f"Reading queries from sql file: {input_path}")
+            if stream:
+                return (path.stem, path)
             return read_queries_from_sql(input_path)
         elif path.suffix.lower() in ['.xlsx', '.xls', '.xlsm']:
             logger.info(f"Reading queries from Excel file: {input_path}")
@@ -119,12 +211,9 @@ def read_queries_from_input(input_path):
             logger.warning(f"No query files found in folder: {input_path}")
             return ""
         
-        for file_type, file_path in query_files:
-            logger.info(f"Processing {file_type} file: {file_path}")
-            if file_type == 'sql':
-                all_queries.append(read_queries_from_sql(file_path))
-            elif file_type == 'excel':
-                all_queries.append(read_queries_from_excel(file_path))
+        # Files load concurrently; results are put back in folder order
+        for _, result, _ in sorted(iter_file_reads(query_files, stream), key=lambda read: read[0]):
+            all_queries.append(result)
         
         return all_queries
     
@@ -138,4 +227,28 @@ def clean_table_name(table_name, file_nme):
     table_str = str(table_name).strip()
     if table_str.startswith('<default>.'):
         return table_str.replace('<default>', file_nme, 1)
-    return table_str
\ No newline at end of file
+    return table_str
+
+
+def get_peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it can't be measured."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def get_current_rss_mb():
+    """Current resident set size of this process in MB, or None where it can't be measured."""
+    try:
+        # Linux: second field of statm is resident pages
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return get_peak_rss_mb()
@@ -0,0 +1,303 @@
+"""
+Incremental re-runs of the multiprocessing parser over a query folder.
+
+A manifest under ./cache/incremental/<query name> records, for every input
+file, its SHA-256 content hash and the share of processing time it took, and
+keeps the raw lineage and error rows of the last run. The next run hashes the
+inputs (only re-reading files whose size or mtime moved), re-parses just the
+added and changed files, drops the rows of deleted files and rewrites the
+relations and error outputs from the merged rows.
+
+Rows are attributed to files by script_file, which is the file stem, so files
+sharing a stem (same name in different subfolders) are always reprocessed
+together. Types are re-applied to every row on each run, so a changed types
+file takes effect without reprocessing. Error rows of reprocessed files carry
+query indexes from the run that produced them; their byte offsets are exact.
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing as mp
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from helper import list_query_files, iter_queries_from_files
+from lineageCache import DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES
+from lineageIO import output_path, write_table, OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT
+from astLineage import DEFAULT_LINEAGE_ENGINE
+from MultiProcessingParser import (process_with_multiprocessing, add_table_types, uppercase_output,
+                                   OutputOptions, RELATION_COLUMNS, ERROR_COLUMNS)
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_DIR = './cache/incremental'
+
+# Bump whenever the manifest or stored row layout changes
+MANIFEST_FORMAT_VERSION = 1
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(file_path):
+    """Hex SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IncrementalState:
+    """Manifest and stored rows of the last run for one query name.
+
+    Args:
+        custom_name: Query name the outputs are written under
+        state_dir: Directory holding one subdirectory per query name
+    """
+
+    def __init__(self, custom_name, state_dir=DEFAULT_STATE_DIR):
+        self.directory = Path(state_dir) / custom_name
+        self.manifest_path = self.directory / 'manifest.json'
+        self.rows_path = self.directory / 'rows.pkl'
+        self.errors_path = self.directory / 'errors.pkl'
+        self.files = {}
+        self.rows = pd.DataFrame(columns=RELATION_COLUMNS)
+        self.errors = pd.DataFrame(columns=ERROR_COLUMNS)
+
+    def load(self, input_path, lineage_engine):
+        """Load the previous run; a run over another input or engine starts from scratch."""
+        if not self.manifest_path.exists():
+            return False
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+            if (manifest.get('version') != MANIFEST_FORMAT_VERSION
+                    or manifest.get('input_path') != str(Path(input_path).resolve())
+                    or manifest.get('lineage_engine') != lineage_engine):
+                logger.info(f"Manifest {self.manifest_path} is for another input or engine, reprocessing everything")
+                return False
+            self.rows = pd.read_pickle(self.rows_path)
+            self.errors = pd.read_pickle(self.errors_path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable incremental state {self.directory}: {e}")
+            self.rows = pd.DataFrame(columns=RELATION_COLUMNS)
+            self.errors = pd.DataFrame(columns=ERROR_COLUMNS)
+            return False
+        self.files = manifest['files']
+        return True
+
+    def save(self, input_path, lineage_engine):
+        """Write rows first and the manifest last, each through a temporary file."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for frame, path in ((self.rows, self.rows_path), (self.errors, self.errors_path)):
+            temp_path = path.with_suffix('.tmp')
+            frame.to_pickle(temp_path)
+            os.replace(temp_path, path)
+        manifest = {
+            'version': MANIFEST_FORMAT_VERSION,
+            'input_path': str(Path(input_path).resolve()),
+            'lineage_engine': lineage_engine,
+            'saved_at': time.time(),
+            'files': self.files,
+        }
+        temp_path = self.manifest_path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        os.replace(temp_path, self.manifest_path)
+
+
+def scan_input_files(input_files, previous_files):
+    """Fingerprint the input files, re-hashing only those whose size or mtime changed.
+
+    Returns:
+        Dict of path -> {'type', 'stem', 'size', 'mtime_ns', 'hash'}
+    """
+    current = {}
+    for file_type, file_path in input_files:
+        stat = Path(file_path).stat()
+        previous = previous_files.get(file_path)
+        if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+            file_hash = previous['hash']
+        else:
+            file_hash = file_sha256(file_path)
+        current[file_path] = {'type': file_type, 'stem': Path(file_path).stem, 'size': stat.st_size,
+                              'mtime_ns': stat.st_mtime_ns, 'hash': file_hash}
+    return current
+
+
+def plan_run(current_files, previous_files):
+    """Classify files and pick the script stems whose rows must be rebuilt.
+
+    Returns:
+        (added, changed, unchanged, deleted, dirty_stems)
+    """
+    added = [path for path in current_files if path not in previous_files]
+    changed = [path for path in current_files
+               if path in previous_files and current_files[path]['hash'] != previous_files[path]['hash']]
+    unchanged = [path for path in current_files if path in previous_files and path not in changed]
+    deleted = [path for path in previous_files if path not in current_files]
+    dirty_stems = ({current_files[path]['stem'] for path in added + changed}
+                   | {previous_files[path]['stem'] for path in deleted})
+    return added, changed, unchanged, deleted, dirty_stems
+
+
+def run_incremental(input_path, custom_name, types_file_path=None, output_format=DEFAULT_OUTPUT_FORMAT,
+                    state_dir=DEFAULT_STATE_DIR, lineage_engine=DEFAULT_LINEAGE_ENGINE, **process_options):
+    """Re-parse only the files that changed since the last run and rewrite the merged outputs.
+
+    process_options are passed on to process_with_multiprocessing (num_processes,
+    cache_path, pool, pool_options, ...).
+
+    Returns:
+        Dict of file counts, row counts, timings and output paths
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+    start_time = time.time()
+    state = IncrementalState(custom_name, state_dir)
+    state.load(input_path, lineage_engine)
+
+    scan_start = time.time()
+    current_files = scan_input_files(sorted(list_query_files(input_path), key=lambda item: item[1]), state.files)
+    scan_time = time.time() - scan_start
+    added, changed, unchanged, deleted, dirty_stems = plan_run(current_files, state.files)
+
+    # Every file sharing a dirty stem is reparsed, since its rows can't be told apart
+    reprocess = [path for path, info in current_files.items() if info['stem'] in dirty_stems]
+    skipped = [path for path in unchanged if path not in reprocess]
+
+    kept_rows = state.rows[~state.rows['script_file'].isin(dirty_stems)]
+    kept_errors = state.errors[~state.errors['script_file'].isin(dirty_stems)]
+
+    processing_time = 0
+    successful_queries = failed_queries = 0
+    new_rows = pd.DataFrame(columns=RELATION_COLUMNS)
+    new_errors = []
+    if reprocess:
+        sql = iter_queries_from_files([(current_files[path]['type'], path) for path in reprocess], stream=True)
+        df, processing_time, successful_queries, failed_queries = process_with_multiprocessing(
+            sql, custom_name, lineage_engine=lineage_engine,
+            output_options=OutputOptions(output_format=output_format, error_rows=new_errors), **process_options
+        )
+        if not df.empty:
+            new_rows = df[RELATION_COLUMNS]
+
+    # Spread this run's processing time over the reparsed files by size, as the
+    # estimate of what skipping them saves next time
+    reprocessed_bytes = sum(current_files[path]['size'] for path in reprocess)
+    for path, info in current_files.items():
+        if path in reprocess:
+            info['seconds'] = processing_time * info['size'] / reprocessed_bytes if reprocessed_bytes else 0
+        else:
+            info['seconds'] = state.files[path].get('seconds', 0)
+    time_saved = sum(current_files[path]['seconds'] for path in skipped)
+
+    state.files = current_files
+    state.rows = pd.concat([kept_rows, new_rows], ignore_index=True)
+    state.errors = pd.concat([kept_errors, pd.DataFrame(new_errors, columns=ERROR_COLUMNS)], ignore_index=True)
+
+    # Write the merged outputs; rows are stored raw so types are re-applied every run
+    save_start = time.time()
+    relations_path = output_path("./Relationships/" + custom_name + "-relations.csv", output_format)
+    error_path = output_path("./error/" + custom_name + '-error_details.csv', output_format)
+    if not state.rows.empty:
+        df = add_table_types(state.rows.copy(), types_file_path, input_path, custom_name)
+        write_table(uppercase_output(df), relations_path)
+    elif Path(relations_path).exists():
+        # Every file with lineage was emptied or removed; a stale file would still list its rows
+        Path(relations_path).unlink()
+    if not state.errors.empty:
+        write_table(state.errors, error_path, encoding='utf-8-sig')
+    elif Path(error_path).exists():
+        # Every failing statement was fixed or removed
+        Path(error_path).unlink()
+    state.save(input_path, lineage_engine)
+    save_time = time.time() - save_start
+
+    stats = {
+        'files_scanned': len(current_files),
+        'files_added': len(added),
+        'files_changed': len(changed),
+        'files_deleted': len(deleted),
+        'files_skipped': len(skipped),
+        'files_reprocessed': len(reprocess),
+        'rows_kept': len(kept_rows),
+        'rows_new': len(new_rows),
+        'relationship_rows': len(state.rows),
+        'error_rows': len(state.errors),
+        'successful_queries': successful_queries,
+        'failed_queries': failed_queries,
+        'scan_time': scan_time,
+        'processing_time': processing_time,
+        'save_time': save_time,
+        'total_time': time.time() - start_time,
+        'estimated_time_saved': time_saved,
+        'relations_path': relations_path if not state.rows.empty else None,
+        'error_path': error_path if not state.errors.empty else None,
+    }
+    print_incremental_summary(stats)
+    return stats
+
+
+def print_incremental_summary(stats):
+    print(f"\n{'='*60}")
+    print(f"INCREMENTAL RUN STATISTICS")
+    print(f"{'='*60}")
+    print(f"Files scanned:           {stats['files_scanned']}")
+    print(f"Files added:             {stats['files_added']}")
+    print(f"Files changed:           {stats['files_changed']}")
+    print(f"Files deleted:           {stats['files_deleted']}")
+    print(f"Files skipped:           {stats['files_skipped']}")
+    print(f"Files reprocessed:       {stats['files_reprocessed']}")
+    print(f"Lineage rows kept:       {stats['rows_kept']}")
+    print(f"Lineage rows new:        {stats['rows_new']}")
+    print(f"Lineage rows total:      {stats['relationship_rows']}")
+    print(f"Hashing time:            {stats['scan_time']:.2f} seconds")
+    print(f"Processing time:         {stats['processing_time']:.2f} seconds")
+    print(f"Save time:               {stats['save_time']:.2f} seconds")
+    print(f"Total time:              {stats['total_time']:.2f} seconds")
+    print(f"Estimated time saved:    {stats['estimated_time_saved']:.2f} seconds")
+    print(f"Output file:             {stats['relations_path'] or 'n/a'}")
+    print(f"{'='*60}")
+
+
+def main():
+    """Incremental re-run over a query file or folder."""
+    print("\n" + "="*60)
+    print("INCREMENTAL SQL QUERY PARSER")
+    print("="*60 + "\n")
+
+    custom_name = input("Enter Query name: ")
+    input_path = input("Enter path to query file or folder (press Enter for default 'query.txt'): ").strip() or 'query.txt'
+    if not Path(input_path).exists():
+        logger.error(f"Path does not exist: {input_path}")
+        return
+
+    num_processes_input = input(f"Enter number of processes to use (press Enter for default {max(1, mp.cpu_count() - 1)}): ").strip()
+    num_processes = int(num_processes_input) if num_processes_input else None
+
+    cache_input = input(f"Enter path to lineage cache (press Enter for default '{DEFAULT_CACHE_PATH}', 'none' to disable): ").strip()
+    if not cache_input:
+        cache_path = DEFAULT_CACHE_PATH
+    elif cache_input.lower() == 'none':
+        cache_path = None
+    else:
+        cache_path = cache_input
+
+    format_input = input(f"Enter output format (csv/parquet, press Enter for default '{DEFAULT_OUTPUT_FORMAT}'): ").strip().lower()
+    output_format = format_input or DEFAULT_OUTPUT_FORMAT
+    if output_format not in OUTPUT_FORMATS:
+        logger.warning(f"Unknown output format '{output_format}', using '{DEFAULT_OUTPUT_FORMAT}'")
+        output_format = DEFAULT_OUTPUT_FORMAT
+
+    types_file_path = input("Enter path to object types CSV file (press Enter to skip): ").strip()
+
+    run_incremental(input_path, custom_name, types_file_path, output_format, num_processes=num_processes,
+                    cache_path=cache_path, cache_max_entries=DEFAULT_MAX_ENTRIES)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+"""
+Reproducible benchmark of the lineage pipeline, stage by stage.
+
+Runs the stages MultiProcessingParser and postProcessing chain together on a
+corpus of BTEQ logs, in one process so each stage is timed on its own:
+
+    log_cleaning         clean_bteq_log on every log
+    splitting            statementSplitter on the cleaned SQL
+    preprocessing        preprocess_query on every statement
+    parse                parse_one(dialect='teradata')
+    native_lineage       astLineage on the parsed trees
+    transpile            Teradata -> T-SQL for the statements astLineage can't decide
+    lineage_runner       LineageRunner on the transpiled T-SQL
+    fallback_runner      LineageRunner on the Teradata SQL where the T-SQL one failed
+    typing               lineage rows typed with a TypeCatalog and upper-cased
+    output               relations CSV written
+    voltable_resolution  PandasVOLTABLEResolver load, resolve and save
+
+The corpora are the bundled logfiles/ folder and a synthetic Teradata
+workload from generate_workload, whose statement count, subquery nesting,
+VOLTABLE chain length and share of repeated statements are configurable and
+seeded. Results are written as JSON (per-stage medians of several runs, the
+corpus counts and the environment); given an earlier results file, stages
+whose median got slower beyond a threshold are flagged as regressions and
+the exit status is 1.
+
+The five lineage stages are timed per statement by running extract_lineage
+with the default engine and a lineageProfile.StageTimer, so every statement
+only spends time in the stages a real run takes it through and the stage
+total is the time of a single-process run.
+
+    python lineageBenchmark.py --statements 500 --baseline benchmarks/benchmark-20261018-101500.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+from pathlib import Path
+
+import pandas as pd
+
+from astLineage import DEFAULT_LINEAGE_ENGINE
+from logExtract import clean_bteq_log, get_log_files_from_folder
+from lineageIO import write_table
+from lineageProfile import StageTimer
+from MultiProcessingParser import (RELATION_COLUMNS, extract_lineage, build_lineage_rows, apply_table_types,
+                                   uppercase_output)
+from postProcessing import PandasVOLTABLEResolver
+from queryPreprocessor import preprocess_query
+from statementSplitter import iter_source_statements
+from typeCatalog import TypeCatalog
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BENCHMARK_FORMAT_VERSION = 2
+DEFAULT_RESULTS_DIR = './benchmarks'
+DEFAULT_LOG_FOLDER = './logfiles'
+DEFAULT_REPEATS = 3
+
+# A stage regresses when its median is this much slower, and by more than the noise floor
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+DEFAULT_NOISE_FLOOR_SECONDS = 0.005
+
+# Synthetic workload defaults
+DEFAULT_STATEMENTS = 200
+DEFAULT_SCRIPTS = 10
+DEFAULT_NESTING_DEPTH = 2
+DEFAULT_VOLTABLE_CHAIN = 3
+DEFAULT_REPEAT_RATIO = 0.3
+
+# Stages of extract_lineage, as entered on its StageTimer
+LINEAGE_STAGES = ('parse', 'native_lineage', 'transpile', 'lineage_runner', 'fallback_runner')
+
+STAGES = (('log_cleaning', 'splitting', 'preprocessing') + LINEAGE_STAGES
+          + ('typing', 'output', 'voltable_resolution'))
+
+BENCHMARK_QUERY_NAME = 'BENCHMARK'
+
+# Packages whose versions are recorded with the results
+RECORDED_PACKAGES = ('pandas', 'numpy', 'sqlglot', 'sqllineage', 'pyarrow')
+
+
+def _nested_select(source, join_tables, depth):
+    """SELECT from source wrapped in depth derived tables, each joining one more table."""
+    # The last line must not start with a keyword: clean_bteq_log would keep such a line twice
+    sql = f"SELECT s.KEY_ID, s.AMT\nFROM {source} s WHERE s.AMT > {{amount}}"
+    for level, join_table in zip(range(depth), join_tables):
+        sql = (f"SELECT d{level}.KEY_ID, d{level}.AMT + COALESCE(j{level}.AMT, 0) AS AMT\n"
+               f"FROM ({sql}) d{level} LEFT JOIN {join_table} j{level} ON j{level}.KEY_ID = d{level}.KEY_ID")
+    return sql
+
+
+def generate_workload(statements=DEFAULT_STATEMENTS, scripts=DEFAULT_SCRIPTS, nesting_depth=DEFAULT_NESTING_DEPTH,
+                      voltable_chain=DEFAULT_VOLTABLE_CHAIN, repeat_ratio=DEFAULT_REPEAT_RATIO, seed=0):
+    """
+    Synthetic Teradata load scripts as BTEQ logs.
+
+    Each script builds a chain of voltable_chain volatile tables (each loaded
+    from the previous one and a base table; the names are shared by every
+    script, as real load scripts reuse them), then loads, updates and deletes
+    target tables and replaces views, reading either its last volatile table
+    or a base table through nesting_depth derived tables. A repeat_ratio share
+    of the statements repeat an earlier statement with other literals, so they
+    differ only in what statement_fingerprint ignores. Statements are wrapped
+    in BTEQ banners, dot commands, comments and result messages.
+
+    Args:
+        statements: Total statements across all scripts
+        scripts: Number of logs
+        nesting_depth: Derived tables around the source of each load
+        voltable_chain: Volatile tables created at the start of each script
+        repeat_ratio: Share of statements repeating an earlier one
+        seed: Seed for the random choices; the same arguments give the same logs
+
+    Returns:
+        Tuple of (logs as [(name, text)], object types DataFrame with obj_name
+        and TableKind for typeCatalog)
+    """
+    rng = random.Random(seed)
+    databases = [f"EDW_{i}" for i in range(4)]
+    base_tables = [f"{databases[i % len(databases)]}.SRC_{i}" for i in range(40)]
+    target_tables = [f"{databases[i % len(databases)]}.TGT_{i}" for i in range(20)]
+    views = [f"{databases[i % len(databases)]}_V.V_TGT_{i}" for i in range(len(target_tables))]
+    types_df = pd.DataFrame({'obj_name': base_tables + target_tables + views,
+                             'TableKind': ['T'] * (len(base_tables) + len(target_tables)) + ['V'] * len(views)})
+
+    def render(template):
+        return template.format(amount=rng.randint(0, 10000),
+                               date=f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+
+    templates = []  # every statement template generated so far, for repeats
+    per_script = [statements // scripts + (1 if i < statements % scripts else 0) for i in range(scripts)]
+    logs = []
+    for script, script_statements in enumerate(per_script):
+        lines = [f"{20260101 + script}-010000::ETL",
+                 f"BTEQ 16.20.00.10 (64-bit) Mon Jan  5 01:00:00 2026 PID: {4000 + script}",
+                 "+---------+---------+---------+---------+",
+                 ".logon tdprod/ETL_BATCH,",
+                 " *** Logon successfully completed.",
+                 " *** Total elapsed time was 1 second.",
+                 ".set width 254"]
+        chain = min(voltable_chain, script_statements)
+        for position in range(script_statements):
+            if position < chain:
+                source = f"VT_STAGE_{position - 1}" if position else rng.choice(base_tables)
+                template = (f"CREATE VOLATILE TABLE VT_STAGE_{position} AS (\n"
+                            f"    SELECT a.KEY_ID, a.AMT FROM {source} a\n"
+                            f"    INNER JOIN {rng.choice(base_tables)} b ON a.KEY_ID = b.KEY_ID\n"
+                            f"    WHERE b.LOAD_DT >= DATE '{{date}}'\n"
+                            f") WITH DATA PRIMARY INDEX (KEY_ID) ON COMMIT PRESERVE ROWS;")
+            elif templates and rng.random() < repeat_ratio:
+                template = rng.choice(templates)
+            else:
+                source = f"VT_STAGE_{chain - 1}" if chain and rng.random() < 0.5 else rng.choice(base_tables)
+                target = rng.choice(target_tables)
+                kind = rng.random()
+                if kind < 0.55:
+                    select = _nested_select(source, rng.sample(base_tables, nesting_depth), nesting_depth)
+                    template = f"INSERT INTO {target} (KEY_ID, AMT)\n{select};"
+                elif kind < 0.7:
+                    template = (f"UPDATE t FROM {target} t, {source} s\nSET AMT = s.AMT\n"
+                                f"WHERE t.KEY_ID = s.KEY_ID AND s.AMT > {{amount}};")
+                elif kind < 0.85:
+                    template = f"DELETE FROM {target}\nWHERE LOAD_DT < DATE '{{date}}';"
+                else:
+                    view = views[target_tables.index(target)]
+                    template = f"REPLACE VIEW {view} AS\nLOCKING ROW FOR ACCESS SELECT * FROM {target};"
+            if position >= chain:
+                templates.append(template)
+            if rng.random() < 0.2:
+                lines.append(f"/* step {position}: {rng.choice(['load', 'merge', 'cleanup'])} */")
+            lines.append("+---------+---------+---------+---------+")
+            lines.append(render(template))
+            lines.append("")
+            lines.append(f" *** Insert completed. {rng.randint(0, 100000)} rows added.")
+            lines.append(f" *** Total elapsed time was {rng.randint(1, 60)} seconds.")
+            lines.append("")
+        lines.append(".LOGOFF")
+        logs.append((f"SYNTH_LOAD_{script}", '\n'.join(lines)))
+    return logs, types_df
+
+
+def read_log_corpus(log_folder=DEFAULT_LOG_FOLDER):
+    """Read every log of a folder (as found by logExtract) as [(name, text)]."""
+    logs = []
+    for _, log_file in sorted(get_log_files_from_folder(log_folder)):
+        with open(log_file, 'r', encoding='utf-8') as f:
+            logs.append((Path(log_file).stem, f.read()))
+    return logs
+
+
+def qualified_name_catalog(rows):
+    """Catalog typing every database-qualified table of the rows as a table.
+
+    The bundled logs come without an object types file; volatile tables are
+    the unqualified names, which this leaves to the VolTable default.
+    """
+    names = {row[column] for row in rows for column in ('childTableName', 'parentTableName')
+             if row[column] and '.' in row[column] and not row[column].startswith(BENCHMARK_QUERY_NAME)}
+    return TypeCatalog.from_dataframe(pd.DataFrame({'obj_name': sorted(names), 'TableKind': 'T'}))
+
+
+def run_pipeline(logs, work_dir, type_catalog=None):
+    """
+    Run every stage once over logs and time each one.
+
+    Lineage comes from extract_lineage with the default engine, timed stage
+    by stage per statement.
+
+    Args:
+        logs: [(name, BTEQ log text)]
+        work_dir: Directory for the relations and resolved output files
+        type_catalog: TypeCatalog for typing; qualified_name_catalog of the rows when None
+
+    Returns:
+        Tuple of ({stage: seconds}, {count name: value})
+    """
+    clock = time.perf_counter
+    timings = {}
+    counts = {'logs': len(logs), 'log_bytes': sum(len(text.encode('utf-8')) for _, text in logs)}
+
+    start = clock()
+    cleaned = [(name, clean_bteq_log(text)) for name, text in logs]
+    timings['log_cleaning'] = clock() - start
+
+    start = clock()
+    statements = [(file_nme, one_sql) for file_nme, one_sql, _, _ in iter_source_statements(cleaned)]
+    timings['splitting'] = clock() - start
+    counts['statements'] = len(statements)
+
+    start = clock()
+    preprocessed = [(file_nme, preprocess_query(one_sql)) for file_nme, one_sql in statements]
+    timings['preprocessing'] = clock() - start
+    preprocessed = [(file_nme, one_sql) for file_nme, one_sql in preprocessed if one_sql.strip()]
+
+    for stage in LINEAGE_STAGES:
+        timings[stage] = 0.0
+        counts[f"{stage}_statements"] = 0
+    rows = []
+    lineage_errors = 0
+    for file_nme, one_sql in preprocessed:
+        timer = StageTimer(stage=None)
+        try:
+            lineage = extract_lineage(one_sql, DEFAULT_LINEAGE_ENGINE, timer)
+        except Exception:
+            lineage = None
+            lineage_errors += 1
+        for stage, seconds in timer.finish()['stages'].items():
+            timings[stage] += seconds
+            counts[f"{stage}_statements"] += 1
+        # Rows as process_single_query builds them (not timed: cheap next to the lineage stages)
+        if lineage is not None:
+            rows.extend(build_lineage_rows(*lineage, file_nme, BENCHMARK_QUERY_NAME))
+    counts['lineage_errors'] = lineage_errors
+    counts['lineage_rows'] = len(rows)
+    if type_catalog is None:
+        type_catalog = qualified_name_catalog(rows)
+
+    start = clock()
+    df = pd.DataFrame(rows, columns=RELATION_COLUMNS)
+    df = uppercase_output(apply_table_types(df, type_catalog, BENCHMARK_QUERY_NAME))
+    # postProcessing reads the script column under its original name
+    df = df.rename(columns={'SCRIPT_FILE': 'script_file'})
+    timings['typing'] = clock() - start
+
+    relations_path = Path(work_dir) / f"{BENCHMARK_QUERY_NAME}-relations.csv"
+    start = clock()
+    write_table(df, relations_path)
+    timings['output'] = clock() - start
+
+    start = clock()
+    resolver = PandasVOLTABLEResolver(str(relations_path), str(Path(work_dir) / f"{BENCHMARK_QUERY_NAME}-relations_simplified.csv"))
+    if resolver.load_data():
+        resolver.build_voltable_map()
+        resolver.build_voltable_closure()
+        resolved = resolver.resolve_relationships()
+        resolver.save_data(resolved)
+        counts['resolved_rows'] = len(resolved)
+    timings['voltable_resolution'] = clock() - start
+    return timings, counts
+
+
+def benchmark_workload(logs, repeats=DEFAULT_REPEATS, type_catalog=None):
+    """
+    Run the pipeline repeats times over logs.
+
+    Returns:
+        Dict with the corpus counts, per stage every run's seconds, their
+        median and minimum, and the median of the runs' totals
+    """
+    runs = {stage: [] for stage in STAGES}
+    totals = []
+    counts = {}
+    with tempfile.TemporaryDirectory(prefix='lineage-benchmark-') as work_dir:
+        for _ in range(repeats):
+            timings, counts = run_pipeline(logs, work_dir, type_catalog)
+            for stage in STAGES:
+                runs[stage].append(timings[stage])
+            totals.append(sum(timings[stage] for stage in STAGES))
+    stages = {stage: {'median_seconds': statistics.median(seconds), 'min_seconds': min(seconds), 'runs': seconds}
+              for stage, seconds in runs.items()}
+    return {'counts': counts, 'stages': stages, 'total_median_seconds': statistics.median(totals)}
+
+
+def environment_info():
+    """Interpreter, machine, package versions and git commit the results were measured with."""
+    packages = {}
+    for package in RECORDED_PACKAGES:
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).parent, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'processor': platform.processor(), 'cpu_count': os.cpu_count(),
+            'packages': packages, 'git_commit': commit}
+
+
+def run_benchmarks(log_folder=DEFAULT_LOG_FOLDER, synthetic=None, repeats=DEFAULT_REPEATS, label=None):
+    """
+    Benchmark the log corpus and the synthetic workload.
+
+    Args:
+        log_folder: Folder of BTEQ logs, or None to skip it
+        synthetic: generate_workload keyword arguments, or None to skip it
+        repeats: Pipeline runs per workload
+        label: Free-form label stored with the results
+
+    Returns:
+        Results dict, as saved by save_results
+    """
+    results = {'version': BENCHMARK_FORMAT_VERSION, 'label': label,
+               'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'repeats': repeats,
+               'environment': environment_info(), 'workloads': {}}
+    if log_folder:
+        logs = read_log_corpus(log_folder)
+        if logs:
+            print(f"Benchmarking {len(logs)} logs from {log_folder}...")
+            results['workloads']['logfiles'] = {'config': {'log_folder': str(Path(log_folder).resolve()),
+                                                           'logs': sorted(name for name, _ in logs)},
+                                                **benchmark_workload(logs, repeats)}
+        else:
+            logger.warning(f"No .log files found in {log_folder}, skipping the log corpus")
+    if synthetic is not None:
+        logs, types_df = generate_workload(**synthetic)
+        print(f"Benchmarking synthetic workload of {synthetic.get('statements', DEFAULT_STATEMENTS)} statements...")
+        results['workloads']['synthetic'] = {'config': dict(synthetic),
+                                             **benchmark_workload(logs, repeats, TypeCatalog.from_dataframe(types_df))}
+    return results
+
+
+def save_results(results, path=None, results_dir=DEFAULT_RESULTS_DIR):
+    """Write results as JSON, by default to a timestamped file in results_dir; returns the path."""
+    if path is None:
+        path = Path(results_dir) / f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def load_results(path):
+    """Read a results file written by save_results."""
+    with open(path, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    if results.get('version') != BENCHMARK_FORMAT_VERSION:
+        raise ValueError(f"{path} has benchmark format {results.get('version')}, expected {BENCHMARK_FORMAT_VERSION}")
+    return results
+
+
+def compare_results(baseline, current, threshold=DEFAULT_REGRESSION_THRESHOLD,
+                    noise_floor=DEFAULT_NOISE_FLOOR_SECONDS):
+    """
+    Compare the stage medians of two results.
+
+    Workloads are only compared when both were run with the same
+    configuration; the corpus must be the same for the timings to mean
+    anything.
+
+    Args:
+        baseline: Earlier results
+        current: New results
+        threshold: Relative slowdown that counts as a regression
+        noise_floor: Slowdowns of fewer seconds than this never count
+
+    Returns:
+        List of dicts (workload, stage, baseline and current median seconds,
+        ratio, regression flag), one per stage present in both
+    """
+    comparison = []
+    for workload, result in current['workloads'].items():
+        before = baseline['workloads'].get(workload)
+        if before is None:
+            continue
+        if before['config'] != result['config']:
+            logger.warning(f"Workload '{workload}' was run with a different configuration, not comparing it")
+            continue
+        for stage, timing in result['stages'].items():
+            if stage not in before['stages']:
+                continue
+            baseline_seconds = before['stages'][stage]['median_seconds']
+            current_seconds = timing['median_seconds']
+            ratio = current_seconds / baseline_seconds if baseline_seconds else None
+            regression = (current_seconds - baseline_seconds > noise_floor
+                          and current_seconds > baseline_seconds * (1 + threshold))
+            comparison.append({'workload': workload, 'stage': stage, 'baseline_seconds': baseline_seconds,
+                               'current_seconds': current_seconds, 'ratio': ratio, 'regression': regression})
+    return comparison
+
+
+def print_results(results):
+    """Print the stage medians of every workload."""
+    for workload, result in results['workloads'].items():
+        counts = result['counts']
+        print(f"\n{'='*60}")
+        print(f"PIPELINE BENCHMARK - {workload.upper()}")
+        print(f"{'='*60}")
+        print(f"Logs:                    {counts['logs']} ({counts['log_bytes'] / 1024:.1f} KB)")
+        print(f"Statements:              {counts['statements']} ({counts['lineage_errors']} failed)")
+        print(f"Through LineageRunner:   {counts['lineage_runner_statements']} "
+              f"({counts['fallback_runner_statements']} fell back to Teradata)")
+        print(f"Lineage rows:            {counts['lineage_rows']}")
+        print(f"Resolved rows:           {counts.get('resolved_rows', 'n/a')}")
+        print(f"{'-'*60}")
+        print(f"  {'Stage':22s} {'median s':>10s} {'min s':>10s} {'per stmt ms':>12s}")
+        for stage, timing in result['stages'].items():
+            per_statement = timing['median_seconds'] / counts['statements'] * 1000 if counts['statements'] else 0
+            print(f"  {stage:22s} {timing['median_seconds']:10.4f} {timing['min_seconds']:10.4f} {per_statement:12.3f}")
+        print(f"  {'total':22s} {result['total_median_seconds']:10.4f}")
+        print(f"{'='*60}")
+
+
+def print_comparison(comparison, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """Print a comparison from compare_results and return the number of regressions."""
+    print(f"\n{'='*60}")
+    print(f"COMPARISON WITH BASELINE (regression above +{threshold*100:.0f}%)")
+    print(f"{'='*60}")
+    for row in comparison:
+        ratio = f"{row['ratio']:.2f}x" if row['ratio'] is not None else "n/a"
+        flag = "  REGRESSION" if row['regression'] else ""
+        print(f"  {row['workload'][:10]:10s} {row['stage']:22s} {row['baseline_seconds']:9.4f} -> "
+              f"{row['current_seconds']:9.4f} {ratio:>7s}{flag}")
+    regressions = sum(row['regression'] for row in comparison)
+    print(f"{'-'*60}")
+    print(f"Regressions:             {regressions}")
+    print(f"{'='*60}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the lineage pipeline stage by stage.")
+    parser.add_argument('--logs', default=DEFAULT_LOG_FOLDER, help="folder of BTEQ logs to benchmark")
+    parser.add_argument('--skip-logs', action='store_true', help="don't benchmark the log folder")
+    parser.add_argument('--skip-synthetic', action='store_true', help="don't benchmark the synthetic workload")
+    parser.add_argument('--statements', type=int, default=DEFAULT_STATEMENTS)
+    parser.add_argument('--scripts', type=int, default=DEFAULT_SCRIPTS)
+    parser.add_argument('--nesting-depth', type=int, default=DEFAULT_NESTING_DEPTH)
+    parser.add_argument('--voltable-chain', type=int, default=DEFAULT_VOLTABLE_CHAIN)
+    parser.add_argument('--repeat-ratio', type=float, default=DEFAULT_REPEAT_RATIO)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help="pipeline runs per workload")
+    parser.add_argument('--label', help="label stored with the results")
+    parser.add_argument('--output', help=f"results JSON (default: timestamped file in {DEFAULT_RESULTS_DIR})")
+    parser.add_argument('--baseline', help="earlier results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="relative slowdown flagged as a regression")
+    args = parser.parse_args(argv)
+
+    synthetic = None if args.skip_synthetic else {
+        'statements': args.statements, 'scripts': args.scripts, 'nesting_depth': args.nesting_depth,
+        'voltable_chain': args.voltable_chain, 'repeat_ratio': args.repeat_ratio, 'seed': args.seed}
+    results = run_benchmarks(None if args.skip_logs else args.logs, synthetic, args.repeats, args.label)
+    if not results['workloads']:
+        logger.error("Nothing to benchmark")
+        return 1
+    print_results(results)
+    path = save_results(results, args.output)
+    print(f"\nResults saved to: {path}")
+
+    if args.baseline:
+        comparison = compare_results(load_results(args.baseline), results, args.threshold)
+        if print_comparison(comparison, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
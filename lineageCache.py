@@ -0,0 +1,137 @@
+"""
+Persistent, content-addressed lineage cache backed by SQLite.
+
+Entries are keyed by a hash of the preprocessed SQL text together with the
+sqlglot/sqllineage versions, so a parser upgrade never serves stale lineage.
+Each entry holds the raw extraction outcome (statement type, target and source
+tables, or the error it raised); rows are rebuilt per run because they depend
+on the script file and query name.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import sqlglot
+import sqllineage
+from sqlglot.errors import ParseError, TokenError, UnsupportedError
+from sqllineage.exceptions import InvalidSyntaxException, UnsupportedStatementException
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = './cache/lineage_cache.db'
+DEFAULT_MAX_ENTRIES = 500000
+
+# Bump whenever the extraction logic changes in a way that alters its output
+CACHE_FORMAT_VERSION = 2
+
+# Failures that follow from the SQL text alone. Anything else (MemoryError,
+# RecursionError, an OSError from the cache itself, ...) may not happen again
+# and is retried on the next run
+CACHEABLE_ERRORS = (ParseError, TokenError, UnsupportedError, InvalidSyntaxException, UnsupportedStatementException)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lineage_cache (
+    cache_key     TEXT PRIMARY KEY,
+    success       INTEGER NOT NULL,
+    sql_type      TEXT,
+    target_tables TEXT,
+    source_tables TEXT,
+    error_type    TEXT,
+    error_info    TEXT,
+    created_at    REAL NOT NULL,
+    last_hit      REAL NOT NULL,
+    hit_count     INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_lineage_cache_last_hit ON lineage_cache (last_hit);
+"""
+
+
+def make_cache_key(one_sql: str, lineage_engine: str = '') -> str:
+    """Hash the preprocessed SQL together with the parser versions and lineage engine."""
+    digest = hashlib.sha256()
+    digest.update(f"{CACHE_FORMAT_VERSION}|{sqlglot.__version__}|{sqllineage.VERSION}|{lineage_engine}|".encode('utf-8'))
+    digest.update(one_sql.encode('utf-8', errors='surrogatepass'))
+    return digest.hexdigest()
+
+
+class LineageCache:
+    """SQLite lineage cache with LRU eviction by last hit.
+
+    Safe to open from several worker processes at once: the database runs in
+    WAL mode and every write is a single autocommitted statement.
+    """
+
+    def __init__(self, cache_path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(cache_path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def get(self, cache_key: str) -> Optional[Tuple]:
+        """Return (success, sql_type, target_tables, source_tables, error_type, error_info) or None."""
+        row = self.conn.execute(
+            "SELECT success, sql_type, target_tables, source_tables, error_type, error_info "
+            "FROM lineage_cache WHERE cache_key = ?",
+            (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self.conn.execute(
+            "UPDATE lineage_cache SET last_hit = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+            (time.time(), cache_key)
+        )
+        success, sql_type, target_json, source_json, error_type, error_info = row
+        target_tables = json.loads(target_json) if target_json else []
+        source_tables = json.loads(source_json) if source_json else []
+        return (bool(success), sql_type, target_tables, source_tables, error_type, error_info)
+
+    def put_lineage(self, cache_key: str, sql_type: str, target_tables, source_tables) -> None:
+        """Store a successful extraction outcome."""
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO lineage_cache "
+            "(cache_key, success, sql_type, target_tables, source_tables, error_type, error_info, "
+            "created_at, last_hit, hit_count) VALUES (?, 1, ?, ?, ?, NULL, NULL, ?, ?, 0)",
+            (cache_key, sql_type, json.dumps(list(target_tables)), json.dumps(list(source_tables)), now, now)
+        )
+
+    def put_error(self, cache_key: str, error_type: str, error_info: str) -> None:
+        """Store a failed extraction outcome so it is not retried until the parsers change.
+
+        Only meant for CACHEABLE_ERRORS.
+        """
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO lineage_cache "
+            "(cache_key, success, sql_type, target_tables, source_tables, error_type, error_info, "
+            "created_at, last_hit, hit_count) VALUES (?, 0, NULL, NULL, NULL, ?, ?, ?, ?, 0)",
+            (cache_key, error_type, error_info, now, now)
+        )
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM lineage_cache").fetchone()[0]
+
+    def evict(self) -> int:
+        """Drop the least recently hit entries beyond max_entries. Returns the number removed."""
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute(
+            "DELETE FROM lineage_cache WHERE cache_key IN "
+            "(SELECT cache_key FROM lineage_cache ORDER BY last_hit ASC LIMIT ?)",
+            (excess,)
+        )
+        logger.info(f"Evicted {excess} least recently used entries from {self.cache_path}")
+        return excess
+
+    def close(self) -> None:
+        self.conn.close()
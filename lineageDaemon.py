@@ -0,0 +1,253 @@
+"""
+Headless lineage service that keeps a warm worker pool between jobs.
+
+Every run of MultiProcessingParser.main pays for the interpreter start, the
+pandas/sqlglot/sqllineage imports and a fresh pool whose workers import the
+parser stack again. The daemon pays that once: it imports everything, starts
+a RecyclingPool per process count, warms each worker with a trivial
+statement, and then serves jobs from a spool directory (see lineageSpool).
+
+A job is claimed by renaming it into processing/, so any number of
+submitters can share the spool; run one daemon per spool. The spool works the
+same on Windows, where Unix sockets aren't an option.
+
+    python lineageDaemon.py --processes 8
+    python lineageSpool.py NIGHTLY_LOAD ./sqls --types objects.csv --wait
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import signal
+import sys
+import time
+
+from helper import read_queries_from_input
+from lineageCache import DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES
+from lineageIO import output_path, write_table, OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT
+from astLineage import DEFAULT_LINEAGE_ENGINE
+from workerPool import RecyclingPool
+from MultiProcessingParser import (process_with_multiprocessing, process_single_query, pool_error_result,
+                                   OutputOptions, init_worker, add_table_types, uppercase_output,
+                                   DEFAULT_MAX_TASKS_PER_CHILD, DEFAULT_MAX_WORKER_MEMORY_MB)
+from incrementalRun import run_incremental
+from lineageSpool import spool_dirs, print_job_summary, DEFAULT_SPOOL_DIR, DEFAULT_POLL_INTERVAL
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class LineageDaemon:
+    """Serves lineage jobs from a spool directory with warm worker pools.
+
+    Args:
+        spool_dir: Root of the incoming/processing/done/failed directories
+        processes: Default worker count for jobs that don't set one
+        cache_path: Lineage cache shared by all jobs, or None
+        statement_timeout: Per-statement budget in seconds, or None
+        poll_interval: Seconds to sleep when no job is waiting
+    """
+
+    def __init__(self, spool_dir=DEFAULT_SPOOL_DIR, processes=None, cache_path=DEFAULT_CACHE_PATH,
+                 cache_max_entries=DEFAULT_MAX_ENTRIES, lineage_engine=DEFAULT_LINEAGE_ENGINE,
+                 statement_timeout=None, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.dirs = spool_dirs(spool_dir)
+        self.processes = processes or max(1, mp.cpu_count() - 1)
+        self.cache_path = cache_path
+        self.cache_max_entries = cache_max_entries
+        self.lineage_engine = lineage_engine
+        self.statement_timeout = statement_timeout
+        self.poll_interval = poll_interval
+        self.pools = {}
+        self.jobs_done = 0
+        self.jobs_failed = 0
+
+    def get_pool(self, processes):
+        """Return the warm pool for a worker count, starting and warming it on first use."""
+        pool = self.pools.get(processes)
+        if pool is None:
+            warm_start = time.time()
+            pool = RecyclingPool(processes, init_worker, (self.cache_path, self.cache_max_entries, self.lineage_engine),
+                                 task_timeout=self.statement_timeout,
+                                 max_tasks_per_child=DEFAULT_MAX_TASKS_PER_CHILD,
+                                 max_memory_mb=DEFAULT_MAX_WORKER_MEMORY_MB,
+                                 error_result=pool_error_result)
+            # One trivial statement per worker pulls the whole parser stack into every process
+            pool.map(process_single_query, [(('warmup', 'SELECT 1'), 'warmup', idx) for idx in range(processes)])
+            self.pools[processes] = pool
+            logger.info(f"Started {processes}-worker pool in {time.time() - warm_start:.2f} seconds")
+        return pool
+
+    def run_job(self, job):
+        """Run one job and return the timings and counts to record with it."""
+        custom_name = job['custom_name']
+        input_path = job['input_path']
+        types_file_path = job.get('types_file_path')
+        output_format = job.get('output_format') or DEFAULT_OUTPUT_FORMAT
+        stream_output = bool(job.get('stream_output'))
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+        timings = {}
+
+        if job.get('incremental'):
+            if stream_output:
+                raise ValueError("Incremental jobs can't stream their output")
+            stats = run_incremental(input_path, custom_name, types_file_path, output_format,
+                                    lineage_engine=self.lineage_engine, cache_path=self.cache_path,
+                                    cache_max_entries=self.cache_max_entries,
+                                    pool=self.get_pool(job.get('processes') or self.processes))
+            timings.update(hashing=stats['scan_time'], processing=stats['processing_time'],
+                           save=stats['save_time'])
+            return {
+                'timings': timings,
+                'successful_queries': stats['successful_queries'],
+                'failed_queries': stats['failed_queries'],
+                'relationship_rows': stats['relationship_rows'],
+                'relations_path': stats['relations_path'],
+                'files_skipped': stats['files_skipped'],
+                'files_reprocessed': stats['files_reprocessed'],
+                'estimated_time_saved': stats['estimated_time_saved'],
+            }
+
+        read_start = time.time()
+        sql = read_queries_from_input(input_path, stream=True)
+        timings['read'] = time.time() - read_start
+        if not sql:
+            raise ValueError(f"No queries found in {input_path}")
+
+        pool = self.get_pool(job.get('processes') or self.processes)
+        df, timings['processing'], successful_queries, failed_queries = process_with_multiprocessing(
+            sql, custom_name, cache_path=self.cache_path, cache_max_entries=self.cache_max_entries, pool=pool,
+            output_options=OutputOptions(stream_output=stream_output, types_file_path=types_file_path,
+                                         input_path=input_path, output_format=output_format)
+        )
+
+        relations_path = output_path("./Relationships/" + custom_name + "-relations.csv", output_format)
+        rows = None
+        if not stream_output and not df.empty:
+            types_start = time.time()
+            df = add_table_types(df, types_file_path, input_path, custom_name)
+            timings['types'] = time.time() - types_start
+
+            save_start = time.time()
+            write_table(uppercase_output(df), relations_path)
+            timings['save'] = time.time() - save_start
+            rows = len(df)
+
+        return {
+            'timings': timings,
+            'successful_queries': successful_queries,
+            'failed_queries': failed_queries,
+            'relationship_rows': rows,
+            'relations_path': relations_path,
+        }
+
+    def claim_next_job(self):
+        """Move the oldest waiting job into processing/ and return its path, or None."""
+        for job_path in sorted(self.dirs['incoming'].glob('*.json')):
+            claimed_path = self.dirs['processing'] / job_path.name
+            try:
+                job_path.rename(claimed_path)
+            except OSError:
+                # Withdrawn by its submitter before it could be claimed
+                continue
+            return claimed_path
+        return None
+
+    def read_job_file(self, claimed_path):
+        """Parse a claimed job file; raises ValueError (or OSError) for one that isn't a job."""
+        job = json.loads(claimed_path.read_text(encoding='utf-8'))
+        if not isinstance(job, dict):
+            raise ValueError(f"Job file holds a JSON {type(job).__name__}, not an object")
+        return job
+
+    def process_job_file(self, claimed_path):
+        job_start = time.time()
+        try:
+            job = self.read_job_file(claimed_path)
+        except (OSError, ValueError) as e:
+            # Recorded as failed instead of ending the daemon, which would retry it on every restart
+            logger.error(f"Unreadable job file {claimed_path.name}: {e}")
+            job = {'job_id': claimed_path.stem}
+            if isinstance(e, ValueError):
+                job['job_text'] = claimed_path.read_bytes().decode('utf-8', 'replace')
+            job['error'] = f"{type(e).__name__}: {e}"
+            job['finished_at'] = time.time()
+            job['total_time'] = job['finished_at'] - job_start
+            job['status'] = 'failed'
+            self.jobs_failed += 1
+            (self.dirs['failed'] / claimed_path.name).write_text(json.dumps(job, indent=2), encoding='utf-8')
+            claimed_path.unlink(missing_ok=True)
+            print_job_summary(job)
+            return
+        print(f"\n>>> Job {job.get('job_id')} ({job.get('custom_name')}) started")
+        try:
+            job['started_at'] = job_start
+            job['queue_wait'] = job_start - job.get('submitted_at', job_start)
+            job.update(self.run_job(job))
+            state = 'done'
+            self.jobs_done += 1
+        except Exception as e:
+            logger.exception(f"Job {job.get('job_id')} failed")
+            job['error'] = f"{type(e).__name__}: {e}"
+            state = 'failed'
+            self.jobs_failed += 1
+            # Its pool may still be running the job's statements; the next job gets fresh workers
+            self.close()
+        job['finished_at'] = time.time()
+        job['total_time'] = job['finished_at'] - job_start
+        job['status'] = state
+
+        result_path = self.dirs[state] / claimed_path.name
+        result_path.write_text(json.dumps(job, indent=2), encoding='utf-8')
+        claimed_path.unlink()
+        print_job_summary(job)
+
+    def serve_forever(self):
+        """Process jobs until interrupted."""
+        # Jobs left in processing/ by a daemon that died are retried
+        for stale_path in self.dirs['processing'].glob('*.json'):
+            stale_path.rename(self.dirs['incoming'] / stale_path.name)
+
+        self.get_pool(self.processes)
+        print(f"Lineage daemon ready: {self.processes} warm workers, spool {self.dirs['incoming'].parent}")
+        try:
+            while True:
+                claimed_path = self.claim_next_job()
+                if claimed_path is None:
+                    time.sleep(self.poll_interval)
+                    continue
+                self.process_job_file(claimed_path)
+        except KeyboardInterrupt:
+            print("\nShutting down lineage daemon...")
+        finally:
+            self.close()
+            print(f"Jobs completed: {self.jobs_done}, failed: {self.jobs_failed}")
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.terminate()
+        self.pools = {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm-worker lineage daemon")
+    parser.add_argument('--spool-dir', default=DEFAULT_SPOOL_DIR, help="Spool directory submitters write jobs to")
+    parser.add_argument('--processes', type=int, default=None, help="Default number of worker processes")
+    parser.add_argument('--cache-path', default=DEFAULT_CACHE_PATH, help="Lineage cache path, or 'none'")
+    parser.add_argument('--statement-timeout', type=float, default=None, help="Per-statement budget in seconds")
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL)
+    args = parser.parse_args(argv)
+
+    cache_path = None if args.cache_path.lower() == 'none' else args.cache_path
+    daemon = LineageDaemon(args.spool_dir, args.processes, cache_path=cache_path,
+                           statement_timeout=args.statement_timeout, poll_interval=args.poll_interval)
+    # Let service managers stop the daemon cleanly
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    daemon.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,421 @@
+"""
+Compact in-memory lineage graph for impact analysis.
+
+A relations table (MultiProcessingParser output or the postProcessing
+simplified file) is loaded once into integer arrays: table names are interned
+to IDs in name order, every edge is a (parent ID, child ID) pair with its
+relationship and script file as codes into small side vocabularies, and two
+CSR indexes list each table's incoming edges (upstream) and outgoing edges
+(downstream). Walks expand a whole BFS level at a time with numpy, so
+"what feeds X" and "what breaks if Y goes" take milliseconds on millions of
+edges. The arrays are saved to one .npz file that reloads without rebuilding.
+
+    graph = LineageGraph.from_table('./Relationships/NIGHTLY-relations.csv')
+    graph.save('./Relationships/NIGHTLY-graph.npz')
+    graph = LineageGraph.load('./Relationships/NIGHTLY-graph.npz')
+    graph.upstream('DWH.SALES_FACT', max_depth=3)
+"""
+
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from lineageIO import read_table
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Bump whenever the saved array layout changes
+GRAPH_FORMAT_VERSION = 1
+
+DIRECTIONS = ('upstream', 'downstream')
+
+
+def _vocabulary(*columns: pd.Series) -> pd.Index:
+    """Sorted distinct non-missing values of the columns."""
+    vocabulary = pd.Index([], dtype='str')
+    for column in columns:
+        if not isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.astype('category')
+        # pandas' string dtype sorts and hashes much faster than object strings
+        categories = column.cat.categories.astype('str')
+        codes = column.cat.codes.to_numpy()
+        used = np.bincount(codes[codes >= 0], minlength=len(categories)) > 0
+        vocabulary = vocabulary.union(categories[used], sort=False)
+    return vocabulary.sort_values()
+
+
+def _codes(column: pd.Series, vocabulary: pd.Index) -> np.ndarray:
+    """Positions of a column's values in vocabulary, -1 where missing."""
+    if not isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.astype('category')
+    # The trailing -1 keeps missing values (code -1) missing
+    recode = np.append(vocabulary.get_indexer(column.cat.categories.astype('str')), -1)
+    return recode[column.cat.codes.to_numpy()].astype(np.int32)
+
+
+def build_csr(keys: np.ndarray, size: int):
+    """Group edge IDs by key: edges of key k are edges[indptr[k]:indptr[k + 1]]."""
+    edges = np.argsort(keys, kind='stable').astype(np.int32)
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=indptr[1:])
+    return indptr, edges
+
+
+def gather_ranges(indptr: np.ndarray, values: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Concatenation of values[indptr[k]:indptr[k + 1]] for every k in keys, without a Python loop."""
+    starts = indptr[keys]
+    counts = indptr[keys + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=values.dtype)
+    # Position i of the flattened ranges is starts[k] + (i - first position of range k)
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return values[offsets + np.arange(total)]
+
+
+def distinct(values: np.ndarray) -> np.ndarray:
+    """Sorted distinct values; cheaper than np.unique for the many small arrays of a level-by-level walk."""
+    values = np.sort(values)
+    return values[np.concatenate(([True], values[1:] != values[:-1]))] if len(values) else values
+
+
+def _encode_strings(values: Sequence[str]):
+    # One UTF-8 blob plus offsets instead of per-string objects in the file
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(blob: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return np.array([data[start:end].decode('utf-8') for start, end in zip(bounds, bounds[1:])], dtype=object)
+
+
+class LineageGraph:
+    """Interned lineage graph with CSR adjacency in both directions.
+
+    Args:
+        names: Table names in ID order (sorted)
+        edge_parents, edge_children: Table IDs of each edge's ends
+        edge_relationships: Per-edge code into relationship_names, -1 if missing
+        relationship_names: Relationship vocabulary
+        edge_scripts: Per-edge code into script_names, -1 if missing
+        script_names: Script file vocabulary
+    """
+
+    def __init__(self, names, edge_parents, edge_children, edge_relationships, relationship_names,
+                 edge_scripts, script_names, upstream_csr=None, downstream_csr=None):
+        self.names = np.asarray(names, dtype=object)
+        self.edge_parents = np.asarray(edge_parents, dtype=np.int32)
+        self.edge_children = np.asarray(edge_children, dtype=np.int32)
+        self.edge_relationships = np.asarray(edge_relationships, dtype=np.int32)
+        self.relationship_names = np.asarray(relationship_names, dtype=object)
+        self.edge_scripts = np.asarray(edge_scripts, dtype=np.int32)
+        self.script_names = np.asarray(script_names, dtype=object)
+        # Incoming edges per table for upstream walks, outgoing edges for downstream ones
+        self.upstream_indptr, self.upstream_edges = upstream_csr or build_csr(self.edge_children, len(self.names))
+        self.downstream_indptr, self.downstream_edges = downstream_csr or build_csr(self.edge_parents, len(self.names))
+        self._name_index = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'LineageGraph':
+        """Build the graph from a relations DataFrame; column names are matched case-insensitively.
+
+        Needs CHILDTABLENAME and PARENTTABLENAME; RELATIONSHIP and SCRIPT_FILE are
+        kept when present. Rows missing either table are skipped and repeated
+        edges are stored once.
+        """
+        columns = {str(column).upper(): column for column in df.columns}
+        missing = {'CHILDTABLENAME', 'PARENTTABLENAME'} - set(columns)
+        if missing:
+            raise ValueError(f"Relations table is missing columns: {sorted(missing)}")
+        df = df[df[columns['CHILDTABLENAME']].notna() & df[columns['PARENTTABLENAME']].notna()]
+
+        names = _vocabulary(df[columns['PARENTTABLENAME']], df[columns['CHILDTABLENAME']])
+        edges = pd.DataFrame({
+            'parent': _codes(df[columns['PARENTTABLENAME']], names),
+            'child': _codes(df[columns['CHILDTABLENAME']], names),
+        })
+        side_vocabularies = {}
+        for side, column_name in (('relationship', 'RELATIONSHIP'), ('script', 'SCRIPT_FILE')):
+            if column_name in columns:
+                side_vocabularies[side] = _vocabulary(df[columns[column_name]])
+                edges[side] = _codes(df[columns[column_name]], side_vocabularies[side])
+            else:
+                side_vocabularies[side] = pd.Index([], dtype=object)
+                edges[side] = np.full(len(edges), -1, dtype=np.int32)
+        edges = edges.drop_duplicates()
+
+        return cls(names.to_numpy(dtype=object), edges['parent'].to_numpy(), edges['child'].to_numpy(),
+                   edges['relationship'].to_numpy(), side_vocabularies['relationship'].to_numpy(dtype=object),
+                   edges['script'].to_numpy(), side_vocabularies['script'].to_numpy(dtype=object))
+
+    @classmethod
+    def from_table(cls, path: str) -> 'LineageGraph':
+        """Build the graph from a relations CSV or Parquet file."""
+        return cls.from_frame(read_table(path))
+
+    def save(self, path: str) -> None:
+        """Write every array, including the CSR indexes, to one uncompressed .npz file."""
+        arrays = {'format_version': np.array([GRAPH_FORMAT_VERSION])}
+        for prefix, values in (('names', self.names), ('relationship_names', self.relationship_names),
+                               ('script_names', self.script_names)):
+            arrays[f'{prefix}_blob'], arrays[f'{prefix}_offsets'] = _encode_strings(values)
+        for attribute in ('edge_parents', 'edge_children', 'edge_relationships', 'edge_scripts',
+                          'upstream_indptr', 'upstream_edges', 'downstream_indptr', 'downstream_edges'):
+            arrays[attribute] = getattr(self, attribute)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        temp_path = Path(path).with_suffix('.tmp.npz')
+        np.savez(temp_path, **arrays)
+        temp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: str) -> 'LineageGraph':
+        """Load a graph written by save."""
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data['format_version'][0])
+            if version != GRAPH_FORMAT_VERSION:
+                raise ValueError(f"{path} has graph format {version}, expected {GRAPH_FORMAT_VERSION}")
+            strings = {prefix: _decode_strings(data[f'{prefix}_blob'], data[f'{prefix}_offsets'])
+                       for prefix in ('names', 'relationship_names', 'script_names')}
+            return cls(strings['names'], data['edge_parents'], data['edge_children'],
+                       data['edge_relationships'], strings['relationship_names'],
+                       data['edge_scripts'], strings['script_names'],
+                       upstream_csr=(data['upstream_indptr'], data['upstream_edges']),
+                       downstream_csr=(data['downstream_indptr'], data['downstream_edges']))
+
+    @property
+    def table_count(self) -> int:
+        return len(self.names)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_parents)
+
+    def table_id(self, name: str) -> int:
+        """ID of a table; names are matched as given, then stripped and upper-cased as the relations CSV writes them."""
+        if self._name_index is None:
+            self._name_index = pd.Index(self.names)
+        for candidate in (name, name.strip().upper()):
+            if candidate in self._name_index:
+                return self._name_index.get_loc(candidate)
+        raise KeyError(f"Unknown table: {name}")
+
+    def _edge_filter(self, relationships: Optional[Sequence[str]]) -> Optional[np.ndarray]:
+        if relationships is None:
+            return None
+        wanted = np.flatnonzero(np.isin(self.relationship_names, list(relationships)))
+        return np.isin(self.edge_relationships, wanted)
+
+    def _level_edges(self, frontier: np.ndarray, direction: str) -> np.ndarray:
+        """IDs of all edges leaving the frontier tables in the walk direction."""
+        if direction == 'upstream':
+            return gather_ranges(self.upstream_indptr, self.upstream_edges, frontier)
+        return gather_ranges(self.downstream_indptr, self.downstream_edges, frontier)
+
+    def _levels(self, table: str, direction: str, max_depth: Optional[int],
+                relationships: Optional[Sequence[str]]):
+        """Yield (edges crossed, tables first reached, depth) per BFS level."""
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction '{direction}', expected one of {DIRECTIONS}")
+        edge_mask = self._edge_filter(relationships)
+        next_ends = self.edge_parents if direction == 'upstream' else self.edge_children
+        reached = np.zeros(len(self.names), dtype=bool)
+        frontier = np.array([self.table_id(table)], dtype=np.int64)
+        reached[frontier] = True
+
+        depth = 0
+        while len(frontier) and (max_depth is None or depth < max_depth):
+            depth += 1
+            edges = self._level_edges(frontier, direction)
+            if edge_mask is not None:
+                edges = edges[edge_mask[edges]]
+            ends = distinct(next_ends[edges])
+            frontier = ends[~reached[ends]]
+            reached[frontier] = True
+            yield edges, frontier, depth
+
+    def walk(self, table: str, direction: str = 'upstream', max_depth: Optional[int] = None,
+             relationships: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Tables reached breadth-first from a table, with their distance from it.
+
+        Args:
+            table: Table to start from
+            direction: 'upstream' follows edges to parents (what feeds the table),
+                'downstream' to children (what is affected by it)
+            max_depth: Levels to expand; None walks until nothing new is reached
+            relationships: Only follow edges with these relationship types
+
+        Returns:
+            DataFrame with TABLENAME and DEPTH (the fewest edges from the start
+            table), ordered by depth then name; the start table is not included
+        """
+        ids, depths = [], []
+        for _, reached, depth in self._levels(table, direction, max_depth, relationships):
+            # IDs are in name order and distinct sorts them, so each level is already sorted by name
+            ids.append(reached)
+            depths.append(np.full(len(reached), depth))
+        ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+        depths = np.concatenate(depths) if depths else np.empty(0, dtype=np.int64)
+        return pd.DataFrame({'TABLENAME': self.names[ids], 'DEPTH': depths})
+
+    def walk_edges(self, table: str, direction: str = 'upstream', max_depth: Optional[int] = None,
+                   relationships: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Breadth-first walk from a table, returning every edge it crosses.
+
+        Args are as for walk.
+
+        Returns:
+            DataFrame with PARENTTABLENAME, CHILDTABLENAME, RELATIONSHIP,
+            SCRIPT_FILE and DEPTH (1 for the start table's own edges). Edges
+            into tables already reached are included, so cycles show up.
+        """
+        edges, depths = [], []
+        for level_edges, _, depth in self._levels(table, direction, max_depth, relationships):
+            edges.append(level_edges)
+            depths.append(np.full(len(level_edges), depth))
+        edges = np.concatenate(edges) if edges else np.empty(0, dtype=np.int32)
+        depths = np.concatenate(depths) if depths else np.empty(0, dtype=np.int64)
+        return pd.DataFrame({
+            'PARENTTABLENAME': self.names[self.edge_parents[edges]],
+            'CHILDTABLENAME': self.names[self.edge_children[edges]],
+            'RELATIONSHIP': self._side_values(self.edge_relationships[edges], self.relationship_names),
+            'SCRIPT_FILE': self._side_values(self.edge_scripts[edges], self.script_names),
+            'DEPTH': depths,
+        })
+
+    def walk_depth_first(self, table: str, direction: str = 'upstream', max_depth: Optional[int] = None,
+                         relationships: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Tables reached depth-first from a table, in visiting order.
+
+        Each branch is followed to the end (or max_depth) before its siblings,
+        siblings in name order, which reads like an indented lineage tree. The
+        tables and their DEPTH (the fewest edges from the start table) are the
+        same as in walk; only the order differs. Args are as for walk.
+
+        Returns:
+            DataFrame with TABLENAME and DEPTH; the start table is not included
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction '{direction}', expected one of {DIRECTIONS}")
+        edge_mask = self._edge_filter(relationships)
+        indptr, csr_edges = ((self.upstream_indptr, self.upstream_edges) if direction == 'upstream'
+                             else (self.downstream_indptr, self.downstream_edges))
+        next_ends = self.edge_parents if direction == 'upstream' else self.edge_children
+        start_id = self.table_id(table)
+        unreached = np.iinfo(np.int64).max
+        shallowest = np.full(len(self.names), unreached, dtype=np.int64)
+        position = {}
+
+        ids, depths = [], []
+        stack = [(start_id, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if depth >= shallowest[node]:
+                continue
+            # A table keeps the place of its first visit; a shorter path found later lowers its
+            # depth and expands it again, so max_depth cuts off the same tables as in walk
+            if shallowest[node] == unreached and depth:
+                position[node] = len(ids)
+                ids.append(node)
+                depths.append(depth)
+            elif depth:
+                depths[position[node]] = depth
+            shallowest[node] = depth
+            if max_depth is not None and depth >= max_depth:
+                continue
+            edges = csr_edges[indptr[node]:indptr[node + 1]]
+            if edge_mask is not None:
+                edges = edges[edge_mask[edges]]
+            ends = distinct(next_ends[edges])
+            ends = ends[shallowest[ends] > depth + 1]
+            # Reversed so the first name pops first
+            stack.extend((int(end), depth + 1) for end in ends[::-1])
+        return pd.DataFrame({'TABLENAME': self.names[np.asarray(ids, dtype=np.int64)],
+                             'DEPTH': np.asarray(depths, dtype=np.int64)})
+
+    @staticmethod
+    def _side_values(codes: np.ndarray, vocabulary: np.ndarray) -> np.ndarray:
+        # Missing codes (-1) index the appended None
+        return np.append(vocabulary, None)[codes]
+
+    def upstream(self, table: str, max_depth: Optional[int] = None,
+                 relationships: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Tables that feed table, directly or through other tables."""
+        return self.walk(table, 'upstream', max_depth, relationships)
+
+    def downstream(self, table: str, max_depth: Optional[int] = None,
+                   relationships: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Tables loaded from table, directly or through other tables."""
+        return self.walk(table, 'downstream', max_depth, relationships)
+
+    def parents(self, table: str) -> pd.DataFrame:
+        """Direct incoming edges of a table with their relationship and script file."""
+        return self.walk_edges(table, 'upstream', max_depth=1).drop(columns='DEPTH')
+
+    def children(self, table: str) -> pd.DataFrame:
+        """Direct outgoing edges of a table with their relationship and script file."""
+        return self.walk_edges(table, 'downstream', max_depth=1).drop(columns='DEPTH')
+
+
+def graph_path_for(relations_path: str) -> str:
+    """Default index file next to a relations file: NAME-relations.csv -> NAME-relations.graph.npz."""
+    return str(Path(relations_path).with_suffix('.graph.npz'))
+
+
+def main():
+    """Build or load a graph index and answer upstream/downstream queries."""
+    print("\n" + "="*60)
+    print("LINEAGE GRAPH INDEX")
+    print("="*60 + "\n")
+
+    input_path = input("Enter path to relations CSV/Parquet or graph .npz file: ").strip()
+    if not Path(input_path).exists():
+        print(f"File not found: {input_path}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    if input_path.endswith('.npz'):
+        graph = LineageGraph.load(input_path)
+        print(f"Loaded graph in {time.perf_counter() - start:.3f} seconds")
+    else:
+        graph = LineageGraph.from_table(input_path)
+        build_time = time.perf_counter() - start
+        graph_path = graph_path_for(input_path)
+        graph.save(graph_path)
+        print(f"Built graph in {build_time:.3f} seconds, saved to {graph_path}")
+    print(f"Tables: {graph.table_count}, edges: {graph.edge_count}")
+
+    while True:
+        table = input("\nEnter table name (press Enter to quit): ").strip()
+        if not table:
+            break
+        direction = input("Direction (upstream/downstream, press Enter for upstream): ").strip().lower() or 'upstream'
+        depth_input = input("Maximum depth (press Enter for no limit): ").strip()
+        max_depth = int(depth_input) if depth_input else None
+        order = input("Order (bfs/dfs, press Enter for bfs): ").strip().lower() or 'bfs'
+        walk = graph.walk_depth_first if order == 'dfs' else graph.walk
+        try:
+            query_start = time.perf_counter()
+            result = walk(table, direction, max_depth)
+            query_time = time.perf_counter() - query_start
+        except (KeyError, ValueError) as e:
+            print(f"Error: {e}")
+            continue
+        print(result.to_string(index=False) if not result.empty else "No tables reached")
+        print(f"{len(result)} tables in {query_time * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Reading and writing lineage tables as CSV or Parquet.
+
+CSV stays the default. Parquet output stores every text column as a string
+column with dictionary encoding (table names, types, relationship and script
+file repeat heavily), query indexes and offsets as int64, and reads the name
+columns back as pandas categoricals, so postProcessing and the reporting
+scripts load large lineage sets without re-parsing and re-stripping text.
+Parquet needs pyarrow.
+"""
+
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ('csv', 'parquet')
+DEFAULT_OUTPUT_FORMAT = 'csv'
+
+FORMAT_SUFFIXES = {'csv': '.csv', 'parquet': '.parquet'}
+
+# Columns stored as int64 in Parquet; everything else is text
+INTEGER_COLUMNS = {'QUERY_INDEX', 'START_OFFSET', 'END_OFFSET'}
+
+# Low-cardinality columns read back as categoricals
+CATEGORY_COLUMN_SUFFIXES = ('TABLENAME', 'TABLETYPE', 'TYPES', 'RELATIONSHIP', 'SCRIPT_FILE', 'ERROR_TYPE')
+
+
+def _require_pyarrow():
+    if pq is None:
+        raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+
+
+def format_of(path):
+    """Return the output format implied by a file's suffix."""
+    return 'parquet' if Path(path).suffix.lower() == '.parquet' else 'csv'
+
+
+def output_path(path, output_format=DEFAULT_OUTPUT_FORMAT):
+    """Swap the suffix of a .csv output path for the chosen format."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+    if output_format == 'csv':
+        return path
+    return str(Path(path).with_suffix(FORMAT_SUFFIXES[output_format]))
+
+
+def is_category_column(column):
+    return str(column).upper().endswith(CATEGORY_COLUMN_SUFFIXES)
+
+
+def arrow_schema(columns):
+    """Parquet schema for a lineage table: int64 index/offset columns, strings elsewhere."""
+    _require_pyarrow()
+    return pa.schema([(column, pa.int64() if str(column).upper() in INTEGER_COLUMNS else pa.string())
+                      for column in columns])
+
+
+def _to_arrow(df, schema):
+    # Categoricals and mixed object columns are normalized to the schema's types
+    columns = {}
+    for field in schema:
+        values = df[field.name]
+        if pa.types.is_integer(field.type):
+            values = pd.to_numeric(values, errors='coerce').astype('Int64')
+        else:
+            values = values.astype(object).where(values.notna(), None)
+        columns[field.name] = pa.array(values, type=field.type, from_pandas=True)
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+def write_table(df, path, **csv_kwargs):
+    """Write df to path in the format given by its suffix; csv_kwargs go to DataFrame.to_csv."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if format_of(path) == 'csv':
+        df.to_csv(path, index=False, **csv_kwargs)
+        return
+    _require_pyarrow()
+    pq.write_table(_to_arrow(df, arrow_schema(df.columns)), path, use_dictionary=True, compression='snappy')
+
+
+def read_table(path):
+    """Read a lineage table written by write_table or TableAppender.
+
+    Name/type columns come back as categoricals, from CSV as from Parquet.
+    """
+    if format_of(path) == 'csv':
+        header = pd.read_csv(path, nrows=0).columns
+        return pd.read_csv(path, dtype={name: 'category' for name in header if is_category_column(name)})
+    _require_pyarrow()
+    schema = pq.read_schema(path)
+    category_columns = [name for name in schema.names if is_category_column(name)]
+    return pq.read_table(path, read_dictionary=category_columns).to_pandas()
+
+
+class TableAppender:
+    """Appends DataFrame batches to one CSV or Parquet file.
+
+    The first batch creates the file (with a header for CSV, fixing the schema
+    for Parquet); later batches are appended. close() must be called to finish
+    a Parquet file.
+    """
+
+    def __init__(self, path, **csv_kwargs):
+        self.path = path
+        self.output_format = format_of(path)
+        self.csv_kwargs = csv_kwargs
+        self.rows_written = 0
+        self._parquet_writer = None
+        self._schema = None
+
+    def append(self, df):
+        if self.rows_written == 0:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        if self.output_format == 'csv':
+            first_batch = self.rows_written == 0
+            df.to_csv(self.path, mode='w' if first_batch else 'a', header=first_batch,
+                      index=False, **self.csv_kwargs)
+        else:
+            if self._parquet_writer is None:
+                self._schema = arrow_schema(df.columns)
+                self._parquet_writer = pq.ParquetWriter(self.path, self._schema, use_dictionary=True,
+                                                        compression='snappy')
+            self._parquet_writer.write_table(_to_arrow(df, self._schema))
+        self.rows_written += len(df)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
@@ -0,0 +1,179 @@
+"""
+Opt-in per-stage timing of statement processing.
+
+With profiling on, each worker times every statement it processes stage by
+stage with a StageTimer: preprocessing, the cache lookup, parse_one, the
+native AST walk, the T-SQL transpile, LineageRunner, the Teradata fallback
+LineageRunner, row building and, with shard output, the shard write. The
+time of a stage that raises still counts towards it. Alongside the timings
+a worker reports its pid, its peak RSS and how much its RSS grew during the
+statement.
+
+The parent feeds every profile into a StageProfiler, which keeps a
+log-scale histogram per stage (so memory doesn't grow with the corpus) and
+the top-N slowest statements with their stage breakdown.
+"""
+
+import heapq
+import os
+import time
+
+import pandas as pd
+
+from helper import get_peak_rss_mb, get_current_rss_mb
+
+# Stages in processing order
+PROFILE_STAGES = ('preprocess', 'cache', 'parse', 'native_lineage', 'transpile', 'lineage_runner',
+                  'fallback_runner', 'rows', 'shard_write')
+
+DEFAULT_PROFILE_TOP_N = 50
+
+# Histogram buckets: bucket k counts durations below HISTOGRAM_FIRST_EDGE * 2**k seconds
+HISTOGRAM_FIRST_EDGE = 0.0001
+HISTOGRAM_BUCKETS = 22
+
+
+class StageTimer:
+    """Times one statement's stages; time accrues to the current stage until the next enter().
+
+    Args:
+        stage: Stage the statement starts in
+    """
+
+    def __init__(self, stage='preprocess'):
+        self.stages = {}
+        self.sql_type = None
+        self._stage = stage
+        self._rss_before = get_current_rss_mb()
+        self._start = self._last = time.perf_counter()
+
+    def enter(self, stage):
+        now = time.perf_counter()
+        if self._stage is not None:
+            self.stages[self._stage] = self.stages.get(self._stage, 0.0) + now - self._last
+        self._stage, self._last = stage, now
+
+    def finish(self):
+        """Close the current stage and return the statement's profile dict."""
+        self.enter(None)
+        rss_after = get_current_rss_mb()
+        return {
+            'stages': self.stages,
+            'total': self._last - self._start,
+            'sql_type': self.sql_type,
+            'pid': os.getpid(),
+            'peak_rss_mb': get_peak_rss_mb(),
+            'rss_growth_mb': rss_after - self._rss_before if rss_after is not None and self._rss_before is not None else None,
+        }
+
+
+class StageHistogram:
+    """Count, total, maximum and log-scale buckets of one stage's durations."""
+
+    def __init__(self):
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        bucket = 0
+        edge = HISTOGRAM_FIRST_EDGE
+        while seconds >= edge and bucket < HISTOGRAM_BUCKETS - 1:
+            bucket += 1
+            edge *= 2
+        self.buckets[bucket] += 1
+
+    def percentile(self, fraction):
+        """Upper edge of the bucket holding the given fraction of durations (the maximum for the last)."""
+        if not self.count:
+            return 0.0
+        needed = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= needed:
+                return min(HISTOGRAM_FIRST_EDGE * 2 ** bucket, self.max)
+        return self.max
+
+
+class StageProfiler:
+    """Aggregates statement profiles in the parent.
+
+    Args:
+        top_n: Number of slowest statements kept for the report
+    """
+
+    def __init__(self, top_n=DEFAULT_PROFILE_TOP_N):
+        self.top_n = top_n
+        self.histograms = {stage: StageHistogram() for stage in PROFILE_STAGES + ('total',)}
+        self.worker_peak_rss_mb = {}
+        self._slowest = []  # min-heap of (total, query_index, row)
+
+    def add(self, profile, query_idx, file_nme, success, start_offset=None, end_offset=None):
+        """Record one statement's profile from StageTimer.finish."""
+        stages = profile['stages']
+        for stage, seconds in stages.items():
+            self.histograms[stage].add(seconds)
+        total = profile['total']
+        self.histograms['total'].add(total)
+        pid, peak = profile['pid'], profile['peak_rss_mb']
+        if peak is not None:
+            self.worker_peak_rss_mb[pid] = max(peak, self.worker_peak_rss_mb.get(pid, 0.0))
+
+        if len(self._slowest) < self.top_n or total > self._slowest[0][0]:
+            row = {'script_file': file_nme, 'query_index': query_idx, 'start_offset': start_offset,
+                   'end_offset': end_offset, 'sql_type': profile['sql_type'], 'success': success, 'total_ms': total * 1000}
+            for stage in PROFILE_STAGES:
+                row[f"{stage}_ms"] = stages.get(stage, 0.0) * 1000
+            row.update({'worker_pid': pid, 'worker_peak_rss_mb': peak, 'rss_growth_mb': profile['rss_growth_mb']})
+            entry = (total, query_idx, row)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def statements(self):
+        return self.histograms['total'].count
+
+    def slowest_frame(self):
+        """The slowest statements, slowest first."""
+        rows = [row for _, _, row in sorted(self._slowest, key=lambda entry: entry[:2], reverse=True)]
+        columns = (['script_file', 'query_index', 'start_offset', 'end_offset', 'sql_type', 'success', 'total_ms']
+                   + [f"{stage}_ms" for stage in PROFILE_STAGES] + ['worker_pid', 'worker_peak_rss_mb', 'rss_growth_mb'])
+        return pd.DataFrame(rows, columns=columns)
+
+    def print_summary(self):
+        """Print per-stage totals and percentiles, the total-time histogram and worker memory."""
+        total_seconds = self.histograms['total'].total
+        print(f"\n{'='*60}")
+        print(f"STAGE TIMINGS ({self.statements} profiled statements)")
+        print(f"{'='*60}")
+        print(f"  {'Stage':16s} {'count':>7s} {'total s':>9s} {'share':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'max ms':>9s}")
+        for stage, histogram in self.histograms.items():
+            if not histogram.count:
+                continue
+            share = histogram.total / total_seconds * 100 if total_seconds else 0.0
+            print(f"  {stage:16s} {histogram.count:7d} {histogram.total:9.2f} {share:5.1f}% "
+                  f"{histogram.percentile(0.5) * 1000:8.2f} {histogram.percentile(0.95) * 1000:8.2f} "
+                  f"{histogram.max * 1000:9.2f}")
+        print(f"{'-'*60}")
+        print(f"Statement time histogram:")
+        histogram = self.histograms['total']
+        widest = max(histogram.buckets) or 1
+        lower = 0.0
+        for bucket, count in enumerate(histogram.buckets):
+            upper = HISTOGRAM_FIRST_EDGE * 2 ** bucket
+            if count:
+                upper_label = f"{upper * 1000:.1f} ms" if bucket < HISTOGRAM_BUCKETS - 1 else "..."
+                print(f"  {lower * 1000:9.1f} - {upper_label:>10s} {count:7d} {'#' * max(1, round(count / widest * 30))}")
+            lower = upper
+        if self.worker_peak_rss_mb:
+            print(f"{'-'*60}")
+            print(f"Workers profiled:        {len(self.worker_peak_rss_mb)}")
+            print(f"Worker peak RSS:         {max(self.worker_peak_rss_mb.values()):.1f} MB (highest)")
+        print(f"{'='*60}")
@@ -0,0 +1,705 @@
+"""
+Reachability index for pairwise "is A upstream of B" checks.
+
+Built over a LineageGraph (usually of the postProcessing simplified output,
+where VOLTABLEs are already resolved). Tables on a cycle reach each other, so
+the graph is first collapsed into its strongly connected components, which
+leaves a DAG. Every component then gets:
+
+- its topological level (longest path from a source); A can only reach B if
+  its level is lower,
+- interval labels [low, rank] over reverse topological ranks, where low is the
+  smallest rank of anything it reaches; A can only reach B if B's rank is in
+  A's interval. Each extra label uses a different order within the levels.
+
+Most "no" answers are decided by these checks alone. The rest are answered
+from the descendant bitsets of the DAG (one bit per component that has
+parents, for every component that has children) when they fit in
+max_bitset_bytes. When they don't, direct edges are looked up, and up to 1024
+landmark components (most parents times children) get a bit each: a pair is
+connected if the source reaches a landmark that reaches the target, and ruled
+out if the target reaches a landmark the source doesn't (or the other way
+round upstream). Only what is left is walked, skipping every component whose
+labels show it cannot reach the target.
+
+    index = ReachabilityIndex.from_table('./Relationships/NIGHTLY-relations_simplified.csv')
+    index.is_upstream('STAGE.ORDERS_STG', 'DWH.SALES_FACT')
+    index.is_upstream_many(upstream_tables, downstream_tables)
+"""
+
+import logging
+import sys
+import time
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from lineageGraph import LineageGraph, build_csr, distinct, gather_ranges
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Descendant bitsets are only built when they fit in this much memory
+DEFAULT_MAX_BITSET_BYTES = 256 * 1024 * 1024
+DEFAULT_INTERVAL_LABELS = 2
+# Bytes of child bitsets combined at once while building the parents' bitsets
+BITSET_CHUNK_BYTES = 64 * 1024 * 1024
+# Landmark bitsets when the exact ones don't fit: at most 64 landmarks per word
+MAX_LANDMARK_WORDS = 16
+# Pairs checked against the landmark bitsets at once
+LANDMARK_CHUNK_PAIRS = 65536
+
+
+def trim_acyclic(size: int, parents: np.ndarray, children: np.ndarray) -> np.ndarray:
+    """
+    Mask of the nodes that may still be on a cycle.
+
+    Nodes without incoming or without outgoing edges can't be on a cycle, and
+    removing them can leave more such nodes, so they are peeled off level by
+    level. Lineage graphs are nearly acyclic, so usually almost nothing is left.
+    """
+    in_indptr, in_edges = build_csr(children, size)
+    out_indptr, out_edges = build_csr(parents, size)
+    indegree = np.diff(in_indptr)
+    outdegree = np.diff(out_indptr)
+    alive = np.ones(size, dtype=bool)
+    dead = np.flatnonzero((indegree == 0) | (outdegree == 0))
+    while len(dead):
+        alive[dead] = False
+        leaving = children[gather_ranges(out_indptr, out_edges, dead)]
+        entering = parents[gather_ranges(in_indptr, in_edges, dead)]
+        np.subtract.at(indegree, leaving, 1)
+        np.subtract.at(outdegree, entering, 1)
+        touched = distinct(np.concatenate([leaving, entering]))
+        touched = touched[alive[touched]]
+        dead = touched[(indegree[touched] == 0) | (outdegree[touched] == 0)]
+    return alive
+
+
+def strongly_connected_components(size: int, parents: np.ndarray, children: np.ndarray):
+    """
+    Component ID of every node.
+
+    Iterative Tarjan over whatever trim_acyclic leaves; the trimmed nodes are
+    each their own component.
+
+    Returns:
+        (component per node, number of components)
+    """
+    alive = trim_acyclic(size, parents, children)
+    nodes = np.flatnonzero(alive)
+    local = np.full(size, -1, dtype=np.int64)
+    local[nodes] = np.arange(len(nodes))
+    keep = alive[parents] & alive[children]
+    indptr, order = build_csr(local[parents[keep]], len(nodes))
+    targets = local[children[keep]][order].tolist()
+    indptr = indptr.tolist()
+
+    index = [-1] * len(nodes)
+    low = [0] * len(nodes)
+    on_stack = [False] * len(nodes)
+    local_component = [-1] * len(nodes)
+    stack = []
+    count = 0
+    counter = 0
+    for root in range(len(nodes)):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, indptr[root])]
+        while work:
+            node, position = work[-1]
+            end = indptr[node + 1]
+            descended = False
+            while position < end:
+                target = targets[position]
+                position += 1
+                if index[target] == -1:
+                    work[-1] = (node, position)
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    work.append((target, indptr[target]))
+                    descended = True
+                    break
+                if on_stack[target] and index[target] < low[node]:
+                    low[node] = index[target]
+            if descended:
+                continue
+            work.pop()
+            if work and low[node] < low[work[-1][0]]:
+                low[work[-1][0]] = low[node]
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    local_component[member] = count
+                    if member == node:
+                        break
+                count += 1
+
+    component = np.empty(size, dtype=np.int64)
+    component[nodes] = np.asarray(local_component, dtype=np.int64)
+    trimmed = np.flatnonzero(~alive)
+    component[trimmed] = count + np.arange(len(trimmed))
+    return component, count + len(trimmed)
+
+
+class ReachabilityIndex:
+    """Answers whether one table is upstream of another without walking the lineage.
+
+    A is upstream of B when a chain of edges leads from A to B; a table is
+    upstream of itself only when it is on a cycle.
+
+    Args:
+        names: Table names in ID order
+        edge_parents, edge_children: Table IDs of each edge's ends
+        max_bitset_bytes: Memory allowed for descendant bitsets; 0 disables them
+        interval_labels: Interval labels per component
+        seed: Seed for the within-level orders of the extra labels
+    """
+
+    def __init__(self, names, edge_parents, edge_children, max_bitset_bytes: int = DEFAULT_MAX_BITSET_BYTES,
+                 interval_labels: int = DEFAULT_INTERVAL_LABELS, seed: int = 0):
+        self.names = np.asarray(names, dtype=object)
+        self.edge_parents = np.asarray(edge_parents, dtype=np.int64)
+        self.edge_children = np.asarray(edge_children, dtype=np.int64)
+        self.max_bitset_bytes = max_bitset_bytes
+        self.interval_labels = max(1, interval_labels)
+        self.seed = seed
+        self.build_stats: Dict[str, float] = {}
+        self._name_index = None
+        self._ids = None
+        self.rebuild()
+
+    @classmethod
+    def from_graph(cls, graph: LineageGraph, **options) -> 'ReachabilityIndex':
+        return cls(graph.names, graph.edge_parents, graph.edge_children, **options)
+
+    @classmethod
+    def from_table(cls, path: str, **options) -> 'ReachabilityIndex':
+        """Build from a relations CSV/Parquet file or a saved LineageGraph .npz."""
+        graph = LineageGraph.load(path) if str(path).endswith('.npz') else LineageGraph.from_table(path)
+        return cls.from_graph(graph, **options)
+
+    def rebuild(self) -> None:
+        """Recompute everything from the table-level edges."""
+        start = time.perf_counter()
+        self.component, self.component_count = strongly_connected_components(
+            len(self.names), self.edge_parents, self.edge_children)
+        self.member_indptr, self.members = build_csr(self.component, self.component_count)
+        sizes = np.diff(self.member_indptr)
+        self_loops = self.edge_parents[self.edge_parents == self.edge_children]
+        self.cyclic = sizes > 1
+        self.cyclic[self.component[self_loops]] = True
+
+        dag_parents = self.component[self.edge_parents]
+        dag_children = self.component[self.edge_children]
+        between = dag_parents != dag_children
+        self._set_dag_edges(dag_parents[between], dag_children[between])
+        self._topological_levels()
+        self.build_stats = {'scc_seconds': time.perf_counter() - start}
+        self._relabel()
+        self.build_stats['seconds'] = time.perf_counter() - start
+
+    def _set_dag_edges(self, dag_parents: np.ndarray, dag_children: np.ndarray) -> None:
+        keys = distinct(dag_parents * self.component_count + dag_children)
+        self.dag_keys = keys
+        self.dag_parents = keys // self.component_count
+        self.dag_children = keys % self.component_count
+        # keys are sorted by parent, so the downward CSR needs no reordering
+        self.down_indptr, self.down_edges = build_csr(self.dag_parents, self.component_count)
+        self.up_indptr, self.up_edges = build_csr(self.dag_children, self.component_count)
+
+    def _relabel(self, bitset_update=None) -> bool:
+        """
+        Interval labels and bitsets of the current DAG, once its levels are known.
+
+        bitset_update is (new DAG parents, new DAG children) to OR into the
+        existing bitsets instead of rebuilding them. Returns whether that was done.
+        """
+        start = time.perf_counter()
+        self._interval_labels()
+        self.build_stats['label_seconds'] = time.perf_counter() - start
+        start = time.perf_counter()
+        updated = bitset_update is not None and self._update_bitsets(*bitset_update)
+        if not updated:
+            self._build_bitsets()
+        self.build_stats['bitset_seconds'] = time.perf_counter() - start
+        self.build_stats.update({
+            'tables': len(self.names),
+            'edges': len(self.edge_parents),
+            'components': self.component_count,
+            'cyclic_components': int(self.cyclic.sum()),
+            'dag_edges': len(self.dag_parents),
+            'levels': len(self.level_nodes),
+            'bitset_bytes': sum(bits.nbytes for bits in (self.bits, self.landmark_down, self.landmark_up)
+                                if bits is not None),
+            'exact_bitsets': self.bits is not None,
+            'landmarks': len(self.landmarks),
+            'memory_bytes': self.memory_bytes(),
+        })
+        return updated
+
+    def _topological_levels(self) -> bool:
+        """Kahn's algorithm a whole level at a time; False if the DAG edges contain a cycle."""
+        indegree = np.diff(self.up_indptr)
+        self.level = np.zeros(self.component_count, dtype=np.int32)
+        self.level_nodes = []
+        frontier = np.flatnonzero(indegree == 0)
+        while len(frontier):
+            self.level[frontier] = len(self.level_nodes)
+            self.level_nodes.append(frontier)
+            reached = self.dag_children[gather_ranges(self.down_indptr, self.down_edges, frontier)]
+            np.subtract.at(indegree, reached, 1)
+            reached = distinct(reached)
+            frontier = reached[indegree[reached] == 0]
+        return sum(len(nodes) for nodes in self.level_nodes) == self.component_count
+
+    def _interval_labels(self) -> None:
+        rng = np.random.default_rng(self.seed)
+        self.rank = np.empty((self.interval_labels, self.component_count), dtype=np.int64)
+        self.low = np.empty_like(self.rank)
+        for label in range(self.interval_labels):
+            levels = self.level_nodes if label == 0 else [rng.permutation(nodes) for nodes in self.level_nodes]
+            order = np.concatenate(levels) if levels else np.empty(0, dtype=np.int64)
+            # Reverse topological ranks: everything a component reaches ranks below it
+            rank = self.rank[label]
+            rank[order] = np.arange(len(order))[::-1]
+            low = self.low[label]
+            low[:] = rank
+            for nodes in reversed(self.level_nodes):
+                counts = self.down_indptr[nodes + 1] - self.down_indptr[nodes]
+                nodes = nodes[counts > 0]
+                if not len(nodes):
+                    continue
+                counts = counts[counts > 0]
+                child_low = low[self.dag_children[gather_ranges(self.down_indptr, self.down_edges, nodes)]]
+                low[nodes] = np.minimum(low[nodes], np.minimum.reduceat(child_low, np.cumsum(counts) - counts))
+
+    def _closure_bits(self, direction: str, column_components: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """
+        Bitset per row of the column components each component reaches in direction, itself not included.
+
+        Args:
+            direction: 'downstream' for descendants, 'upstream' for ancestors
+            column_components: Components given a bit, in bit order
+            rows: Row of every component, -1 for components that reach nothing
+        """
+        indptr, edges, ends = ((self.down_indptr, self.down_edges, self.dag_children) if direction == 'downstream'
+                               else (self.up_indptr, self.up_edges, self.dag_parents))
+        columns = np.full(self.component_count, -1, dtype=np.int64)
+        columns[column_components] = np.arange(len(column_components))
+        words = max(1, (len(column_components) + 63) // 64)
+        # The extra last row stays zero for ends without a row
+        padded = np.zeros((int(rows.max(initial=-1)) + 2, words), dtype=np.uint64)
+        edge_budget = max(1, BITSET_CHUNK_BYTES // (words * 8))
+        # Everything a component reaches is on later levels downstream and earlier ones upstream
+        levels = reversed(self.level_nodes) if direction == 'downstream' else self.level_nodes
+        for nodes in levels:
+            nodes = nodes[rows[nodes] != -1]
+            counts = indptr[nodes + 1] - indptr[nodes]
+            nodes, counts = nodes[counts > 0], counts[counts > 0]
+            # Split the level so each chunk gathers about edge_budget bitsets
+            bounds = np.searchsorted(np.cumsum(counts), np.arange(edge_budget, int(counts.sum()), edge_budget))
+            for chunk, chunk_counts in zip(np.split(nodes, bounds), np.split(counts, bounds)):
+                if not len(chunk):
+                    continue
+                reached_ends = ends[gather_ranges(indptr, edges, chunk)]
+                reached = padded[rows[reached_ends]]
+                marked = columns[reached_ends] != -1
+                end_columns = columns[reached_ends[marked]]
+                reached[np.flatnonzero(marked), end_columns // 64] |= np.left_shift(
+                    np.uint64(1), (end_columns % 64).astype(np.uint64))
+                padded[rows[chunk]] = np.bitwise_or.reduceat(reached, np.cumsum(chunk_counts) - chunk_counts, axis=0)
+        return padded[:-1]
+
+    def _build_bitsets(self) -> None:
+        # Exact bitsets: rows for components with children, columns for components with parents
+        has_children = np.diff(self.down_indptr) > 0
+        has_parents = np.diff(self.up_indptr) > 0
+        self.bit_row = np.full(self.component_count, -1, dtype=np.int64)
+        self.bit_column = np.full(self.component_count, -1, dtype=np.int64)
+        self.row_component = np.flatnonzero(has_children)
+        self.column_component = np.flatnonzero(has_parents)
+        self.bit_row[self.row_component] = np.arange(len(self.row_component))
+        self.bit_column[self.column_component] = np.arange(len(self.column_component))
+        self.bits = self.landmark_down = self.landmark_up = None
+        self.landmarks = np.empty(0, dtype=np.int64)
+        words = (len(self.column_component) + 63) // 64
+        if not words:
+            return
+        if len(self.row_component) * words * 8 <= self.max_bitset_bytes:
+            self.bits = self._closure_bits('downstream', self.column_component, self.bit_row)
+            return
+
+        # Too big: bitsets of landmarks instead, which cut most of the pairs the labels leave open
+        self._build_landmarks(min(MAX_LANDMARK_WORDS, self.max_bitset_bytes // (2 * 8 * self.component_count)))
+
+    def _build_landmarks(self, landmark_words: int) -> None:
+        """Reach bitsets of the landmark_words * 64 components with the most parents times children."""
+        if not landmark_words:
+            return
+        indegree, outdegree = np.diff(self.up_indptr), np.diff(self.down_indptr)
+        score = indegree * outdegree
+        candidates = np.flatnonzero(score > 0)
+        self.landmarks = np.sort(candidates[np.argsort(-score[candidates], kind='stable')[:landmark_words * 64]])
+        if not len(self.landmarks):
+            return
+        all_rows = np.arange(self.component_count)
+        self.landmark_down = self._closure_bits('downstream', self.landmarks, all_rows)
+        self.landmark_up = self._closure_bits('upstream', self.landmarks, all_rows)
+        # A landmark counts as reaching itself
+        own = np.arange(len(self.landmarks))
+        own_bits = np.left_shift(np.uint64(1), (own % 64).astype(np.uint64))
+        self.landmark_down[self.landmarks, own // 64] |= own_bits
+        self.landmark_up[self.landmarks, own // 64] |= own_bits
+
+    def _update_bitsets(self, sources: np.ndarray, targets: np.ndarray) -> bool:
+        """OR the new edges into the bitsets; False if they need a rebuild instead."""
+        if self.bits is None:
+            return False
+        # New edges may give a component its first child or parent, which needs a new row or column
+        if (self.bit_row[sources] == -1).any() or (self.bit_column[targets] == -1).any():
+            return False
+        for source, target in zip(sources.tolist(), targets.tolist()):
+            column = self.bit_column[target]
+            reached = self.bits[self.bit_row[target]].copy() if self.bit_row[target] != -1 \
+                else np.zeros(self.bits.shape[1], dtype=np.uint64)
+            reached[column // 64] |= np.uint64(1) << np.uint64(column % 64)
+            rows = [self.bit_row[source]]
+            if self.bit_column[source] != -1:
+                source_column = self.bit_column[source]
+                rows.extend(np.flatnonzero(
+                    (self.bits[:, source_column // 64] >> np.uint64(source_column % 64)) & np.uint64(1)))
+            self.bits[rows] |= reached
+        return True
+
+    def _pad_labels(self, count: int) -> None:
+        """Labels for new components without edges, which reach nothing and are reached by nothing."""
+        self.level = np.concatenate([self.level, np.zeros(count, dtype=self.level.dtype)])
+        # A rank of -1 is outside every interval and its own interval is empty
+        padding = np.full((self.interval_labels, count), -1, dtype=np.int64)
+        self.rank = np.hstack([self.rank, padding])
+        self.low = np.hstack([self.low, padding])
+        self.bit_row = np.concatenate([self.bit_row, np.full(count, -1, dtype=np.int64)])
+        self.bit_column = np.concatenate([self.bit_column, np.full(count, -1, dtype=np.int64)])
+        if self.landmark_down is not None:
+            padding = np.zeros((count, self.landmark_down.shape[1]), dtype=np.uint64)
+            self.landmark_down = np.vstack([self.landmark_down, padding])
+            self.landmark_up = np.vstack([self.landmark_up, padding])
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the index arrays, not counting the table names."""
+        arrays = [self.edge_parents, self.edge_children, self.component, self.member_indptr, self.members,
+                  self.cyclic, self.dag_keys, self.dag_parents, self.dag_children, self.down_indptr, self.down_edges,
+                  self.up_indptr, self.up_edges, self.level, self.rank, self.low, self.bit_row, self.bit_column,
+                  self.row_component, self.column_component, self.landmarks]
+        arrays.extend(bits for bits in (self.bits, self.landmark_down, self.landmark_up) if bits is not None)
+        return sum(array.nbytes for array in arrays)
+
+    def table_id(self, table: str) -> int:
+        """ID of one table; a dict lookup, cheaper than table_ids for single questions."""
+        if self._ids is None:
+            self._ids = {name: table_id for table_id, name in enumerate(self.names)}
+        for candidate in (table, table.strip().upper()):
+            if candidate in self._ids:
+                return self._ids[candidate]
+        raise KeyError(f"Unknown table: {table}")
+
+    def table_ids(self, tables: Sequence[str]) -> np.ndarray:
+        """IDs of the tables; names are also tried stripped and upper-cased."""
+        if self._name_index is None:
+            self._name_index = pd.Index(self.names)
+        tables = pd.Index(list(tables), dtype=object)
+        ids = self._name_index.get_indexer(tables)
+        missing = ids == -1
+        if missing.any():
+            ids[missing] = self._name_index.get_indexer(tables[missing].str.strip().str.upper())
+            if (ids == -1).any():
+                raise KeyError(f"Unknown tables: {list(tables[ids == -1][:10])}")
+        return ids
+
+    def _reaches(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Whether each source component reaches its target component."""
+        answer = np.zeros(len(sources), dtype=bool)
+        same = sources == targets
+        answer[same] = self.cyclic[sources[same]]
+        open_ = ~same & (self.level[sources] < self.level[targets])
+        for label in range(self.interval_labels):
+            rank, low = self.rank[label], self.low[label]
+            open_ &= (low[sources] <= rank[targets]) & (rank[targets] <= rank[sources])
+        pending = np.flatnonzero(open_)
+        if self.bits is not None:
+            rows = self.bit_row[sources[pending]]
+            columns = self.bit_column[targets[pending]]
+            # A component with no children reaches nothing; open pairs always have a target with parents
+            valid = rows >= 0
+            words = self.bits[rows[valid], columns[valid] // 64]
+            answer[pending[valid]] = (words >> (columns[valid] % 64).astype(np.uint64)) & np.uint64(1) == 1
+        else:
+            # Direct edges are found by binary search in the sorted edge keys
+            keys = sources[pending] * self.component_count + targets[pending]
+            found = self.dag_keys[np.minimum(np.searchsorted(self.dag_keys, keys), len(self.dag_keys) - 1)] == keys \
+                if len(self.dag_keys) else np.zeros(len(pending), dtype=bool)
+            answer[pending[found]] = True
+            pending = pending[~found]
+            if self.landmark_down is not None:
+                pending = self._landmark_filter(sources, targets, pending, answer)
+            for position in pending:
+                answer[position] = self._search(sources[position], targets[position])
+        return answer
+
+    def _landmark_filter(self, sources: np.ndarray, targets: np.ndarray, pending: np.ndarray,
+                         answer: np.ndarray) -> np.ndarray:
+        """Settle pending pairs with the landmark bitsets; returns the pairs still open."""
+        still_open = []
+        for chunk_start in range(0, len(pending), LANDMARK_CHUNK_PAIRS):
+            chunk = pending[chunk_start:chunk_start + LANDMARK_CHUNK_PAIRS]
+            source_down = self.landmark_down[sources[chunk]]
+            target_down = self.landmark_down[targets[chunk]]
+            # Through a landmark: the source reaches it and it reaches the target
+            through = (source_down & self.landmark_up[targets[chunk]]).any(axis=1)
+            # The source can't reach the target if the target reaches a landmark the source doesn't,
+            # or a landmark reaches the source but not the target
+            ruled_out = (target_down & ~source_down).any(axis=1) | \
+                (self.landmark_up[sources[chunk]] & ~self.landmark_up[targets[chunk]]).any(axis=1)
+            answer[chunk[through]] = True
+            still_open.append(chunk[~through & ~ruled_out])
+        return np.concatenate(still_open) if still_open else pending
+
+    def _search(self, source: int, target: int) -> bool:
+        """Downward walk from source that skips components whose labels rule the target out."""
+        visited = np.zeros(self.component_count, dtype=bool)
+        frontier = np.array([source], dtype=np.int64)
+        target_level = self.level[target]
+        target_rank = self.rank[:, target]
+        while len(frontier):
+            reached = distinct(self.dag_children[gather_ranges(self.down_indptr, self.down_edges, frontier)])
+            reached = reached[~visited[reached]]
+            visited[reached] = True
+            if visited[target]:
+                return True
+            keep = self.level[reached] < target_level
+            for label in range(self.interval_labels):
+                keep &= (self.low[label, reached] <= target_rank[label]) & (target_rank[label] <= self.rank[label, reached])
+            frontier = reached[keep]
+            if self.landmark_down is not None and len(frontier):
+                down = self.landmark_down[frontier]
+                if (down & self.landmark_up[target]).any():
+                    return True
+                frontier = frontier[~(self.landmark_down[target] & ~down).any(axis=1)]
+        return False
+
+    def is_upstream(self, upstream_table: str, downstream_table: str) -> bool:
+        """Whether upstream_table feeds downstream_table, directly or through other tables."""
+        source = self.component[self.table_id(upstream_table)]
+        target = self.component[self.table_id(downstream_table)]
+        return bool(self._reaches(np.array([source]), np.array([target]))[0])
+
+    def is_upstream_many(self, upstream_tables: Sequence[str], downstream_tables: Sequence[str]) -> np.ndarray:
+        """is_upstream for many pairs at once; returns a bool array."""
+        sources = self.component[self.table_ids(upstream_tables)]
+        targets = self.component[self.table_ids(downstream_tables)]
+        return self._reaches(sources, targets)
+
+    def _reachable_components(self, component: int, direction: str) -> np.ndarray:
+        if self.bits is not None:
+            if direction == 'downstream':
+                row = self.bit_row[component]
+                if row == -1:
+                    return np.empty(0, dtype=np.int64)
+                # Bit k of word w is bit k % 8 of byte 8w + k // 8 on little-endian hosts
+                columns = np.flatnonzero(np.unpackbits(self.bits[row].view(np.uint8), bitorder='little'))
+                return self.column_component[columns]
+            column = self.bit_column[component]
+            if column == -1:
+                return np.empty(0, dtype=np.int64)
+            rows = np.flatnonzero((self.bits[:, column // 64] >> np.uint64(column % 64)) & np.uint64(1))
+            return self.row_component[rows]
+
+        indptr, edges, ends = ((self.down_indptr, self.down_edges, self.dag_children) if direction == 'downstream'
+                               else (self.up_indptr, self.up_edges, self.dag_parents))
+        visited = np.zeros(self.component_count, dtype=bool)
+        frontier = np.array([component], dtype=np.int64)
+        while len(frontier):
+            reached = distinct(ends[gather_ranges(indptr, edges, frontier)])
+            frontier = reached[~visited[reached]]
+            visited[frontier] = True
+        return np.flatnonzero(visited)
+
+    def _related_tables(self, table: str, direction: str) -> np.ndarray:
+        table_id = self.table_id(table)
+        component = self.component[table_id]
+        components = self._reachable_components(component, direction)
+        if self.cyclic[component]:
+            components = np.append(components, component)
+        ids = gather_ranges(self.member_indptr, self.members, components)
+        return np.sort(self.names[ids[ids != table_id]])
+
+    def ancestors(self, table: str) -> np.ndarray:
+        """Every table upstream of table, sorted by name."""
+        return self._related_tables(table, 'upstream')
+
+    def descendants(self, table: str) -> np.ndarray:
+        """Every table downstream of table, sorted by name."""
+        return self._related_tables(table, 'downstream')
+
+    def add_edges(self, parent_tables: Sequence[str], child_tables: Sequence[str]) -> Dict[str, int]:
+        """
+        Add lineage edges and bring the index up to date.
+
+        Edges between tables that are already connected change nothing. If no
+        new edge closes a cycle, the components stay as they are: the new DAG
+        edges are added, the levels and intervals are recomputed from the
+        DAG, and exact bitsets are updated in place by OR-ing the child's
+        descendants into the parent and everything above it (landmark
+        bitsets are recomputed). A new cycle rebuilds the whole index.
+
+        Returns:
+            Counts of the implied, added and new-table edges and the update mode
+        """
+        start = time.perf_counter()
+        parent_tables = pd.Index(list(parent_tables), dtype=object)
+        child_tables = pd.Index(list(child_tables), dtype=object)
+        new_tables = parent_tables.append(child_tables).unique()
+        if self._name_index is None:
+            self._name_index = pd.Index(self.names)
+        new_tables = new_tables[self._name_index.get_indexer(new_tables) == -1]
+        if len(new_tables):
+            # New tables start out as components of their own
+            self.names = np.concatenate([self.names, new_tables.to_numpy(dtype=object)])
+            self._name_index = self._ids = None
+            self.component = np.concatenate([self.component, self.component_count + np.arange(len(new_tables))])
+            self.component_count += len(new_tables)
+            # Same order, since the new components come last
+            self.dag_keys = self.dag_parents * self.component_count + self.dag_children
+            self.cyclic = np.concatenate([self.cyclic, np.zeros(len(new_tables), dtype=bool)])
+            self.member_indptr, self.members = build_csr(self.component, self.component_count)
+        parents = self.table_ids(parent_tables)
+        children = self.table_ids(child_tables)
+        self.edge_parents = np.concatenate([self.edge_parents, parents])
+        self.edge_children = np.concatenate([self.edge_children, children])
+
+        sources, targets = self.component[parents], self.component[children]
+        if len(new_tables):
+            self._pad_labels(len(new_tables))
+        implied = self._reaches(sources, targets)
+        result = {'edges': len(parents), 'implied': int(implied.sum()), 'new_tables': len(new_tables)}
+        sources, targets = sources[~implied], targets[~implied]
+        if not len(sources):
+            result['mode'] = 'unchanged'
+        elif (sources == targets).any():
+            self.rebuild()
+            result['mode'] = 'rebuilt'
+        else:
+            self._set_dag_edges(np.concatenate([self.dag_parents, sources]),
+                                np.concatenate([self.dag_children, targets]))
+            if not self._topological_levels():
+                # The new edges close a cycle, possibly only together, so components merge
+                self.rebuild()
+                result['mode'] = 'rebuilt'
+            else:
+                self.build_stats['scc_seconds'] = time.perf_counter() - start
+                result['mode'] = 'incremental' if self._relabel((sources, targets)) else 'relabelled'
+        self.build_stats['seconds'] = time.perf_counter() - start
+        result['seconds'] = self.build_stats['seconds']
+        return result
+
+
+def print_index_statistics(stats):
+    print(f"\n{'='*60}")
+    print(f"REACHABILITY INDEX STATISTICS")
+    print(f"{'='*60}")
+    print(f"Tables:                  {stats['tables']}")
+    print(f"Edges:                   {stats['edges']}")
+    print(f"Components:              {stats['components']} ({stats['cyclic_components']} on cycles)")
+    print(f"DAG edges:               {stats['dag_edges']}")
+    print(f"Topological levels:      {stats['levels']}")
+    print(f"Components time:         {stats['scc_seconds']:.3f} seconds")
+    print(f"Labelling time:          {stats['label_seconds']:.3f} seconds")
+    print(f"Bitset time:             {stats['bitset_seconds']:.3f} seconds")
+    print(f"Build time:              {stats['seconds']:.3f} seconds")
+    if stats['exact_bitsets']:
+        bitset_mode = "exact"
+    elif stats['landmarks']:
+        bitset_mode = f"{stats['landmarks']} landmarks, label-pruned search for the rest"
+    else:
+        bitset_mode = "not built, label-pruned search"
+    print(f"Bitsets:                 {stats['bitset_bytes'] / (1024 * 1024):.2f} MB ({bitset_mode})")
+    print(f"Index memory:            {stats['memory_bytes'] / (1024 * 1024):.2f} MB")
+    print(f"{'='*60}")
+
+
+def benchmark_queries(index: ReachabilityIndex, pairs: int = 1_000_000, seed: int = 0) -> Dict[str, float]:
+    """Time is_upstream_many on random table pairs and on pairs known to be connected."""
+    rng = np.random.default_rng(seed)
+    sources = rng.integers(0, len(index.names), pairs)
+    targets = rng.integers(0, len(index.names), pairs)
+    start = time.perf_counter()
+    answers = index._reaches(index.component[sources], index.component[targets])
+    random_seconds = time.perf_counter() - start
+
+    # Parent-child pairs are always connected, so these exercise the positive path
+    edges = rng.integers(0, len(index.edge_parents), pairs) if len(index.edge_parents) else np.empty(0, dtype=np.int64)
+    start = time.perf_counter()
+    index._reaches(index.component[index.edge_parents[edges]], index.component[index.edge_children[edges]])
+    connected_seconds = time.perf_counter() - start
+    return {'pairs': pairs, 'random_seconds': random_seconds, 'connected_seconds': connected_seconds,
+            'random_upstream': int(answers.sum())}
+
+
+def main():
+    """Build a reachability index and answer "is A upstream of B" questions."""
+    print("\n" + "="*60)
+    print("LINEAGE REACHABILITY INDEX")
+    print("="*60 + "\n")
+
+    input_path = input("Enter path to relations CSV/Parquet or graph .npz file: ").strip()
+    bitset_input = input(f"Maximum bitset memory in MB (press Enter for default {DEFAULT_MAX_BITSET_BYTES // (1024 * 1024)}): ").strip()
+    max_bitset_bytes = int(float(bitset_input) * 1024 * 1024) if bitset_input else DEFAULT_MAX_BITSET_BYTES
+    try:
+        index = ReachabilityIndex.from_table(input_path, max_bitset_bytes=max_bitset_bytes)
+    except (OSError, ValueError) as e:
+        logger.error(f"{e}. Exiting.")
+        sys.exit(1)
+    print_index_statistics(index.build_stats)
+
+    pairs_input = input("Random pairs to time (press Enter for 1000000, 0 to skip): ").strip()
+    pairs = int(pairs_input) if pairs_input else 1_000_000
+    if pairs and len(index.names):
+        result = benchmark_queries(index, pairs)
+        print(f"Random pairs:            {result['random_seconds'] / pairs * 1e9:.0f} ns per pair "
+              f"({result['random_upstream']} upstream)")
+        print(f"Connected pairs:         {result['connected_seconds'] / pairs * 1e9:.0f} ns per pair")
+
+    while True:
+        upstream_table = input("\nEnter upstream table (press Enter to quit): ").strip()
+        if not upstream_table:
+            break
+        downstream_table = input("Enter downstream table (press Enter to list all ancestors/descendants): ").strip()
+        try:
+            start = time.perf_counter()
+            if downstream_table:
+                answer = index.is_upstream(upstream_table, downstream_table)
+                elapsed = time.perf_counter() - start
+                print(f"{upstream_table} is {'' if answer else 'not '}upstream of {downstream_table}")
+            else:
+                ancestors = index.ancestors(upstream_table)
+                descendants = index.descendants(upstream_table)
+                elapsed = time.perf_counter() - start
+                print(f"Ancestors ({len(ancestors)}): {', '.join(ancestors[:50])}{' ...' if len(ancestors) > 50 else ''}")
+                print(f"Descendants ({len(descendants)}): {', '.join(descendants[:50])}{' ...' if len(descendants) > 50 else ''}")
+        except KeyError as e:
+            print(f"Error: {e}")
+            continue
+        print(f"Answered in {elapsed * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Per-worker shard files for sharded lineage output.
+
+Without shards, every statement's lineage rows (as dicts) and, for failures,
+its full SQL text are pickled back to the parent. With shard output each
+worker appends its rows and error rows to its own CSV files in a run
+directory and returns only counters; the parent reads the shards back in one
+pass once the pool is done.
+
+A worker writes each statement's rows with a single flushed write, so a
+worker that is recycled, killed on a timeout or terminated with the pool
+leaves only complete statements behind.
+
+    run_dir = create_run_dir('./shards')
+    ShardWriter(run_dir).write_lineage([(query_index, script, child, relationship, parent)])
+    df = read_shards(run_dir, LINEAGE_SHARD_PREFIX, ['query_index'] + RELATION_COLUMNS)
+    remove_run_dir(run_dir)
+"""
+
+import csv
+import io
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_SHARD_DIR = './shards'
+
+LINEAGE_SHARD_PREFIX = 'lineage-'
+ERROR_SHARD_PREFIX = 'errors-'
+
+# Integer columns of the shard files; everything else is read as text
+SHARD_INTEGER_COLUMNS = {'query_index'}
+
+
+def create_run_dir(shard_dir=DEFAULT_SHARD_DIR):
+    """Create and return a fresh run directory under shard_dir."""
+    Path(shard_dir).mkdir(parents=True, exist_ok=True)
+    return tempfile.mkdtemp(prefix='run-', dir=shard_dir)
+
+
+def remove_run_dir(run_dir):
+    """Delete a run directory and its shards."""
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+
+class ShardWriter:
+    """Appends one process's lineage and error rows to its shard files.
+
+    Files are named after the process id and opened in append mode on first
+    use, so a replacement worker that happens to reuse a pid adds to the same
+    shard instead of overwriting it. Shards have no header.
+
+    Args:
+        run_dir: Run directory from create_run_dir
+    """
+
+    def __init__(self, run_dir):
+        pid = os.getpid()
+        self.lineage_path = Path(run_dir) / f"{LINEAGE_SHARD_PREFIX}{pid}.csv"
+        self.error_path = Path(run_dir) / f"{ERROR_SHARD_PREFIX}{pid}.csv"
+        self._files = {}
+        self.rows_written = 0
+        self.errors_written = 0
+
+    def _write(self, path, records):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(records)
+        shard = self._files.get(path)
+        if shard is None:
+            shard = self._files[path] = open(path, 'a', encoding='utf-8', newline='')
+        shard.write(buffer.getvalue())
+        shard.flush()
+
+    def write_lineage(self, records):
+        """Append lineage records (tuples of query index then relation columns)."""
+        if records:
+            self._write(self.lineage_path, records)
+            self.rows_written += len(records)
+
+    def write_error(self, record):
+        """Append one error record (a tuple of query index then error columns)."""
+        self._write(self.error_path, [record])
+        self.errors_written += 1
+
+    def close(self):
+        for shard in self._files.values():
+            shard.close()
+        self._files = {}
+
+
+def read_shards(run_dir, prefix, columns):
+    """Concatenate the shards in run_dir whose names start with prefix.
+
+    Only empty fields are read as missing, so table names like NA or NULL
+    survive the round trip.
+    """
+    dtypes = {column: 'int64' if column in SHARD_INTEGER_COLUMNS else str for column in columns}
+    frames = [pd.read_csv(path, names=columns, header=None, dtype=dtypes, keep_default_na=False, na_values=[''])
+              for path in sorted(Path(run_dir).glob(f"{prefix}*.csv")) if path.stat().st_size]
+    if not frames:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,126 @@
+"""
+Spool-directory job queue shared by lineageDaemon and its submitters.
+
+Jobs are JSON files moved between subdirectories of the spool:
+
+    incoming/    waiting to be picked up
+    processing/  claimed by the daemon and running
+    done/        finished, with timings and counts added
+    failed/      raised, with the error added
+
+This module only needs the standard library, so submitting a job from a
+nightly script costs no pandas/sqlglot imports.
+
+    python lineageSpool.py NIGHTLY_LOAD ./sqls --types objects.csv --wait
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+DEFAULT_SPOOL_DIR = './spool'
+DEFAULT_POLL_INTERVAL = 0.5
+
+SPOOL_SUBDIRS = ('incoming', 'processing', 'done', 'failed')
+
+
+def spool_dirs(spool_dir):
+    """Create (if needed) and return the spool subdirectories by name."""
+    dirs = {name: Path(spool_dir) / name for name in SPOOL_SUBDIRS}
+    for path in dirs.values():
+        path.mkdir(parents=True, exist_ok=True)
+    return dirs
+
+
+def submit_job(spool_dir, custom_name, input_path, types_file_path=None, processes=None,
+               stream_output=False, output_format=None, incremental=False):
+    """Write a job file into the spool and return its job id.
+
+    output_format is checked by the daemon (an unknown format fails the job);
+    None means the daemon's default. incremental jobs reparse only the files
+    that changed since the last job with the same query name (see incrementalRun).
+    """
+    incoming = spool_dirs(spool_dir)['incoming']
+    job_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+    job = {
+        'job_id': job_id,
+        'custom_name': custom_name,
+        'input_path': str(Path(input_path).resolve()),
+        'types_file_path': str(Path(types_file_path).resolve()) if types_file_path else None,
+        'processes': processes,
+        'stream_output': stream_output,
+        'output_format': output_format,
+        'incremental': incremental,
+        'submitted_at': time.time(),
+    }
+    # Write under a temporary name so the daemon never reads a half-written job
+    temp_path = incoming / f".{job_id}.tmp"
+    temp_path.write_text(json.dumps(job, indent=2), encoding='utf-8')
+    temp_path.rename(incoming / f"{job_id}.json")
+    return job_id
+
+
+def wait_for_job(spool_dir, job_id, poll_interval=DEFAULT_POLL_INTERVAL, timeout=None):
+    """Block until the job reaches done/ or failed/ and return its result, or None on timeout."""
+    dirs = spool_dirs(spool_dir)
+    deadline = time.time() + timeout if timeout else None
+    while deadline is None or time.time() < deadline:
+        for state in ('done', 'failed'):
+            result_path = dirs[state] / f"{job_id}.json"
+            if result_path.exists():
+                return json.loads(result_path.read_text(encoding='utf-8'))
+        time.sleep(poll_interval)
+    return None
+
+
+def print_job_summary(job):
+    timings = job.get('timings', {})
+    print(f"\n{'='*60}")
+    print(f"JOB {job.get('status', '').upper()}: {job.get('custom_name')} ({job.get('job_id')})")
+    print(f"{'='*60}")
+    print(f"Queue wait:              {job.get('queue_wait', 0):.2f} seconds")
+    for stage in ('read', 'hashing', 'processing', 'types', 'save'):
+        if stage in timings:
+            print(f"{stage.capitalize() + ' time:':25s}{timings[stage]:.2f} seconds")
+    print(f"Total job time:          {job.get('total_time', 0):.2f} seconds")
+    if job.get('status') == 'done':
+        print(f"Successful queries:      {job.get('successful_queries')}")
+        print(f"Failed queries:          {job.get('failed_queries')}")
+        if job.get('incremental'):
+            print(f"Files skipped:           {job.get('files_skipped')}")
+            print(f"Files reprocessed:       {job.get('files_reprocessed')}")
+            print(f"Estimated time saved:    {job.get('estimated_time_saved', 0):.2f} seconds")
+        print(f"Output file:             {job.get('relations_path')}")
+    else:
+        print(f"Error:                   {job.get('error')}")
+    print(f"{'='*60}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Queue a job for the lineage daemon")
+    parser.add_argument('custom_name', help="Query name used for the output files")
+    parser.add_argument('input_path', help="Query file or folder")
+    parser.add_argument('--spool-dir', default=DEFAULT_SPOOL_DIR, help="Spool directory the daemon serves")
+    parser.add_argument('--types', dest='types_file_path', default=None, help="Object types CSV file")
+    parser.add_argument('--processes', type=int, default=None, help="Worker count for this job")
+    parser.add_argument('--stream', action='store_true', help="Stream results to the output files")
+    parser.add_argument('--format', dest='output_format', default=None, help="Output format: csv or parquet")
+    parser.add_argument('--incremental', action='store_true', help="Reparse only files changed since the last job")
+    parser.add_argument('--wait', action='store_true', help="Wait for the job and print its summary")
+    args = parser.parse_args(argv)
+
+    job_id = submit_job(args.spool_dir, args.custom_name, args.input_path, args.types_file_path,
+                        args.processes, args.stream, args.output_format, args.incremental)
+    print(f"Submitted job {job_id}")
+    if not args.wait:
+        return 0
+    result = wait_for_job(args.spool_dir, job_id)
+    print_job_summary(result)
+    return 0 if result.get('status') == 'done' else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,144 @@
 import re
+import os
+import time
+import multiprocessing as mp
 from pathlib import Path
 
+sql_start_keywords = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP',
+                      'ALTER', 'WITH', 'REPLACE', 'COLLECT', 'CALL','SEL ','DEL ','USING','MERGE')
+
+ignore_patterns = [
+    r'^\+\-+',  # Separator lines
+    r'^BTEQ\s+\d+',  # BTEQ version info
+    r'^\s*\d+\s+rows?\s+(found|added|changed|removed)',  # Result messages
+    r'^\s*Total elapsed time',  # Timing info
+    r'^\s*Current TimeStamp',  # Timestamp results
+    r'^\s*\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}',  # Date results
+    r'^\s*Return Code',  # Return codes
+    r'^\s*PID:',  # Process IDs
+    r'^\s*\d{4}-\d{2}-\d{2}-\d{6}::', # Date-time prefixes
+    r'^\s*grep:',  # Grep messages
+    r'^\s*Executing',  # Execution messages
+    r'^\s*\|\s*$',  # Empty table borders
+    r'^\s*EXEC', # Lines starting with EXEC
+    r'^\s*\d+', # Lines starting with any number
+    r'^\s*BT', # Lines starting with BT
+    r'^\s*ET', # Lines starting with ET
+]
+ignore_regex = re.compile('|'.join(ignore_patterns), re.IGNORECASE)
+
+# Comment blocks between /* */, possibly spanning lines
+comment_block_regex = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+# Characters read per block when streaming a log
+READ_CHUNK_SIZE = 1 << 20
+
+
+def iter_log_blocks(f, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yield blocks of whole lines read from a text file. Joining the blocks with
+    '\n' gives back the file, so their lines are those of f.read().split('\n').
+    """
+    carry = ''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        chunk = carry + chunk
+        cut = chunk.rfind('\n')
+        if cut == -1:
+            carry = chunk
+            continue
+        carry = chunk[cut + 1:]
+        yield chunk[:cut]
+    yield carry
+
+
+def iter_uncommented_lines(blocks):
+    """
+    Remove comment blocks between /* */ from a stream of line blocks, yielding
+    a list of lines per block. The result is the same as removing the comments
+    from the whole log: a comment spanning lines joins the text before /* and
+    after */ into one line, and an unterminated /* is kept as is (its lines
+    are held until the end of the log).
+    """
+    pending = None  # (text before an open /*, raw blocks from the /* on)
+    for block in blocks:
+        head = ''
+        if pending is not None:
+            end = block.find('*/')
+            if end == -1:
+                pending[1].append(block)
+                continue
+            # The text before the comment was already scanned, so it is not searched again
+            head, block = pending[0], block[end + 2:]
+            pending = None
+        if '/*' in block:
+            # An unterminated /* can only start just before or after the last */
+            last_close = block.rfind('*/')
+            if last_close == -1 or block.find('/*', max(last_close - 1, 0)) != -1:
+                last_end = 0
+                for match in comment_block_regex.finditer(block):
+                    last_end = match.end()
+                # Search the original text: removing a comment can join '/' and '*' into a new /*
+                start = block.find('/*', last_end)
+                if start != -1:
+                    # No */ follows this /*, so it may close in a later block
+                    lines = (head + comment_block_regex.sub('', block[:start])).split('\n')
+                    pending = (lines.pop(), [block[start:]])
+                    yield lines
+                    continue
+            block = comment_block_regex.sub('', block)
+        yield (head + block).split('\n')
+
+    if pending is not None:
+        yield (pending[0] + '\n'.join(pending[1])).split('\n')
+
+
+def iter_clean_bteq_log(blocks):
+    """
+    Clean a BTEQ log given as blocks of whole lines (see iter_log_blocks),
+    yielding a list of cleaned lines per block. '\n'.join of all the lines
+    equals clean_bteq_log of the log.
+    """
+    in_sql_query = False
+
+    for lines in iter_uncommented_lines(blocks):
+        cleaned_lines = []
+        for line in lines:
+            stripped_line = line.strip()
+
+            # Remove lines starting with --, *** and . (BTEQ commands)
+            if not stripped_line or stripped_line.startswith('--') or stripped_line.startswith('***') or stripped_line.startswith('.'):
+                continue
+
+
+            if in_sql_query:
+                # --- We are INSIDE a query ---
+                # Append the line as part of the ongoing statement.
+                cleaned_lines.append(line)
+                # Check if this line ends the statement.
+                if stripped_line.endswith(';'):
+                    in_sql_query = False # Exit the query state.
+                    # Add a blank line for separation between queries
+                    cleaned_lines.append('\n')
+            else:
+                # --- We are OUTSIDE a query ---
+                # Ignore empty lines and known log noise.
+                if not stripped_line or ignore_regex.match(stripped_line):
+                    continue
+
+            if stripped_line.upper().startswith(sql_start_keywords) and not in_sql_query:
+                in_sql_query = True # Enter the query state.
+                cleaned_lines.append(line)
+                    # Handle single-line queries (e.g., "SELECT DATE;")
+                if stripped_line.endswith(';'):
+                    in_sql_query = False
+                    cleaned_lines.append('\n')
+        if cleaned_lines:
+            yield cleaned_lines
+
+
 def clean_bteq_log(log_content):
     """
     Clean BTEQ log by removing:
@@ -10,128 +148,127 @@ def clean_bteq_log(log_content):
     4. Lines starting with .xyz (BTEQ commands)
     5. Lines starting with EXEC, COLLECT STATISTICS, or any number.
     """
-    
-    # Step 1: Remove comment blocks between /* */
-    # This handles multi-line comments
-    log_content = re.sub(r'/\*.*?\*/', '', log_content, flags=re.DOTALL)
-    
-    # Step 2: Split into lines for line-by-line processing
-    lines = log_content.split('\n')
-    in_sql_query = False
-    sql_start_keywords = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP', 
-                            'ALTER', 'WITH', 'REPLACE', 'COLLECT', 'CALL','SEL ','DEL ','USING','MERGE')
-    cleaned_lines = []
-    
-    ignore_patterns = [
-        r'^\+\-+',  # Separator lines
-        r'^BTEQ\s+\d+',  # BTEQ version info
-        r'^\s*\d+\s+rows?\s+(found|added|changed|removed)',  # Result messages
-        r'^\s*Total elapsed time',  # Timing info
-        r'^\s*Current TimeStamp',  # Timestamp results
-        r'^\s*\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}',  # Date results
-        r'^\s*Return Code',  # Return codes
-        r'^\s*PID:',  # Process IDs
-        r'^\s*\d{4}-\d{2}-\d{2}-\d{6}::', # Date-time prefixes
-        r'^\s*grep:',  # Grep messages
-        r'^\s*Executing',  # Execution messages
-        r'^\s*\|\s*$',  # Empty table borders
-        r'^\s*EXEC', # Lines starting with EXEC
-        r'^\s*\d+', # Lines starting with any number
-        r'^\s*BT', # Lines starting with BT
-        r'^\s*ET', # Lines starting with ET
-    ]
-    ignore_regex = re.compile('|'.join(ignore_patterns), re.IGNORECASE)
-
-    for line in lines:
-        stripped_line = line.strip()
-        
-        # Step 3: Remove lines starting with --
-        if not stripped_line or stripped_line.startswith('--') or stripped_line.startswith('***') or stripped_line.startswith('.'):
-            continue
+    # Join back into single string
+    return '\n'.join(line for lines in iter_clean_bteq_log([log_content]) for line in lines)
 
 
-        if in_sql_query:
-            # --- We are INSIDE a query ---
-            # Append the line as part of the ongoing statement.
-            cleaned_lines.append(line)
-            # Check if this line ends the statement.
-            if stripped_line.endswith(';'):
-                in_sql_query = False # Exit the query state.
-                # Add a blank line for separation between queries
-                cleaned_lines.append('\n') 
-        else:
-            # --- We are OUTSIDE a query ---
-            # Ignore empty lines and known log noise.
-            if not stripped_line or ignore_regex.match(stripped_line):
-                continue
+def clean_log_file(input_file, output_file):
+    """
+    Stream a log file through the cleaner into output_file, a block at a time.
+    Returns the number of bytes read.
+    """
+    with open(input_file, 'r', encoding='utf-8') as f, open(output_file, 'w', encoding='utf-8') as out_f:
+        separator = ''
+        for cleaned_lines in iter_clean_bteq_log(iter_log_blocks(f)):
+            out_f.write(separator + '\n'.join(cleaned_lines))
+            separator = '\n'
+    return os.path.getsize(input_file)
+
+
+def clean_log_text(input_file):
+    """
+    Clean a log file in memory for the fused log-to-lineage pipeline.
+    Returns (log file stem, cleaned SQL, bytes read, seconds).
+    """
+    start = time.time()
+    with open(input_file, 'r', encoding='utf-8') as f:
+        cleaned_sql = '\n'.join(line for lines in iter_clean_bteq_log(iter_log_blocks(f)) for line in lines)
+    return (Path(input_file).stem, cleaned_sql, os.path.getsize(input_file), time.time() - start)
 
-        if stripped_line.upper().startswith(sql_start_keywords) and not in_sql_query:
-            in_sql_query = True # Enter the query state.
-            cleaned_lines.append(line)
-                # Handle single-line queries (e.g., "SELECT DATE;")
-            if stripped_line.endswith(';'):
-                in_sql_query = False
-                cleaned_lines.append('\n')
-    
-    # Join back into single string
-    return '\n'.join(cleaned_lines)
 
 def process_log (input_file):
+    """
+    Clean one log into a .sql file next to it.
+    Returns (input_file, output_file, bytes read, seconds, error message or None).
+    """
+    start = time.time()
+    ouput_file = str(Path(input_file).with_suffix('.sql'))
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            sample_sql = f.read()
-        
-        cleaned_sql = clean_bteq_log(sample_sql)
-        
-        ouput_file = str(Path(input_file).with_suffix('.sql'))
-
-        with open(ouput_file, 'w', encoding='utf-8') as out_f:
-            out_f.write(cleaned_sql)
-        print(f"Cleaned SQL written to {ouput_file}")
+        size = clean_log_file(input_file, ouput_file)
     except FileNotFoundError:
-        print(f"Error: '{input_file}' not found. Please create this file with your BTEQ log content.")
+        return (input_file, ouput_file, 0, time.time() - start,
+                f"'{input_file}' not found. Please create this file with your BTEQ log content.")
+    except (OSError, UnicodeDecodeError) as e:
+        return (input_file, ouput_file, 0, time.time() - start, f"{type(e).__name__}: {e}")
+    return (input_file, ouput_file, size, time.time() - start, None)
+
+def clean_logs(log_files, num_processes=None):
+    """
+    Clean many logs across processes, printing each as it finishes.
+    Returns a dict with the file, byte and error counts and the wall time.
+    """
+    if num_processes is None:
+        num_processes = max(1, mp.cpu_count() - 1)
+    num_processes = max(1, min(num_processes, len(log_files)))
+    start = time.time()
+    stats = {'files': 0, 'bytes': 0, 'errors': 0, 'processes': num_processes}
+    with mp.Pool(processes=num_processes) as pool:
+        # Largest logs first so one big file doesn't start last and leave the other cores idle
+        ordered = sorted(log_files, key=lambda file_path: Path(file_path).stat().st_size
+                         if Path(file_path).exists() else 0, reverse=True)
+        for input_file, output_file, size, seconds, error in pool.imap_unordered(process_log, ordered):
+            stats['files'] += 1
+            if error:
+                stats['errors'] += 1
+                print(f"Error: {error}")
+                continue
+            stats['bytes'] += size
+            print(f"Cleaned SQL written to {output_file} ({size / (1024 * 1024):.2f} MB in {seconds:.2f} s)")
+    stats['seconds'] = time.time() - start
+    return stats
 
 def get_log_files_from_folder(folder_path):
     """Get all log files (log) from a folder."""
     folder = Path(folder_path)
     query_files = []
-    
+
     if not folder.exists() or not folder.is_dir():
         print(f"Invalid folder path: {folder_path}")
         return query_files
-    
+
     # Search for .log files
     for file in folder.rglob('*'):
         if file.is_file():
             if file.suffix.lower() in ['.log','.msg']:
                 query_files.append(('log', str(file)))
-    
+
     return query_files
 
 def process_default_log ():
     try:
-        with open('test.log', 'r', encoding='utf-8') as f:
-            sample_sql = f.read()
-        
-        cleaned_sql = clean_bteq_log(sample_sql)
-        with open('query.txt', 'w', encoding='utf-8') as out_f:
-            out_f.write(cleaned_sql)
+        clean_log_file('test.log', 'query.txt')
         print("Cleaned SQL written to query.txt")
     except FileNotFoundError:
         print("Error: 'test2.log' not found. Please create this file with your BTEQ log content.")
 
-if __name__=="__main__":
-
+def main():
     input_path = input("Enter path to query file or folder (press Enter for default 'sqls'): ").strip()
     # Use default sqls folder in current directly if no path provided
     if not input_path:
         input_path = '.\\sqls'
 
     query_files = get_log_files_from_folder(input_path)
-    
+
     if not query_files:
         print(f"No query files found in folder: {input_path}")
-    else:    
-        for file_type, file_path in query_files:
-            print(f"Processing {file_type} file: {file_path}")
-            process_log (file_path)
+        return
+
+    num_processes_input = input(f"Enter number of processes to use (press Enter for default {max(1, mp.cpu_count() - 1)}): ").strip()
+    num_processes = int(num_processes_input) if num_processes_input else None
+
+    stats = clean_logs([file_path for _, file_path in query_files], num_processes)
+
+    megabytes = stats['bytes'] / (1024 * 1024)
+    print(f"\n{'='*60}")
+    print(f"LOG CLEANING STATISTICS")
+    print(f"{'='*60}")
+    print(f"Log files:               {stats['files']}")
+    print(f"Failed:                  {stats['errors']}")
+    print(f"Processes:               {stats['processes']}")
+    print(f"Input size:              {megabytes:.2f} MB")
+    print(f"Elapsed time:            {stats['seconds']:.2f} seconds")
+    print(f"Throughput:              {megabytes / stats['seconds'] if stats['seconds'] else 0:.2f} MB/s")
+    print(f"{'='*60}")
+
+if __name__=="__main__":
+    main()
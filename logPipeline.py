@@ -0,0 +1,177 @@
+"""
+Fused BTEQ log to lineage pipeline.
+
+The manual flow runs logExtract, which writes a .sql next to every .log, and
+then MultiProcessingParser, which reads those files back. Here the logs are
+cleaned by a small pool of cleaner processes (the producers) and each cleaned
+log is handed, in memory and as soon as it is ready, to the statement
+splitter that feeds the lineage worker pool (the consumers). Nothing is
+written until the relations and error outputs, and the rows of each statement
+carry the stem of the log it came from as script_file.
+"""
+
+import logging
+import multiprocessing as mp
+import time
+
+from logExtract import get_log_files_from_folder, clean_log_text
+from lineageCache import DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES
+from lineageIO import output_path, write_table, OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT
+from MultiProcessingParser import (process_with_multiprocessing, add_table_types, uppercase_output,
+                                   PoolOptions, OutputOptions, DEFAULT_MAX_TASKS_PER_CHILD,
+                                   DEFAULT_MAX_WORKER_MEMORY_MB)
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cleaning is much cheaper than parsing, so a couple of producers keep the lineage pool fed
+DEFAULT_CLEAN_PROCESSES = 2
+
+
+def iter_cleaned_logs(log_files, clean_processes=DEFAULT_CLEAN_PROCESSES, stats=None):
+    """Yield (log stem, cleaned SQL) for each log as soon as it has been cleaned.
+
+    Args:
+        log_files: Paths of the BTEQ logs
+        clean_processes: Cleaner processes; 1 or less cleans in this process
+        stats: Optional dict updated with logs, bytes and cumulative clean_seconds
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault('logs', 0)
+    stats.setdefault('bytes', 0)
+    stats.setdefault('clean_seconds', 0.0)
+
+    if clean_processes > 1 and len(log_files) > 1:
+        pool = mp.Pool(processes=min(clean_processes, len(log_files)))
+        cleaned = pool.imap_unordered(clean_log_text, log_files)
+    else:
+        pool = None
+        cleaned = map(clean_log_text, log_files)
+    try:
+        for file_nme, cleaned_sql, size, seconds in cleaned:
+            stats['logs'] += 1
+            stats['bytes'] += size
+            stats['clean_seconds'] += seconds
+            yield (file_nme, cleaned_sql)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def run_log_pipeline(log_folder, custom_name, clean_processes=DEFAULT_CLEAN_PROCESSES, types_file_path=None,
+                     output_format=DEFAULT_OUTPUT_FORMAT, **process_options):
+    """Clean every log in log_folder and extract its lineage without intermediate .sql files.
+
+    process_options go to process_with_multiprocessing (num_processes,
+    cache_path, pool, pool_options, ...). Unless a pool or pool_options are
+    given, worker recycling is switched on. With a 'fifo' schedule,
+    statements are then dispatched while later logs are still being cleaned;
+    the default cost schedule cleans every log first to order the whole run.
+
+    Returns:
+        Dict of counts, timings and the relations output path
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+    log_files = [file_path for _, file_path in get_log_files_from_folder(log_folder)]
+    if not log_files:
+        raise ValueError(f"No log files found in folder: {log_folder}")
+
+    start_time = time.time()
+    if 'pool' not in process_options:
+        # Per-statement budgets and worker recycling, as in MultiProcessingParser.main
+        process_options.setdefault('pool_options', PoolOptions(max_tasks_per_child=DEFAULT_MAX_TASKS_PER_CHILD,
+                                                               max_worker_memory_mb=DEFAULT_MAX_WORKER_MEMORY_MB))
+    clean_stats = {}
+    sql = iter_cleaned_logs(log_files, clean_processes, clean_stats)
+    df, processing_time, successful_queries, failed_queries = process_with_multiprocessing(
+        sql, custom_name, output_options=OutputOptions(types_file_path=types_file_path, input_path=log_folder,
+                                                       output_format=output_format), **process_options
+    )
+
+    relations_path = output_path("./Relationships/" + custom_name + "-relations.csv", output_format)
+    types_time = save_time = 0
+    if not df.empty:
+        types_start = time.time()
+        df = add_table_types(df, types_file_path, log_folder, custom_name)
+        types_time = time.time() - types_start
+
+        save_start = time.time()
+        write_table(uppercase_output(df), relations_path)
+        save_time = time.time() - save_start
+
+    stats = {
+        'logs': clean_stats.get('logs', 0),
+        'megabytes': clean_stats.get('bytes', 0) / (1024 * 1024),
+        'clean_seconds': clean_stats.get('clean_seconds', 0.0),
+        'processing_time': processing_time,
+        'types_time': types_time,
+        'save_time': save_time,
+        'total_time': time.time() - start_time,
+        'successful_queries': successful_queries,
+        'failed_queries': failed_queries,
+        'relationship_rows': len(df),
+        'relations_path': relations_path if not df.empty else None,
+    }
+    print_pipeline_summary(stats)
+    return stats
+
+
+def print_pipeline_summary(stats):
+    print(f"\n{'='*60}")
+    print(f"LOG PIPELINE STATISTICS")
+    print(f"{'='*60}")
+    print(f"Logs cleaned:            {stats['logs']} ({stats['megabytes']:.2f} MB)")
+    print(f"Cleaning time (summed):  {stats['clean_seconds']:.2f} seconds")
+    print(f"Clean + parse time:      {stats['processing_time']:.2f} seconds")
+    print(f"Type matching time:      {stats['types_time']:.2f} seconds")
+    print(f"Save time:               {stats['save_time']:.2f} seconds")
+    print(f"Total time:              {stats['total_time']:.2f} seconds")
+    if stats['total_time']:
+        print(f"Throughput:              {stats['megabytes'] / stats['total_time']:.2f} MB/s of logs")
+    print(f"Lineage relationships:   {stats['relationship_rows']}")
+    print(f"Output file:             {stats['relations_path'] or 'n/a'}")
+    print(f"{'='*60}")
+
+
+def main():
+    """Log folder to lineage in one run."""
+    print("\n" + "="*60)
+    print("BTEQ LOG TO LINEAGE PIPELINE")
+    print("="*60 + "\n")
+
+    custom_name = input("Enter Query name: ")
+    log_folder = input("Enter path to log folder (press Enter for default 'logfiles'): ").strip() or 'logfiles'
+
+    num_processes_input = input(f"Enter number of parser processes to use (press Enter for default {max(1, mp.cpu_count() - 1)}): ").strip()
+    num_processes = int(num_processes_input) if num_processes_input else None
+    clean_input = input(f"Enter number of log cleaning processes (press Enter for default {DEFAULT_CLEAN_PROCESSES}): ").strip()
+    clean_processes = int(clean_input) if clean_input else DEFAULT_CLEAN_PROCESSES
+
+    cache_input = input(f"Enter path to lineage cache (press Enter for default '{DEFAULT_CACHE_PATH}', 'none' to disable): ").strip()
+    if not cache_input:
+        cache_path = DEFAULT_CACHE_PATH
+    elif cache_input.lower() == 'none':
+        cache_path = None
+    else:
+        cache_path = cache_input
+
+    format_input = input(f"Enter output format (csv/parquet, press Enter for default '{DEFAULT_OUTPUT_FORMAT}'): ").strip().lower()
+    output_format = format_input or DEFAULT_OUTPUT_FORMAT
+    if output_format not in OUTPUT_FORMATS:
+        logger.warning(f"Unknown output format '{output_format}', using '{DEFAULT_OUTPUT_FORMAT}'")
+        output_format = DEFAULT_OUTPUT_FORMAT
+
+    types_file_path = input("Enter path to object types CSV file (press Enter to skip): ").strip()
+
+    try:
+        run_log_pipeline(log_folder, custom_name, clean_processes, types_file_path, output_format,
+                         num_processes=num_processes, cache_path=cache_path,
+                         cache_max_entries=DEFAULT_MAX_ENTRIES)
+    except ValueError as e:
+        logger.error(f"{e}. Exiting.")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,74 @@
 Pandas-based VOLTABLE Resolver - Optimized solution using DataFrame operations.
 """
 
+import numpy as np
 import pandas as pd
-from typing import Set, Tuple, Dict
+from pathlib import Path
+from typing import Set, Tuple, Dict, List
+import bisect
 import sys
+import time
+
+from lineageIO import read_table, write_table
+
+
+# Columns resolution reads; they are encoded even when entirely empty (and so loaded as floats)
+RESOLUTION_COLUMNS = ('script_file', 'CHILDTABLENAME', 'CHILDTABLETYPE', 'RELATIONSHIP',
+                      'PARENTTABLENAME', 'PARENTTABLETYPE')
+
+
+# Volatile tables only live for their session, so by default a VOLTABLE is resolved
+# from the definitions in its own script; 'global' merges all definitions of a name
+VOLTABLE_SCOPES = ('script', 'global')
+DEFAULT_VOLTABLE_SCOPE = 'script'
+
+
+def is_text_column(values: pd.Series) -> bool:
+    return isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(values.dtype)
+
+
+def encode_text_column(values: pd.Series) -> pd.Categorical:
+    """
+    Stripped text values as a categorical with sorted categories.
+    
+    Only the distinct values are stripped, and deduplication and sorting then work
+    on the integer codes while still following string order. Non-string values
+    become NaN, as with .str.strip().
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype('category')
+    current = values.array
+    stripped = [value.strip() if isinstance(value, str) else None for value in current.categories]
+    categories = pd.Index(sorted({value for value in stripped if value is not None}))
+    # The trailing -1 keeps missing values (code -1) missing
+    recode = np.append(categories.get_indexer(stripped), -1)
+    return pd.Categorical.from_codes(recode[current.codes], categories=categories)
+
+
+def encode_text_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Return df with every text column and the resolution columns encoded by encode_text_column."""
+    return df.assign(**{column: encode_text_column(df[column]) for column in df.columns
+                        if column in RESOLUTION_COLUMNS or is_text_column(df[column])})
 
 
 class PandasVOLTABLEResolver:
     """Efficient VOLTABLE resolver using Pandas DataFrame operations."""
     
-    def __init__(self, input_file: str, output_file: str, verbose: bool = False):
+    def __init__(self, input_file: str, output_file: str, verbose: bool = False,
+                 scope: str = DEFAULT_VOLTABLE_SCOPE):
+        if scope not in VOLTABLE_SCOPES:
+            raise ValueError(f"Unknown VOLTABLE scope '{scope}', expected one of {VOLTABLE_SCOPES}")
         self.input_file = input_file
         self.output_file = output_file
         self.verbose = verbose
+        self.scope = scope
         self.df: pd.DataFrame = None
+        # VOLTABLE key (see voltable_key) -> {(parent key or name, parent_type, script_file)}
         self.voltable_dependencies: Dict[str, Set[Tuple[str, str]]] = {}
+        # VOLTABLE key -> {(parent_name, parent_type, frozenset(script_files))} of its non-VOLTABLE parents
+        self.voltable_closure: Dict[str, Set[Tuple[str, str, frozenset]]] = {}
+        # VOLTABLE references, the rows they expanded to and those that resolved to nothing
+        self.fanout_stats: Dict[str, int] = {}
         
     def log(self, message: str) -> None:
         """Print log messages if verbose mode is enabled."""
@@ -25,12 +79,15 @@ class PandasVOLTABLEResolver:
     
     
     def load_data(self) -> bool:
-        """Load CSV data into DataFrame."""
+        """Load CSV or Parquet data into DataFrame."""
         try:
-            self.df = pd.read_csv(self.input_file).drop_duplicates()
-            self.df = self.df.apply(lambda x: x.str.strip() if x.dtype == "object" else x)
+            # Text columns become sorted categoricals: only distinct values are stripped,
+            # and dedup, joins and sorting below work on their integer codes
+            self.df = encode_text_columns(read_table(self.input_file)).drop_duplicates()
 
-            self.df.loc[self.df['RELATIONSHIP']!='Delete','RELATIONSHIP'] = 'Loaded From'
+            is_delete = (self.df['RELATIONSHIP'] == 'Delete').to_numpy()
+            self.df['RELATIONSHIP'] = pd.Categorical.from_codes(np.where(is_delete, 0, 1),
+                                                                categories=['Delete', 'Loaded From'])
             
             # Validate required columns
             required_cols = {'CHILDTABLENAME', 'CHILDTABLETYPE', 'RELATIONSHIP', 
@@ -50,36 +107,171 @@ class PandasVOLTABLEResolver:
             print(f"Error loading file: {e}")
             return False
     
+    def voltable_key(self, script_file: str, table_name: str):
+        """
+        Key of a VOLTABLE read in script_file: (script_file, name) with script scope
+        when the script defines it, otherwise the name, which stands for every
+        definition of it. A script can't read another session's volatile table, so a
+        VOLTABLE it never creates is a table typed VOLTABLE because some other script
+        creates it as one.
+        """
+        if self.scope == 'script' and (script_file, table_name) in self.voltable_dependencies:
+            return (script_file, table_name)
+        return table_name
+    
     def build_voltable_map(self) -> None:
         """Build a mapping of VOLTABLEs to their parent tables using Pandas."""
-        # Filter rows where child is VOLTABLE
-        voltable_rows = self.df[self.df['CHILDTABLETYPE'] == 'VOLTABLE']
-        
-        # Group by VOLTABLE name and collect parent tables
-        for voltable_name, group in voltable_rows.groupby('CHILDTABLENAME'):
-            parents = set(zip(group['PARENTTABLENAME'], group['PARENTTABLETYPE'], group['script_file']))
-            self.voltable_dependencies[voltable_name] = parents
-        
-        self.log(f"✓ Found {len(self.voltable_dependencies)} VOLTABLE tables")
+        # Filter rows where child is VOLTABLE; repeats only differ in columns the map doesn't keep
+        voltable_rows = self.df.loc[self.df['CHILDTABLETYPE'] == 'VOLTABLE',
+                                    ['CHILDTABLENAME', 'PARENTTABLENAME', 'PARENTTABLETYPE', 'script_file']
+                                    ].drop_duplicates()
+        # Grouped by VOLTABLE name in name order, as groupby did, without a pandas call per group
+        voltable_rows = voltable_rows[voltable_rows['CHILDTABLENAME'].notna()].sort_values('CHILDTABLENAME', kind='stable')
+        
+        definitions = list(zip(*(voltable_rows[column].tolist() for column in voltable_rows.columns)))
+        if self.scope == 'script':
+            # Every script's own definitions first, so voltable_key can tell which names a script creates
+            for voltable_name, _, _, script_file in definitions:
+                self.voltable_dependencies.setdefault((script_file, voltable_name), set())
+        
+        # Collect the parent tables of each VOLTABLE; VOLTABLE parents are keys in the same scope
+        for voltable_name, parent_name, parent_type, script_file in definitions:
+            if parent_type == 'VOLTABLE':
+                parent_name = self.voltable_key(script_file, parent_name)
+            parent = (parent_name, parent_type, script_file)
+            self.voltable_dependencies.setdefault(self.voltable_key(script_file, voltable_name), set()).add(parent)
+            if self.scope == 'script':
+                # The name-level definition read by scripts that don't create the VOLTABLE
+                self.voltable_dependencies.setdefault(voltable_name, set()).add(parent)
+        
+        self.log(f"✓ Found {len(self.voltable_dependencies)} VOLTABLE definitions ({self.scope} scope)")
         
         if self.verbose:
             for voltable, parents in self.voltable_dependencies.items():
                 self.log(f"  {voltable} → {parents}")
     
+    def strongly_connected_components(self) -> List[List[str]]:
+        """
+        Group tables of the VOLTABLE dependency graph into strongly connected components.
+        
+        Iterative Tarjan, so deep chains don't hit the recursion limit. Components
+        come out in reverse topological order: every component a table depends on
+        is listed before it.
+        """
+        # Tables without dependencies (including NaN names) resolve to nothing further
+        graph = {name: [parent_name for parent_name, _, _ in parents
+                        if parent_name in self.voltable_dependencies]
+                 for name, parents in self.voltable_dependencies.items()}
+        index: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack: Set[str] = set()
+        components: List[List[str]] = []
+        
+        for root in graph:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(graph[root]))]
+            while work:
+                node, parents = work[-1]
+                for parent in parents:
+                    if parent not in index:
+                        index[parent] = low[parent] = len(index)
+                        stack.append(parent)
+                        on_stack.add(parent)
+                        work.append((parent, iter(graph[parent])))
+                        break
+                    if parent in on_stack:
+                        low[node] = min(low[node], index[parent])
+                else:
+                    work.pop()
+                    if work:
+                        low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member is node:
+                                break
+                        components.append(component)
+        return components
+    
+    def build_voltable_closure(self) -> None:
+        """
+        Resolve every VOLTABLE to its non-VOLTABLE parents once.
+        
+        Components are resolved dependencies first, so a VOLTABLE outside a cycle
+        just combines the memoized parents of the tables it reads from. A table
+        can't reach any of its callers from outside its component, so memoized
+        results are the same whatever path led to them. Only inside a cyclic
+        component are paths walked with cycle detection, as resolve_parent_chain
+        always did.
+        """
+        self.voltable_closure = {}
+        for component in self.strongly_connected_components():
+            members = set(component)
+            for name in component:
+                if name in self.voltable_dependencies:
+                    self.voltable_closure[name] = self._resolve_from(name, members, {name})
+        
+        self.log(f"✓ Resolved {len(self.voltable_closure)} VOLTABLE closures")
+    
+    def _resolve_from(self, table_name: str, members: Set[str],
+                      visited: Set[str]) -> Set[Tuple[str, str, frozenset]]:
+        """Non-VOLTABLE parents of table_name, walking only paths inside its component."""
+        resolved_parents = set()
+        for parent_name, parent_type, parent_script_file in self.voltable_dependencies.get(table_name, ()):
+            # Cycle detection
+            if parent_name in visited:
+                continue
+            if parent_type != 'VOLTABLE':
+                resolved_parents.add((parent_name, parent_type, frozenset((parent_script_file,))))
+                continue
+            if parent_name in members:
+                parent_closure = self._resolve_from(parent_name, members, visited | {parent_name})
+            else:
+                parent_closure = self.voltable_closure.get(parent_name, ())
+            for resolved_name, resolved_type, script_files in parent_closure:
+                resolved_parents.add((resolved_name, resolved_type, script_files | {parent_script_file}))
+        return resolved_parents
+    
     def resolve_parent_chain(self, table_name: str, table_type: str, script_file_names: Set[str],
                             visited: Set[str] = None) -> Set[Tuple[str, str, frozenset]]:
         """
-        Recursively resolve VOLTABLE dependencies to get final parent tables.
+        Resolve VOLTABLE dependencies to get final parent tables.
+        
+        Uses the closure from build_voltable_closure, which is built on first use.
         
         Args:
-            table_name: Name of the table to resolve
+            table_name: Name of the table to resolve (its voltable_key if a VOLTABLE)
             table_type: Type of the table
             script_file_names: Set of script file names to track
-            visited: Set to track visited tables (cycle detection)
+            visited: Tables already on the path (cycle detection); only needed
+                when resolving from inside a chain, which walks the graph
             
         Returns:
             Set of (parent_name, parent_type, script_file_names) tuples that are not VOLTABLEs
         """
+        if visited:
+            return self._legacy_resolve_parent_chain(table_name, table_type, script_file_names, visited)
+        
+        # Base case: if not a VOLTABLE, return itself
+        if table_type != 'VOLTABLE':
+            return {(table_name, table_type, frozenset(script_file_names))}
+        
+        if not self.voltable_closure and self.voltable_dependencies:
+            self.build_voltable_closure()
+        return {(resolved_name, resolved_type, script_files | script_file_names)
+                for resolved_name, resolved_type, script_files in self.voltable_closure.get(table_name, ())}
+    
+    def _legacy_resolve_parent_chain(self, table_name: str, table_type: str, script_file_names: Set[str],
+                                     visited: Set[str] = None) -> Set[Tuple[str, str, frozenset]]:
+        """Previous path-walking resolution, kept as the benchmark baseline."""
         if visited is None:
             visited = set()
         
@@ -99,18 +291,203 @@ class PandasVOLTABLEResolver:
             # Create a new set with the parent script file added
             updated_script_files = script_file_names | {parent_script_file}
             resolved_parents.update(
-                self.resolve_parent_chain(parent_name, parent_type, updated_script_files, visited.copy())
+                self._legacy_resolve_parent_chain(parent_name, parent_type, updated_script_files, visited.copy())
             )
         
         return resolved_parents
     
+    @staticmethod
+    def combine_key_codes(df: pd.DataFrame, script_codes: np.ndarray, name_codes: np.ndarray,
+                          scoped: np.ndarray) -> np.ndarray:
+        """
+        Join codes of VOLTABLE keys from script_file and PARENTTABLENAME codes.
+        
+        A name key is its name code; a (script, name) key, where scoped is set,
+        gets one code per pair past the name codes. -1 where a part is missing.
+        """
+        script_codes = np.asarray(script_codes, dtype=np.int64)
+        name_codes = np.asarray(name_codes, dtype=np.int64)
+        codes = np.where(scoped, (script_codes + 1) * len(df['PARENTTABLENAME'].cat.categories) + name_codes,
+                         name_codes)
+        return np.where((name_codes >= 0) & (~scoped | (script_codes >= 0)), codes, -1)
+    
+    def key_codes(self, df: pd.DataFrame, keys: List) -> np.ndarray:
+        """Join codes (see combine_key_codes) of VOLTABLE keys as made by voltable_key."""
+        scoped = np.array([isinstance(key, tuple) for key in keys], dtype=bool)
+        scripts = [key[0] if isinstance(key, tuple) else None for key in keys]
+        names = [key[1] if isinstance(key, tuple) else key for key in keys]
+        return self.combine_key_codes(df, df['script_file'].cat.categories.get_indexer(pd.Index(scripts, dtype=object)),
+                                      df['PARENTTABLENAME'].cat.categories.get_indexer(pd.Index(names, dtype=object)),
+                                      scoped)
+    
+    def build_closure_table(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        The VOLTABLE closure as a table that joins on VOLTABLE key codes.
+        
+        Args:
+            df: Relationships with encoded text columns
+            
+        Returns:
+            DataFrame with one row per (VOLTABLE, resolved parent): VOLTABLE_CODE from
+            key_codes, PARENT_CODE in the PARENTTABLENAME categories, PARENT_TYPE_CODE
+            in the PARENTTABLETYPE categories and the frozenset of SCRIPT_FILES
+        """
+        if not self.voltable_closure and self.voltable_dependencies:
+            self.build_voltable_closure()
+        
+        entries = [(voltable_name, parent_name, parent_type, script_files)
+                   for voltable_name, resolved_parents in self.voltable_closure.items()
+                   for parent_name, parent_type, script_files in resolved_parents]
+        # Sets have no order; sorting keeps the output order of tied rows stable between runs
+        entries.sort(key=lambda entry: (str(entry[0]), str(entry[1]), str(entry[2]), sorted(map(str, entry[3]))))
+        
+        voltable_keys, parent_names, parent_types, script_files = (
+            (list(column) for column in zip(*entries)) if entries else ([], [], [], []))
+        name_categories = df['PARENTTABLENAME'].cat.categories
+        closure = pd.DataFrame({
+            'VOLTABLE_CODE': self.key_codes(df, voltable_keys),
+            'PARENT_CODE': name_categories.get_indexer(pd.Index(parent_names, dtype=object)),
+            'PARENT_TYPE_CODE': df['PARENTTABLETYPE'].cat.categories.get_indexer(pd.Index(parent_types, dtype=object)),
+            'SCRIPT_FILES': pd.Series(script_files, dtype=object),
+        })
+        # VOLTABLEs no relationship reads from can't be joined
+        return closure[closure['VOLTABLE_CODE'] != -1].reset_index(drop=True)
+    
+    def expand_closure(self, df: pd.DataFrame, voltable_relationships: pd.DataFrame) -> pd.DataFrame:
+        """
+        Replace each VOLTABLE parent by its resolved parents with one join.
+        
+        Each resolved row's script_file joins the scripts of the chain and of the
+        row itself; it is built once per distinct (closure entry, script) pair.
+        The script_file categories cover both the input and the new values.
+        """
+        closure = self.build_closure_table(df)
+        script_codes = voltable_relationships['script_file'].array.codes
+        name_codes = voltable_relationships['PARENTTABLENAME'].array.codes
+        # Scripts read the VOLTABLEs they define; anything else resolves by name (see voltable_key)
+        scoped_codes = self.combine_key_codes(df, script_codes, name_codes, True)
+        in_script = (scoped_codes != -1) & np.isin(scoped_codes, self.key_codes(
+            df, [key for key in self.voltable_dependencies if isinstance(key, tuple)]))
+        reference_codes = np.where(in_script, scoped_codes,
+                                   self.combine_key_codes(df, script_codes, name_codes, False))
+        pairs = pd.DataFrame({
+            'ROW': np.arange(len(voltable_relationships)),
+            'VOLTABLE_CODE': reference_codes,
+        }).merge(closure.rename_axis('ENTRY').reset_index()[['ENTRY', 'VOLTABLE_CODE']], on='VOLTABLE_CODE')
+        rows = pairs['ROW'].to_numpy()
+        entries = pairs['ENTRY'].to_numpy()
+        resolved = np.isin(reference_codes, closure['VOLTABLE_CODE'].to_numpy())
+        self.fanout_stats = {
+            'references': len(voltable_relationships),
+            'expanded': len(pairs),
+            'unresolved': int((~resolved).sum()),
+            'by_name': int((resolved & ~in_script).sum()) if self.scope == 'script' else 0,
+        }
+        
+        script_categories = df['script_file'].cat.categories
+        row_scripts = voltable_relationships['script_file'].array.codes[rows].astype(np.int64)
+        pair_codes, unique_pairs = pd.factorize(entries * (len(script_categories) + 1) + row_scripts + 1)
+        # Code 0 is a missing script
+        script_names = [None] + script_categories.tolist()
+        chain_scripts = [sorted(name for name in script_files if isinstance(name, str))
+                         for script_files in closure['SCRIPT_FILES']]
+        chain_joined = [' | '.join(names) for names in chain_scripts]
+        joined_scripts = []
+        for entry, script_code in zip(*(codes.tolist() for codes in np.divmod(unique_pairs, len(script_names)))):
+            name = script_names[script_code]
+            names = chain_scripts[entry]
+            position = bisect.bisect_left(names, name) if name is not None else 0
+            if name is None or (position < len(names) and names[position] == name):
+                joined_scripts.append(chain_joined[entry])
+            else:
+                joined_scripts.append(' | '.join(names[:position] + [name] + names[position:]))
+        joined_scripts = pd.Index(joined_scripts, dtype=script_categories.dtype)
+        script_categories = script_categories.union(joined_scripts.unique())
+        script_codes = script_categories.get_indexer(joined_scripts)
+        
+        resolved = {}
+        for column in df.columns:
+            if column in ('CHILDTABLENAME', 'CHILDTABLETYPE', 'RELATIONSHIP'):
+                resolved[column] = voltable_relationships[column].array.take(rows)
+            elif column == 'PARENTTABLENAME':
+                resolved[column] = pd.Categorical.from_codes(closure['PARENT_CODE'].to_numpy()[entries],
+                                                             categories=df[column].cat.categories)
+            elif column == 'PARENTTABLETYPE':
+                resolved[column] = pd.Categorical.from_codes(closure['PARENT_TYPE_CODE'].to_numpy()[entries],
+                                                             categories=df[column].cat.categories)
+            elif column == 'script_file':
+                resolved[column] = pd.Categorical.from_codes(script_codes[pair_codes], categories=script_categories)
+        return pd.DataFrame(resolved)
+    
     def resolve_relationships(self) -> pd.DataFrame:
         """
         Resolve all VOLTABLE relationships and return a new DataFrame.
         
+        Rows with a VOLTABLE parent are expanded by a join against the closure
+        table; text columns are categoricals throughout, so filtering, dedup and
+        sorting compare integer codes rather than strings.
+        
         Returns:
             DataFrame with resolved relationships (no VOLTABLEs)
         """
+        # Already encoded by load_data; this is cheap then and covers frames set directly
+        df = encode_text_columns(self.df)
+        
+        # Filter out rows where child is VOLTABLE (these are intermediate definitions)
+        non_voltable_children = df[df['CHILDTABLETYPE'] != 'VOLTABLE']
+        
+        self.log(f"✓ Processing {len(non_voltable_children)} non-VOLTABLE relationships")
+        
+        # Separate direct relationships (parent is not VOLTABLE) 
+        # from those that need resolution (parent is VOLTABLE)
+        is_voltable_parent = non_voltable_children['PARENTTABLETYPE'] == 'VOLTABLE'
+        direct_relationships = non_voltable_children[~is_voltable_parent]
+        voltable_relationships = non_voltable_children[is_voltable_parent]
+        
+        self.log(f"  - {len(direct_relationships)} direct relationships (no resolution needed)")
+        self.log(f"  - {len(voltable_relationships)} relationships to resolve")
+        
+        resolved_df = self.expand_closure(df, voltable_relationships)
+        # Same script_file categories on both sides, so the concat stays categorical
+        direct_relationships = direct_relationships.assign(
+            script_file=direct_relationships['script_file'].cat.set_categories(
+                resolved_df['script_file'].cat.categories))
+        
+        # Combine direct and resolved relationships
+        result = pd.concat([direct_relationships, resolved_df], ignore_index=True)
+        
+        # Remove duplicates
+        result = result.drop_duplicates()
+        
+        # Sort for consistent output; categories are sorted, so code order is string order
+        result = result.sort_values(
+            by=['CHILDTABLENAME', 'PARENTTABLENAME', 'script_file']
+        ).reset_index(drop=True)
+        
+        self.log(f"✓ Resolved to {len(result)} relationships")
+        
+        return result
+    
+    def count_global_expansion(self) -> int:
+        """
+        Parent tables the VOLTABLE references would expand to if every definition of
+        a name were merged. Script sets are left out, as they can multiply beyond
+        what is practical to build, so this is a lower bound on the rows global
+        scope gives.
+        """
+        resolver = PandasVOLTABLEResolver(self.input_file, self.output_file, scope='global')
+        resolver.df = self.df.assign(script_file='')
+        resolver.build_voltable_map()
+        df = encode_text_columns(self.df)
+        closure = resolver.build_closure_table(df)
+        parents_per_name = np.bincount(closure['VOLTABLE_CODE'].to_numpy(),
+                                       minlength=len(df['PARENTTABLENAME'].cat.categories))
+        references = df.loc[(df['CHILDTABLETYPE'] != 'VOLTABLE') & (df['PARENTTABLETYPE'] == 'VOLTABLE'),
+                            'PARENTTABLENAME'].array.codes
+        return int(parents_per_name[references[references >= 0]].sum())
+    
+    def _legacy_resolve_relationships(self) -> pd.DataFrame:
+        """Previous row-by-row resolution through resolve_parent_chain, kept as the benchmark baseline."""
         # Filter out rows where child is VOLTABLE (these are intermediate definitions)
         non_voltable_children = self.df[self.df['CHILDTABLETYPE'] != 'VOLTABLE'].copy()
         
@@ -142,7 +519,9 @@ class PandasVOLTABLEResolver:
             
             # Resolve the VOLTABLE parent to its actual parent tables
             script_file_names = {script_file_name}
-            resolved_parents = self.resolve_parent_chain(parent_name, parent_type, script_file_names)
+            resolved_parents = self.resolve_parent_chain(self.voltable_key(script_file_name, parent_name)
+                                                         if parent_type == 'VOLTABLE' else parent_name,
+                                                         parent_type, script_file_names)
             
             # Create a new row for each resolved parent
             for resolved_parent_name, resolved_parent_type, resolved_script_files in resolved_parents:
@@ -167,9 +546,9 @@ class PandasVOLTABLEResolver:
         # Remove duplicates
         result = result.drop_duplicates()
         
-        # Sort for consistent output
+        # Sort for consistent output; script_file breaks ties that set iteration order would leave random
         result = result.sort_values(
-            by=['CHILDTABLENAME', 'PARENTTABLENAME']
+            by=['CHILDTABLENAME', 'PARENTTABLENAME', 'script_file']
         ).reset_index(drop=True)
         
         self.log(f"✓ Resolved to {len(result)} relationships")
@@ -177,16 +556,22 @@ class PandasVOLTABLEResolver:
         return result
     
     def save_data(self, df: pd.DataFrame) -> bool:
-        """Save resolved DataFrame to CSV."""
+        """Save resolved DataFrame as CSV or Parquet, depending on the output file suffix."""
         try:
             df = df.drop_duplicates()
-            df.to_csv(self.output_file, index=False)
+            write_table(df, self.output_file)
             self.log(f"✓ Saved to '{self.output_file}'")
             return True
         except Exception as e:
             print(f"Error saving file: {e}")
             return False
     
+    @staticmethod
+    def _observed_counts(values: pd.Series) -> pd.Series:
+        # value_counts of a categorical also lists categories that no row has
+        counts = values.value_counts()
+        return counts[counts > 0]
+    
     def print_statistics(self, input_df: pd.DataFrame, output_df: pd.DataFrame) -> None:
         """Print detailed statistics about the transformation."""
         print("\n" + "="*70)
@@ -207,13 +592,29 @@ class PandasVOLTABLEResolver:
         
         # Table type distribution
         print(f"\nInput table type distribution:")
-        for type_name, count in input_df['CHILDTABLETYPE'].value_counts().items():
+        for type_name, count in self._observed_counts(input_df['CHILDTABLETYPE']).items():
             print(f"  {type_name:20} {count}")
         
         print(f"\nOutput table type distribution:")
-        for type_name, count in output_df['CHILDTABLETYPE'].value_counts().items():
+        for type_name, count in self._observed_counts(output_df['CHILDTABLETYPE']).items():
             print(f"  {type_name:20} {count}")
         
+        # VOLTABLE fan-out
+        if self.fanout_stats.get('references'):
+            references = self.fanout_stats['references']
+            print(f"\nVOLTABLE scope:               {self.scope}")
+            print(f"VOLTABLE references:          {references}")
+            print(f"Expanded to:                  {self.fanout_stats['expanded']} "
+                  f"(fan-out {self.fanout_stats['expanded'] / references:.1f})")
+            if 'global_expanded' in self.fanout_stats:
+                global_expanded = self.fanout_stats['global_expanded']
+                print(f"Global scope would give:      at least {global_expanded} "
+                      f"(fan-out {global_expanded / references:.1f}+)")
+            if self.scope == 'script':
+                print(f"Resolved by name:             {self.fanout_stats['by_name']} "
+                      f"(read by scripts that don't create them)")
+            print(f"Unresolved references:        {self.fanout_stats['unresolved']}")
+        
         # Net change
         net_change = len(output_df) - len(input_df)
         print(f"\nNet change:                   {net_change:+d}")
@@ -229,11 +630,14 @@ class PandasVOLTABLEResolver:
         
         input_df = self.df.copy()
         
-        # Build VOLTABLE dependency map
+        # Build VOLTABLE dependency map and resolve each VOLTABLE once
         self.build_voltable_map()
+        self.build_voltable_closure()
         
         # Resolve relationships
         resolved_df = self.resolve_relationships()
+        if self.scope == 'script':
+            self.fanout_stats['global_expanded'] = self.count_global_expansion()
         
         # Save results
         if not self.save_data(resolved_df):
@@ -246,17 +650,222 @@ class PandasVOLTABLEResolver:
         return True
 
 
+def build_synthetic_voltable_graph(depth: int, width: int, targets: int = 10) -> pd.DataFrame:
+    """
+    Relationships of a diamond-shaped VOLTABLE chain: width base tables, then depth
+    layers of width VOLTABLEs each loaded from every table of the layer below, then
+    targets tables loaded from the top layer. There are width**depth paths from
+    each target down to each base table.
+    """
+    rows = []
+    below = [(f"DB.BASE_{i}", 'TABLE') for i in range(width)]
+    for layer in range(1, depth + 1):
+        current = [(f"VT_{layer}_{i}", 'VOLTABLE') for i in range(width)]
+        for i, (child_name, child_type) in enumerate(current):
+            for parent_name, parent_type in below:
+                rows.append((f"SCRIPT_{(layer + i) % 3}", child_name, child_type, 'Loaded From',
+                             parent_name, parent_type))
+        below = current
+    for k in range(targets):
+        for parent_name, parent_type in below:
+            rows.append((f"SCRIPT_{k % 3}", f"DB.TARGET_{k}", 'TABLE', 'Loaded From', parent_name, parent_type))
+    return pd.DataFrame(rows, columns=['script_file', 'CHILDTABLENAME', 'CHILDTABLETYPE', 'RELATIONSHIP',
+                                       'PARENTTABLENAME', 'PARENTTABLETYPE'])
+
+
+def same_relationships(left: pd.DataFrame, right: pd.DataFrame) -> bool:
+    """Whether two relationship frames hold the same values in the same order, whatever their dtypes."""
+    return left.astype(object).reset_index(drop=True).equals(right.astype(object).reset_index(drop=True))
+
+
+def benchmark_voltable_resolution(depth: int, width: int, targets: int = 10, run_legacy: bool = True) -> Dict:
+    """
+    Time the memoized closure against the legacy path walk on a synthetic graph.
+    
+    Returns:
+        Dict with both timings (legacy only when run_legacy), the output row
+        count and whether the two outputs are identical
+    """
+    df = build_synthetic_voltable_graph(depth, width, targets)
+    stats = {'depth': depth, 'width': width, 'relationships': len(df)}
+    
+    # The chain spans scripts, so it only resolves with global scope
+    resolver = PandasVOLTABLEResolver(input_file='', output_file='', scope='global')
+    resolver.df = df
+    start = time.perf_counter()
+    resolver.build_voltable_map()
+    resolver.build_voltable_closure()
+    resolved = resolver.resolve_relationships()
+    stats['closure_seconds'] = time.perf_counter() - start
+    stats['output_rows'] = len(resolved)
+    
+    if run_legacy:
+        legacy = PandasVOLTABLEResolver(input_file='', output_file='', scope='global')
+        legacy.df = df
+        legacy.resolve_parent_chain = legacy._legacy_resolve_parent_chain
+        start = time.perf_counter()
+        legacy.build_voltable_map()
+        legacy_resolved = legacy._legacy_resolve_relationships()
+        stats['legacy_seconds'] = time.perf_counter() - start
+        stats['identical'] = same_relationships(legacy_resolved, resolved)
+    return stats
+
+
+def build_synthetic_relations(rows: int, voltables: int = 2000, scripts: int = 500, seed: int = 0) -> pd.DataFrame:
+    """
+    A relations table shaped like a large load: a few VOLTABLE definitions, each
+    reading two base tables and the script's previous VOLTABLE, with the same few
+    VOLTABLE names reused by every script, then rows loads of which
+    a tenth read from a VOLTABLE, in the script that defines it since volatile
+    tables only live for their session. Columns hold plain strings, as read_csv
+    gives them.
+    """
+    rng = np.random.default_rng(seed)
+    table_names = np.array([f"DB_{i % 20}.TABLE_{i}" for i in range(max(1000, rows // 100))], dtype=object)
+    voltable_names = np.array([f"TMP_{i // scripts}" for i in range(voltables)], dtype=object)
+    script_names = np.array([f"SCRIPT_{i}" for i in range(scripts)], dtype=object)
+    
+    definitions = []
+    for i, name in enumerate(voltable_names):
+        script = script_names[i % scripts]
+        for parent in rng.choice(table_names, 2):
+            definitions.append((script, name, 'VOLTABLE', 'Loaded From', parent, 'TABLE'))
+        if i >= scripts:
+            definitions.append((script, name, 'VOLTABLE', 'Loaded From', voltable_names[i - scripts], 'VOLTABLE'))
+    columns = ['script_file', 'CHILDTABLENAME', 'CHILDTABLETYPE', 'RELATIONSHIP', 'PARENTTABLENAME', 'PARENTTABLETYPE']
+    
+    from_voltable = rng.random(rows) < 0.1
+    voltable_index = rng.integers(0, voltables, rows)
+    parents = np.where(from_voltable, voltable_names[voltable_index],
+                       table_names[rng.integers(0, len(table_names), rows)])
+    loads = pd.DataFrame({
+        'script_file': np.where(from_voltable, script_names[voltable_index % scripts],
+                                script_names[rng.integers(0, scripts, rows)]),
+        'CHILDTABLENAME': table_names[rng.integers(0, len(table_names), rows)],
+        'CHILDTABLETYPE': 'TABLE',
+        'RELATIONSHIP': 'Loaded From',
+        'PARENTTABLENAME': parents,
+        'PARENTTABLETYPE': np.where(from_voltable, 'VOLTABLE', 'TABLE').astype(object),
+    })
+    return pd.concat([pd.DataFrame(definitions, columns=columns), loads], ignore_index=True)
+
+
+def benchmark_bulk_resolution(rows: int, run_legacy: bool = True) -> Dict:
+    """
+    Time load-side encoding plus resolution on a large synthetic relations table,
+    against the previous strip + row-by-row path.
+    
+    Returns:
+        Dict with timings, frame memory before and after encoding, the output row
+        count, the VOLTABLE expansions per script and with global scope, and
+        (with run_legacy) whether both outputs are identical
+    """
+    df = build_synthetic_relations(rows)
+    stats = {'relationships': len(df), 'plain_megabytes': df.memory_usage(deep=True).sum() / (1024 * 1024)}
+    
+    resolver = PandasVOLTABLEResolver(input_file='', output_file='')
+    start = time.perf_counter()
+    resolver.df = encode_text_columns(df).drop_duplicates()
+    stats['encode_seconds'] = time.perf_counter() - start
+    stats['encoded_megabytes'] = resolver.df.memory_usage(deep=True).sum() / (1024 * 1024)
+    resolver.build_voltable_map()
+    resolver.build_voltable_closure()
+    resolved = resolver.resolve_relationships()
+    stats['vectorized_seconds'] = time.perf_counter() - start
+    stats['output_rows'] = len(resolved)
+    stats['references'] = resolver.fanout_stats['references']
+    stats['expanded'] = resolver.fanout_stats['expanded']
+    stats['global_expanded'] = resolver.count_global_expansion()
+    
+    if run_legacy:
+        legacy = PandasVOLTABLEResolver(input_file='', output_file='')
+        start = time.perf_counter()
+        legacy.df = df.drop_duplicates().apply(lambda x: x.str.strip() if is_text_column(x) else x)
+        legacy.build_voltable_map()
+        legacy.build_voltable_closure()
+        legacy_resolved = legacy._legacy_resolve_relationships()
+        stats['legacy_seconds'] = time.perf_counter() - start
+        stats['identical'] = same_relationships(legacy_resolved, resolved)
+    return stats
+
+
+def benchmark_main() -> None:
+    """Benchmark VOLTABLE resolution on synthetic deep/wide chains."""
+    print("\n" + "="*70)
+    print("VOLTABLE RESOLUTION BENCHMARK")
+    print("="*70 + "\n")
+    
+    depth_input = input("Enter chain depth (press Enter for default 8): ").strip()
+    width_input = input("Enter chain width (press Enter for default 4): ").strip()
+    depth = int(depth_input) if depth_input else 8
+    width = int(width_input) if width_input else 4
+    # The legacy walk visits width**depth paths per target
+    run_legacy = width ** depth <= 1_000_000
+    
+    rows_input = input("Enter relation rows for the bulk benchmark (press Enter for default 1000000): ").strip()
+    rows = int(rows_input) if rows_input else 1_000_000
+    
+    stats = benchmark_voltable_resolution(depth, width, run_legacy=run_legacy)
+    
+    print("\n" + "="*70)
+    print("VOLTABLE RESOLUTION BENCHMARK STATISTICS")
+    print("="*70)
+    print(f"Chain:                        depth {depth}, width {width} ({width ** depth} paths per target)")
+    print(f"Input relationships:          {stats['relationships']}")
+    print(f"Output relationships:         {stats['output_rows']}")
+    print(f"Closure time:                 {stats['closure_seconds']:.3f} seconds")
+    if run_legacy:
+        print(f"Legacy time:                  {stats['legacy_seconds']:.3f} seconds")
+        if stats['closure_seconds']:
+            print(f"Speedup:                      {stats['legacy_seconds'] / stats['closure_seconds']:.1f}x")
+        print(f"Identical output:             {stats['identical']}")
+    else:
+        print(f"Legacy time:                  skipped (too many paths)")
+    
+    # The row-by-row path needs minutes beyond a few hundred thousand rows
+    run_legacy = rows <= 200_000
+    stats = benchmark_bulk_resolution(rows, run_legacy=run_legacy)
+    
+    print("-"*70)
+    print(f"Bulk relations:               {stats['relationships']} rows")
+    print(f"Output relationships:         {stats['output_rows']}")
+    print(f"Frame memory:                 {stats['plain_megabytes']:.1f} MB as strings, "
+          f"{stats['encoded_megabytes']:.1f} MB encoded")
+    print(f"Encoding time:                {stats['encode_seconds']:.3f} seconds")
+    print(f"Encode + resolve time:        {stats['vectorized_seconds']:.3f} seconds")
+    print(f"VOLTABLE fan-out:             {stats['expanded'] / stats['references']:.1f} per script, "
+          f"at least {stats['global_expanded'] / stats['references']:.1f} with global scope")
+    if run_legacy:
+        print(f"Legacy time:                  {stats['legacy_seconds']:.3f} seconds")
+        if stats['vectorized_seconds']:
+            print(f"Speedup:                      {stats['legacy_seconds'] / stats['vectorized_seconds']:.1f}x")
+        print(f"Identical output:             {stats['identical']}")
+    else:
+        print(f"Legacy time:                  skipped (too many rows)")
+    print("="*70 + "\n")
+
+
 def main():
     """Main entry point."""
-    input_path = input("Enter input CSV file path: ").strip()
-    output_path = input_path.replace('.csv', '_simplified.csv')
+    if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+        benchmark_main()
+        return
+    
+    input_path = input("Enter input CSV or Parquet file path: ").strip()
+    input_file = Path(input_path)
+    output_path = str(input_file.with_name(input_file.stem + '_simplified' + input_file.suffix))
     verbose_input = input("Enable verbose logging? (y/n): ").strip().lower()
+    scope = input(f"Resolve VOLTABLEs per script or by name across scripts? (script/global, press Enter for default '{DEFAULT_VOLTABLE_SCOPE}'): ").strip().lower() or DEFAULT_VOLTABLE_SCOPE
+    if scope not in VOLTABLE_SCOPES:
+        print(f"Unknown VOLTABLE scope '{scope}', using '{DEFAULT_VOLTABLE_SCOPE}'")
+        scope = DEFAULT_VOLTABLE_SCOPE
     
     # Create resolver and process
     resolver = PandasVOLTABLEResolver(
         input_file=input_path,
         output_file=output_path,
-        verbose=(verbose_input == 'y')
+        verbose=(verbose_input == 'y'),
+        scope=scope
     )
     
     success = resolver.process()
@@ -0,0 +1,249 @@
+"""
+Single-pass preprocessing of Teradata statements before parsing.
+
+Every rewrite the parsers need (Excel carriage-return escapes, LOCKING ...
+ACCESS modifiers, temporal qualifiers) is registered as a rule and all rules
+are compiled into one alternation, so a statement is scanned once no matter
+how many rules exist and every occurrence of a clause is rewritten, not only
+the first. To support another Teradata-ism, add a register_rule() call below.
+
+Each rule names literal triggers that must appear in the statement for it to
+match. The statement is lower-cased once and checked for triggers with plain
+substring tests; only the rules that can fire are compiled into the scan, and
+statements that trigger nothing (the vast majority) are returned untouched.
+"""
+
+import hashlib
+import logging
+import re
+import time
+from collections import namedtuple
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PreprocessRule = namedtuple('PreprocessRule', ['name', 'pattern', 'triggers', 'replacement', 'flags'])
+
+# Registered rules in priority order; when two rules match at the same position the first wins
+PREPROCESS_RULES = []
+
+_INLINE_FLAGS = ((re.IGNORECASE, 'i'), (re.DOTALL, 's'), (re.MULTILINE, 'm'), (re.VERBOSE, 'x'))
+
+# Compiled scans keyed by the tuple of rule names that were triggered
+_compiled_scans = {}
+
+# Tokens of a statement fingerprint: literals collapse to '?', runs of comments
+# and whitespace are dropped (or kept as one space between two words), words are
+# case folded and quoted identifiers kept as written
+_FINGERPRINT_TOKENS = re.compile(r"""
+    (?P<string>'(?:[^']|'')*')
+  | (?P<quoted>"(?:[^"]|"")*")
+  | (?P<space>(?:\s+|--[^\n]*|/\*.*?\*/)+)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)
+  | (?P<word>\w+)
+""", re.VERBOSE | re.DOTALL)
+
+
+def register_rule(name, pattern, triggers, replacement=' ', flags=re.IGNORECASE | re.DOTALL):
+    """Register a rewrite rule.
+
+    Args:
+        name: Identifier for the rule, used as the group name in the compiled scan
+        pattern: Regular expression to replace. It must not define named groups
+            of its own; use (?:...) for grouping.
+        triggers: Literal substrings that every match contains; the rule is
+            skipped unless all of them occur in the statement (compared
+            case-insensitively). Every match must start with the first one.
+        replacement: Replacement string, or a callable taking the match object
+        flags: Any of re.IGNORECASE, re.DOTALL, re.MULTILINE, re.VERBOSE,
+            applied to this rule only
+    """
+    if any(rule.name == name for rule in PREPROCESS_RULES):
+        raise ValueError(f"Preprocessing rule already registered: {name}")
+    if not triggers or not triggers[0]:
+        raise ValueError(f"Preprocessing rule {name} needs at least one non-empty trigger")
+    triggers = tuple(trigger.lower() for trigger in triggers)
+    PREPROCESS_RULES.append(PreprocessRule(name, pattern, triggers, replacement, flags))
+    _compiled_scans.clear()
+
+
+def compile_rules(rules):
+    """Compile rules into one pattern with a named group per rule.
+
+    The alternation is guarded by a lookahead on the first character of each
+    rule's leading trigger, so positions that can't start a match are skipped
+    without trying every alternative.
+    """
+    alternatives = []
+    lead_chars = set()
+    for rule in rules:
+        inline = ''.join(letter for flag, letter in _INLINE_FLAGS if rule.flags & flag)
+        group = f"(?{inline}:{rule.pattern})" if inline else f"(?:{rule.pattern})"
+        alternatives.append(f"(?P<{rule.name}>{group})")
+        lead_chars.update((rule.triggers[0][0], rule.triggers[0][0].upper()))
+    lead_class = ''.join(re.escape(char) for char in sorted(lead_chars))
+    return re.compile(f"(?=[{lead_class}])(?:{'|'.join(alternatives)})")
+
+
+def _get_compiled_scan(rules):
+    key = tuple(rule.name for rule in rules)
+    scan = _compiled_scans.get(key)
+    if scan is None:
+        replacements = {rule.name: rule.replacement for rule in rules}
+
+        def substitute(match):
+            replacement = replacements[match.lastgroup]
+            return replacement(match) if callable(replacement) else replacement
+
+        scan = _compiled_scans[key] = (compile_rules(rules), substitute)
+    return scan
+
+
+def preprocess_query(one_sql):
+    """Strip Excel carriage-return escapes and Teradata clauses the parsers can't handle."""
+    one_sql_lower = one_sql.lower()
+    active = []
+    for rule in PREPROCESS_RULES:
+        for trigger in rule.triggers:
+            if trigger not in one_sql_lower:
+                break
+        else:
+            active.append(rule)
+    if not active:
+        return one_sql
+    pattern, substitute = _get_compiled_scan(active)
+    return pattern.sub(substitute, one_sql)
+
+
+# Carriage returns that Excel exports escape as _x000d_ / _x000D_
+register_rule('excel_carriage_return', r'_x000[dD]_', triggers=('_x000d_',), flags=0)
+# LOCKING <object> FOR ACCESS request modifier
+register_rule('locking_access', r'\blocking\b.*?\baccess\b', triggers=('locking', 'access'))
+# Temporal qualifiers; NONSEQUENCED is listed first so it is not cut down to SEQUENCED
+register_rule('nonsequenced_transactiontime', r'\bnonsequenced\b.*?\btransactiontime\b',
+              triggers=('nonsequenced', 'transactiontime'))
+register_rule('sequenced_transactiontime', r'\bsequenced\b.*?\btransactiontime\b',
+              triggers=('sequenced', 'transactiontime'))
+
+
+def _is_word_boundary_char(char):
+    return char.isalnum() or char in '_\'"'
+
+
+def _normalize_token(match):
+    kind = match.lastgroup
+    if kind in ('string', 'number'):
+        return '?'
+    if kind == 'space':
+        text = match.string
+        start, end = match.span()
+        # A separator is only significant between two words, literals or identifiers
+        if start > 0 and end < len(text) and _is_word_boundary_char(text[start - 1]) and _is_word_boundary_char(text[end]):
+            return ' '
+        return ''
+    if kind == 'word':
+        return match.group().casefold()
+    return match.group()
+
+
+def statement_fingerprint(one_sql):
+    """Digest identifying statements that differ only in literals, comments, whitespace or case.
+
+    Table names are untouched (quoted identifiers keep their case), so
+    statements with the same fingerprint always have the same table lineage.
+    """
+    normalized = _FINGERPRINT_TOKENS.sub(_normalize_token, one_sql).strip()
+    return hashlib.blake2b(normalized.encode('utf-8', errors='surrogatepass'), digest_size=16).digest()
+
+
+def _legacy_preprocess_query(one_sql):
+    """Previous multi-pass implementation, kept as the benchmark baseline."""
+    if '_x000d_' in one_sql:
+        one_sql = one_sql.replace('_x000d_', ' ')
+    if '_x000D_' in one_sql:
+        one_sql = one_sql.replace('_x000D_', ' ')
+
+    one_sql_lower = one_sql.lower()
+    if 'locking' in one_sql_lower and 'access' in one_sql_lower:
+        locking_pos = one_sql_lower.find('locking')
+        access_pos = one_sql_lower.find('access', locking_pos)
+        if locking_pos != -1 and access_pos != -1 and access_pos > locking_pos:
+            one_sql = one_sql[:locking_pos] + ' ' + one_sql[access_pos + 6:]
+
+    one_sql_lower = one_sql.lower()
+    if 'nonsequenced' in one_sql_lower and 'transactiontime' in one_sql_lower:
+        nonsequenced_pos = one_sql_lower.find('nonsequenced')
+        transactiontime_pos = one_sql_lower.find('transactiontime', nonsequenced_pos)
+        if nonsequenced_pos != -1 and transactiontime_pos != -1 and transactiontime_pos > nonsequenced_pos:
+            one_sql = one_sql[:nonsequenced_pos] + ' ' + one_sql[transactiontime_pos + 15:]
+
+    one_sql_lower = one_sql.lower()
+    if 'sequenced' in one_sql_lower and 'transactiontime' in one_sql_lower:
+        sequenced_pos = one_sql_lower.find('sequenced')
+        transactiontime_pos = one_sql_lower.find('transactiontime', sequenced_pos)
+        if sequenced_pos != -1 and transactiontime_pos != -1 and transactiontime_pos > sequenced_pos:
+            one_sql = one_sql[:sequenced_pos] + ' ' + one_sql[transactiontime_pos + 15:]
+
+    return one_sql
+
+
+def benchmark_preprocessing(statements, repeats=20):
+    """Time the compiled preprocessor against the legacy one over a list of statements.
+
+    Returns:
+        Dict with per-implementation seconds, throughput and the number of
+        statements whose output differs
+    """
+    stats = {'statements': len(statements), 'repeats': repeats,
+             'megabytes': sum(len(s.encode('utf-8')) for s in statements) / (1024 * 1024)}
+    for label, func in (('legacy', _legacy_preprocess_query), ('compiled', preprocess_query)):
+        func(statements[0] if statements else '')  # Warm up (compiles the pattern)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for one_sql in statements:
+                func(one_sql)
+        stats[f'{label}_seconds'] = time.perf_counter() - start
+    stats['differ'] = sum(1 for s in statements if _legacy_preprocess_query(s) != preprocess_query(s))
+    return stats
+
+
+def main():
+    """Benchmark the preprocessor over the statements in the logfiles/ corpus."""
+    from logExtract import clean_bteq_log, get_log_files_from_folder
+    from statementSplitter import iter_source_statements
+
+    print("\n" + "="*60)
+    print("PREPROCESSING BENCHMARK")
+    print("="*60 + "\n")
+
+    log_folder = input("Enter path to log folder (press Enter for default 'logfiles'): ").strip() or 'logfiles'
+    repeats_input = input("Enter number of repeats (press Enter for default 20): ").strip()
+    repeats = int(repeats_input) if repeats_input else 20
+
+    sources = []
+    for _, log_file in get_log_files_from_folder(log_folder):
+        with open(log_file, 'r', encoding='utf-8') as f:
+            sources.append((Path(log_file).stem, clean_bteq_log(f.read())))
+    statements = [one_sql for _, one_sql, _, _ in iter_source_statements(sources)]
+    if not statements:
+        logger.error("No statements found to benchmark. Exiting.")
+        return
+
+    stats = benchmark_preprocessing(statements, repeats)
+
+    total_mb = stats['megabytes'] * repeats
+    print(f"\n{'='*60}")
+    print(f"PREPROCESSING BENCHMARK STATISTICS")
+    print(f"{'='*60}")
+    print(f"Statements:              {stats['statements']} x {repeats} repeats ({stats['megabytes']:.2f} MB)")
+    for label in ('legacy', 'compiled'):
+        seconds = stats[f'{label}_seconds']
+        print(f"{label.capitalize() + ' time:':25s}{seconds:.3f} seconds ({total_mb / seconds if seconds else 0:.1f} MB/s)")
+    if stats['compiled_seconds']:
+        print(f"Speedup:                 {stats['legacy_seconds'] / stats['compiled_seconds']:.2f}x")
+    print(f"Different outputs:       {stats['differ']}")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Single-pass, lexer-aware SQL statement splitter.
+
+Replaces sql_txt.split(';'), which breaks on semicolons inside string literals
+and comments and needs the whole script in memory. The splitter reads the
+input in binary chunks and only ever holds the statement being scanned, so
+multi-hundred-MB scripts split in bounded memory and statements can be handed
+to workers while the rest of the file is still being read.
+
+Offsets are byte offsets into the source file (or into the UTF-8 encoding of
+in-memory text), so error rows can point back to the exact statement. All the
+delimiters are ASCII, which never occurs inside a multi-byte UTF-8 sequence,
+so scanning the raw bytes is safe.
+
+BTEQ dot commands (.LOGON, .IF ERRORLEVEL ... THEN .QUIT;, .SET WIDTH ...)
+run to the end of their line and are dropped when they start a statement.
+"""
+
+import io
+import os
+import re
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Tokens that change scanner state outside quotes and comments
+_NORMAL_TOKENS = re.compile(rb";|'|\"|--|/\*|^[ \t]*\.", re.MULTILINE)
+_NON_SPACE = re.compile(rb"\S")
+
+_NORMAL, _QUOTE, _LINE_COMMENT, _BLOCK_COMMENT, _DOT_COMMAND = range(5)
+
+
+def iter_statements(stream, file_nme, encoding='utf-8', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (file_nme, statement, start_offset, end_offset) from a binary stream.
+
+    Statements are stripped of surrounding whitespace; the offsets delimit the
+    stripped text. Whitespace-only statements are skipped.
+    """
+    buf = b''
+    base = 0          # absolute offset of buf[0]
+    stmt_start = 0    # index in buf where the current statement begins
+    pos = 0           # scan position in buf
+    state = _NORMAL
+    quote = b''
+    content_seen = False
+    eof = False
+
+    def emit(end):
+        raw = buf[stmt_start:end]
+        lead = _NON_SPACE.search(raw)
+        if lead is None:
+            return None
+        stripped = raw.strip()
+        start_offset = base + stmt_start + lead.start()
+        return (file_nme, stripped.decode(encoding, errors='replace'),
+                start_offset, start_offset + len(stripped))
+
+    while True:
+        need_more = False
+
+        if state == _NORMAL:
+            match = _NORMAL_TOKENS.search(buf, pos)
+            # Near the end of the buffer a token may be split across chunks ('-' + '-', '  ' + '.')
+            if match is None or (not eof and match.end() >= len(buf) - 1):
+                if eof:
+                    break
+                if match is None:
+                    line_start = buf.rfind(b'\n') + 1
+                    if not buf[line_start:].strip(b' \t'):
+                        # Rescan the blank tail of the line so a following '.' is seen at line start
+                        resume = max(line_start, stmt_start)
+                    else:
+                        resume = max(pos, len(buf) - 1)
+                else:
+                    resume = match.start()
+                if _NON_SPACE.search(buf, pos, resume):
+                    content_seen = True
+                pos, need_more = resume, True
+            else:
+                if _NON_SPACE.search(buf, pos, match.start()):
+                    content_seen = True
+                token = match.group()
+                if token == b';':
+                    statement = emit(match.start())
+                    if statement is not None:
+                        yield statement
+                    stmt_start = pos = match.end()
+                    content_seen = False
+                elif token in (b"'", b'"'):
+                    state, quote, pos = _QUOTE, token, match.end()
+                    content_seen = True
+                elif token == b'--':
+                    state, pos = _LINE_COMMENT, match.end()
+                elif token == b'/*':
+                    state, pos = _BLOCK_COMMENT, match.end()
+                elif not content_seen:
+                    # Dot command at the start of a statement: skip the whole line
+                    state, pos = _DOT_COMMAND, match.end()
+                else:
+                    # A line starting with '.' inside a statement (e.g. '.5') is ordinary SQL
+                    pos = match.end()
+
+        elif state == _QUOTE:
+            # Doubled quotes ('') close and immediately reopen, which needs no special case
+            idx = buf.find(quote, pos)
+            if idx == -1:
+                pos, need_more = len(buf), True
+            else:
+                state, pos = _NORMAL, idx + 1
+
+        elif state in (_LINE_COMMENT, _DOT_COMMAND):
+            idx = buf.find(b'\n', pos)
+            if idx == -1:
+                pos, need_more = len(buf), True
+            else:
+                if state == _DOT_COMMAND:
+                    stmt_start = idx + 1
+                state, pos = _NORMAL, idx + 1
+
+        else:  # _BLOCK_COMMENT
+            idx = buf.find(b'*/', pos)
+            if idx == -1:
+                pos, need_more = max(pos, len(buf) - 1), True
+            else:
+                state, pos = _NORMAL, idx + 2
+
+        if need_more:
+            if eof:
+                break
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                eof = True
+                continue
+            # Drop complete lines before the current statement so memory stays bounded;
+            # cutting at a line start keeps '^' in _NORMAL_TOKENS meaningful
+            cut = buf.rfind(b'\n', 0, stmt_start) + 1
+            buf = buf[cut:] + chunk
+            base += cut
+            pos -= cut
+            stmt_start -= cut
+
+    if state != _DOT_COMMAND:
+        statement = emit(len(buf))
+        if statement is not None:
+            yield statement
+
+
+def iter_source_statements(sql_content, encoding='utf-8', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (file_nme, statement, start_offset, end_offset) for every query source.
+
+    Args:
+        sql_content: (file_nme, source) tuple or list of them, as returned by
+            read_queries_from_input. source is SQL text, a path to a script
+            file, which is streamed from disk, or an open binary stream.
+    """
+    if isinstance(sql_content, tuple):
+        sql_content = [sql_content]
+    for file_nme, source in sql_content:
+        if isinstance(source, os.PathLike):
+            with open(source, 'rb') as stream:
+                yield from iter_statements(stream, file_nme, encoding, chunk_size)
+        elif isinstance(source, str):
+            yield from iter_statements(io.BytesIO(source.encode(encoding)), file_nme, encoding, chunk_size)
+        else:
+            yield from iter_statements(source, file_nme, encoding, chunk_size)
@@ -0,0 +1,39 @@
+from collections import deque
+
+from MultiProcessingParser import fan_out_duplicates
+
+
+LINEAGE = ('Insert', ['db.target'], ['db.source'])
+
+
+def pool_result(idx, file_nme):
+    return ([], True, None, None, 'insert into db.target select * from db.source', file_nme, None, idx, LINEAGE)
+
+
+def test_duplicate_queued_after_last_result_is_yielded():
+    outcomes, waiting, ready = {}, {}, deque()
+
+    def results():
+        yield pool_result(0, 'a.sql')
+        # The feeder thread reads the duplicate only after the last result was handled
+        ready.append((0, (1, 'b.sql', 'INSERT INTO db.target SELECT * FROM db.source')))
+
+    handled = list(fan_out_duplicates(results(), outcomes, waiting, ready, 'run'))
+
+    assert [result[7] for result in handled] == [0, 1]
+    duplicate = handled[1]
+    assert duplicate[1] is True
+    assert duplicate[5] == 'b.sql'
+    assert duplicate[8] == LINEAGE
+    assert not ready and not waiting
+
+
+def test_waiting_duplicates_follow_their_representative():
+    outcomes, ready = {}, deque()
+    waiting = {0: [(2, 'c.sql', 'insert into db.target select * from db.source')]}
+
+    results = [pool_result(0, 'a.sql'), pool_result(1, 'b.sql')]
+    handled = list(fan_out_duplicates(iter(results), outcomes, waiting, ready, 'run'))
+
+    assert [result[7] for result in handled] == [0, 2, 1]
+    assert not waiting
@@ -0,0 +1,17 @@
+from helper import list_query_files, iter_queries_from_files
+from statementSplitter import iter_source_statements
+
+
+def test_streamed_files_get_read_times(tmp_path):
+    (tmp_path / 'first.sql').write_text('insert into a select * from b;\nselect 1;')
+    (tmp_path / 'second.txt').write_text('delete from c;')
+    query_files = list_query_files(str(tmp_path))
+
+    read_times = {}
+    sources = iter_queries_from_files(query_files, stream=True, read_times=read_times)
+    statements = [(file_nme, statement) for file_nme, statement, _, _ in iter_source_statements(sources)]
+
+    assert sorted(statements) == [('first', 'insert into a select * from b'), ('first', 'select 1'),
+                                  ('second', 'delete from c')]
+    assert set(read_times) == {path for _, path in query_files}
+    assert all(seconds >= 0 for seconds in read_times.values())
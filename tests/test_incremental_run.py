@@ -0,0 +1,24 @@
+from pathlib import Path
+
+from incrementalRun import run_incremental
+
+
+def test_relations_file_removed_when_no_rows_remain(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for folder in ('Relationships', 'error'):
+        (tmp_path / folder).mkdir()
+    scripts = tmp_path / 'scripts'
+    scripts.mkdir()
+    script = scripts / 'load.sql'
+    script.write_text('insert into db.target select * from db.source;')
+
+    stats = run_incremental(str(scripts), 'RUN', state_dir=str(tmp_path / 'state'), num_processes=1)
+    assert stats['relationship_rows'] > 0
+    assert Path(stats['relations_path']).exists()
+    relations_path = stats['relations_path']
+
+    script.write_text('select 1;')
+    stats = run_incremental(str(scripts), 'RUN', state_dir=str(tmp_path / 'state'), num_processes=1)
+    assert stats['relationship_rows'] == 0
+    assert stats['relations_path'] is None
+    assert not Path(relations_path).exists()
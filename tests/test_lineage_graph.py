@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from lineageGraph import LineageGraph
+
+
+def graph(edges):
+    return LineageGraph.from_frame(pd.DataFrame(
+        [(child, parent, 'Insert', 'load.sql') for child, parent in edges],
+        columns=['CHILDTABLENAME', 'PARENTTABLENAME', 'RELATIONSHIP', 'SCRIPT_FILE']))
+
+
+def reached(frame):
+    return dict(zip(frame['TABLENAME'], frame['DEPTH']))
+
+
+# S <- A <- B <- C, with a shortcut S <- B that the depth-first walk only meets after going through A
+SHORTCUT = [('S', 'A'), ('A', 'B'), ('S', 'B'), ('B', 'C')]
+
+
+@pytest.mark.parametrize('max_depth', [None, 1, 2, 3])
+def test_depth_first_reaches_what_walk_reaches(max_depth):
+    lineage = graph(SHORTCUT)
+    walked = lineage.walk('S', max_depth=max_depth)
+    depth_first = lineage.walk_depth_first('S', max_depth=max_depth)
+    assert reached(depth_first) == reached(walked)
+
+
+def test_depth_first_keeps_first_visit_order():
+    depth_first = graph(SHORTCUT).walk_depth_first('S', max_depth=2)
+    assert list(depth_first['TABLENAME']) == ['A', 'B', 'C']
+    assert list(depth_first['DEPTH']) == [1, 1, 2]
+
+
+def test_depth_first_downstream():
+    lineage = graph(SHORTCUT)
+    assert reached(lineage.walk_depth_first('C', direction='downstream', max_depth=2)) == \
+        reached(lineage.walk('C', direction='downstream', max_depth=2))
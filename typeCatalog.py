@@ -0,0 +1,157 @@
+"""
+Indexed object-type catalog used to type lineage rows.
+
+The DBC object export (obj_name, TableKind) can have millions of rows. It is
+loaded once into a pandas Series indexed by the stripped, upper-cased object
+name, and that Series is persisted as a snapshot under ./cache/types so later
+runs skip the CSV parse as long as the file's mtime and size are unchanged.
+Lineage columns are typed with a single hash-index lookup (get_indexer) per
+column instead of a Python lookup per row.
+"""
+
+import hashlib
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from excelReader import load_workbook_queries
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = './cache/types'
+
+# Bump whenever the snapshot layout or name normalization changes
+SNAPSHOT_FORMAT_VERSION = 1
+
+TABLE_KIND_NAMES = {'V': 'View', 'T': 'Table'}
+
+
+def normalize_names(names):
+    """Strip and upper-case a Series of object names the way the catalog index is keyed."""
+    return names.astype('string').str.strip().str.upper()
+
+
+class TypeCatalog:
+    """obj_name -> TableKind index with vectorized typing of lineage columns."""
+
+    def __init__(self, kinds):
+        """
+        Args:
+            kinds: Series of TableKind codes indexed by normalized object name
+        """
+        self.kinds = kinds
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @classmethod
+    def from_dataframe(cls, types_df):
+        """Build a catalog from a DataFrame with obj_name and TableKind columns."""
+        types_df = types_df.dropna(subset=['obj_name'])
+        kinds = pd.Series(types_df['TableKind'].astype('string').str.strip().fillna('').to_numpy(),
+                          index=normalize_names(types_df['obj_name']).to_numpy())
+        # Later rows win, as with the original dict-based lookup
+        kinds = kinds[~kinds.index.duplicated(keep='last')]
+        return cls(kinds)
+
+    @classmethod
+    def load(cls, types_file_path, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+        """Load the object types CSV, reusing the snapshot if the CSV hasn't changed."""
+        source = Path(types_file_path)
+        stat = source.stat()
+        snapshot_path = None
+        if snapshot_dir:
+            path_digest = hashlib.sha256(str(source.resolve()).encode('utf-8')).hexdigest()[:16]
+            snapshot_path = Path(snapshot_dir) / f"{source.stem}-{path_digest}.pkl"
+            if snapshot_path.exists():
+                try:
+                    snapshot = pd.read_pickle(snapshot_path)
+                    if (snapshot.get('version') == SNAPSHOT_FORMAT_VERSION
+                            and snapshot.get('mtime') == stat.st_mtime and snapshot.get('size') == stat.st_size):
+                        logger.info(f"Loaded object types snapshot {snapshot_path}")
+                        return cls(snapshot['kinds'])
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable object types snapshot {snapshot_path}: {e}")
+
+        types_df = pd.read_csv(types_file_path, usecols=['obj_name', 'TableKind'], dtype=str)
+        logger.info(f"Loaded object types from {types_file_path}")
+        catalog = cls.from_dataframe(types_df)
+
+        if snapshot_path is not None:
+            try:
+                snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+                pd.to_pickle({'version': SNAPSHOT_FORMAT_VERSION, 'mtime': stat.st_mtime,
+                              'size': stat.st_size, 'kinds': catalog.kinds}, snapshot_path)
+                logger.info(f"Saved object types snapshot to {snapshot_path}")
+            except OSError as e:
+                logger.warning(f"Could not save object types snapshot {snapshot_path}: {e}")
+        return catalog
+
+    def with_views(self, view_names):
+        """Return a catalog that also types the given names as views, unless already present."""
+        names = normalize_names(pd.Series(view_names)).dropna().drop_duplicates()
+        new_names = names[~names.isin(self.kinds.index)]
+        if new_names.empty:
+            return self
+        logger.info(f"Added {len(new_names)} new views to ObjectTypes")
+        return TypeCatalog(pd.concat([self.kinds, pd.Series('V', index=new_names.to_numpy())]))
+
+    def type_names(self, names, default='VolTable'):
+        """Map a Series of table names to 'View'/'Table', or default when the kind is anything else.
+
+        Missing names stay None.
+        """
+        positions = self.kinds.index.get_indexer(normalize_names(names))
+        type_codes = np.where(positions >= 0, self.kinds.to_numpy(dtype=object)[positions], '')
+        table_types = pd.Series(type_codes, index=names.index).map(TABLE_KIND_NAMES).fillna(default)
+        return table_types.where(names.notna(), None)
+
+    def apply(self, df, custom_name, child_column='childTableType', parent_column='parentTableType',
+              default='VolTable'):
+        """Add child and parent type columns; the query-name child is typed 'Unknown'."""
+        child_types = self.type_names(df['childTableName'], default)
+        df[child_column] = child_types.mask(df['childTableName'] == custom_name, 'Unknown')
+        df[parent_column] = self.type_names(df['parentTableName'], default)
+        return df
+
+
+def read_excel_view_names(input_path):
+    """Return the view_name values of an Excel query file, or an empty list."""
+    if not input_path or not Path(input_path).exists():
+        return []
+    input_file = Path(input_path)
+    if input_file.suffix.lower() not in ['.xlsx', '.xls', '.xlsm']:
+        return []
+    try:
+        # Usually already read (or cached) when the queries were loaded
+        view_names = load_workbook_queries(input_path).view_names
+    except Exception as e:
+        logger.warning(f"Could not extract view names from Excel file: {e}")
+        return []
+    if not view_names:
+        return []
+    logger.info(f"Found view_name column in {input_file.name}")
+    logger.info(f"Adding {len(view_names)} unique views to ObjectTypes")
+    return list(view_names)
+
+
+def load_type_catalog(types_file_path, input_path=None, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """Load the object types catalog plus the views named in an Excel input file.
+
+    Returns None when no types file is available, so callers fall back to the
+    default View typing.
+    """
+    if not types_file_path or not Path(types_file_path).exists():
+        return None
+    catalog = TypeCatalog.load(types_file_path, snapshot_dir)
+    view_names = read_excel_view_names(input_path)
+    return catalog.with_views(view_names) if view_names else catalog
+
+
+def apply_default_types(df, custom_name, child_column='childTableType', parent_column='parentTableType'):
+    """Type every table as a View (and the query-name child as Unknown) when no catalog is available."""
+    df[child_column] = (df['childTableName'] == custom_name).map({True: 'Unknown', False: 'View'})
+    df[parent_column] = 'View'
+    return df
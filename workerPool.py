@@ -0,0 +1,230 @@
+"""
+Process pool with per-task time budgets and worker recycling.
+
+multiprocessing.Pool can't stop a single task: a statement that pins a worker
+in the parser stalls its whole chunk, and killing the worker loses the task
+and hangs map(). RecyclingPool hands each worker one task at a time over its
+own pipe, so the parent always knows which task a worker is on and when it
+started. A worker that overruns the budget is terminated and replaced, and the
+task is reported through error_result, as is a task that raises. Every task
+gets an id unique to the pool, and a reply whose id isn't the task its worker
+holds is dropped; workers still busy when a run is abandoned (the caller stops
+reading or an exception escapes) are killed, so a later run on the same pool
+never sees their results. Workers are also retired after
+max_tasks_per_child tasks or once their RSS passes max_memory_mb, so parser
+state leaked over a long run doesn't accumulate.
+"""
+
+import itertools
+import logging
+import multiprocessing as mp
+import time
+from multiprocessing.connection import wait
+
+from helper import get_current_rss_mb
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_loop(conn, initializer, initargs):
+    """Run tasks received over conn until told to stop."""
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        task_id, func, task = message
+        try:
+            outcome = (True, func(task))
+        except Exception as e:
+            outcome = (False, (type(e).__name__, str(e)))
+        conn.send((task_id, outcome, get_current_rss_mb()))
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, ctx, initializer, initargs):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_loop, args=(child_conn, initializer, initargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks_done = 0
+        self.current = None  # (task_id, input position, task, start_time)
+
+    def send(self, task_id, seq, func, task):
+        self.current = (task_id, seq, task, time.time())
+        self.conn.send((task_id, func, task))
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+class RecyclingPool:
+    """Minimal Pool replacement supporting task timeouts and worker recycling.
+
+    Args:
+        processes: Number of worker processes
+        initializer, initargs: Run once in every worker, including replacements
+        task_timeout: Seconds a single task may run before its worker is killed
+        max_tasks_per_child: Retire a worker after this many tasks
+        max_memory_mb: Retire a worker once its RSS exceeds this after a task
+        error_result: Callable (task, error_type, error_info) -> result used for
+            tasks that timed out, raised or whose worker died; without it a
+            task that raises ends the run with a RuntimeError
+    """
+
+    def __init__(self, processes, initializer=None, initargs=(), task_timeout=None,
+                 max_tasks_per_child=None, max_memory_mb=None, error_result=None):
+        self.processes = max(1, processes)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.task_timeout = task_timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.max_memory_mb = max_memory_mb
+        self.error_result = error_result
+        self.ctx = mp.get_context()
+        self.workers = []
+        self._task_ids = itertools.count()
+        self.timed_out = 0
+        self.crashed = 0
+        self.recycled = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.terminate()
+
+    def _spawn(self):
+        worker = _Worker(self.ctx, self.initializer, self.initargs)
+        self.workers.append(worker)
+        return worker
+
+    def _replace(self, worker, graceful):
+        self.workers.remove(worker)
+        if graceful:
+            worker.stop()
+        else:
+            worker.kill()
+        return self._spawn()
+
+    def _needs_recycling(self, worker, rss_mb):
+        if self.max_tasks_per_child and worker.tasks_done >= self.max_tasks_per_child:
+            return True
+        return bool(self.max_memory_mb and rss_mb is not None and rss_mb > self.max_memory_mb)
+
+    def imap_unordered(self, func, iterable, chunksize=1):
+        """Yield func(task) for every task in completion order.
+
+        chunksize is accepted for Pool compatibility; tasks are always
+        dispatched one at a time so each has its own deadline.
+        """
+        for _, value in self._run(func, iterable):
+            yield value
+
+    def map(self, func, iterable, chunksize=1):
+        """Return func(task) for every task in input order."""
+        completed = sorted(self._run(func, iterable), key=lambda item: item[0])
+        return [value for _, value in completed]
+
+    def _run(self, func, iterable):
+        """Yield (input position, result) pairs in completion order."""
+        tasks = enumerate(iterable)
+        for _ in range(self.processes - len(self.workers)):
+            self._spawn()
+
+        def dispatch(worker):
+            for seq, task in tasks:
+                worker.send(next(self._task_ids), seq, func, task)
+                return True
+            worker.current = None
+            return False
+
+        try:
+            for worker in list(self.workers):
+                dispatch(worker)
+            yield from self._collect(dispatch)
+        finally:
+            # Abandoned mid-run: nobody will read the tasks still running
+            for worker in [w for w in self.workers if w.current is not None]:
+                self.workers.remove(worker)
+                worker.kill()
+
+    def _collect(self, dispatch):
+        """Yield (input position, result) pairs as the busy workers reply."""
+        while True:
+            busy = [w for w in self.workers if w.current is not None]
+            if not busy:
+                break
+
+            wait_timeout = None
+            if self.task_timeout:
+                now = time.time()
+                wait_timeout = max(0, min(w.current[3] + self.task_timeout - now for w in busy))
+
+            ready = wait([w.conn for w in busy], timeout=wait_timeout)
+            for worker in busy:
+                if worker.conn not in ready:
+                    continue
+                task_id, seq, task, _ = worker.current
+                try:
+                    reply_id, (ok, value), rss_mb = worker.conn.recv()
+                except (EOFError, OSError):
+                    # Worker died mid-task (segfault, OOM kill)
+                    self.crashed += 1
+                    logger.warning(f"Worker {worker.process.pid} died while processing task {seq}")
+                    dispatch(self._replace(worker, graceful=False))
+                    yield seq, self.error_result(task, 'WorkerCrash', 'Worker process exited while processing this task')
+                    continue
+
+                if reply_id != task_id:
+                    logger.warning(f"Dropping stale reply to task {reply_id} from worker {worker.process.pid}")
+                    continue
+                if not ok:
+                    error_type, error_info = value
+                    if self.error_result is None:
+                        raise RuntimeError(f"Task {seq} raised {error_type}: {error_info}")
+                    value = self.error_result(task, error_type, error_info)
+                worker.tasks_done += 1
+                worker.current = None
+                if self._needs_recycling(worker, rss_mb):
+                    self.recycled += 1
+                    worker = self._replace(worker, graceful=True)
+                # Hand out the next task before yielding so the worker isn't idle while the caller works
+                dispatch(worker)
+                yield seq, value
+
+            if self.task_timeout:
+                now = time.time()
+                for worker in [w for w in self.workers if w.current is not None]:
+                    _, seq, task, started = worker.current
+                    if worker.conn in ready or now - started < self.task_timeout:
+                        continue
+                    self.timed_out += 1
+                    logger.warning(f"Task {seq} exceeded {self.task_timeout}s budget, restarting worker {worker.process.pid}")
+                    dispatch(self._replace(worker, graceful=False))
+                    yield seq, self.error_result(task, 'Timeout', f"Statement exceeded the {self.task_timeout}s time budget")
+
+    def terminate(self):
+        for worker in self.workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.process.join()
+            worker.conn.close()
+        self.workers = []